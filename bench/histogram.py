@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import math
+from typing import Any
+
+
+class Histogram:
+    def __init__(self, lowest: float = 1e-6, relative_error: float = 0.01) -> None:
+        self.lowest = lowest
+        self.relative_error = relative_error
+        self._log_base = math.log1p(2 * relative_error)
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        if value <= self.lowest:
+            return 0
+        return 1 + int(math.log(value / self.lowest) / self._log_base)
+
+    def _value(self, index: int) -> float:
+        if index == 0:
+            return self.lowest
+        lower = self.lowest * math.exp((index - 1) * self._log_base)
+        return lower * (1 + self.relative_error)
+
+    def record(self, value: float) -> None:
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: Histogram) -> None:
+        if (other.lowest, other.relative_error) != (self.lowest, self.relative_error):
+            raise ValueError("cannot merge histograms with different bucket layouts")
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        if rank >= self.count:
+            return self.max
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "lowest": self.lowest,
+            "relative_error": self.relative_error,
+            "counts": {str(index): count for index, count in sorted(self.counts.items())},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> Histogram:
+        histogram = cls(data["lowest"], data["relative_error"])
+        histogram.counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["total"]
+        histogram.min = data["min"] if histogram.count else math.inf
+        histogram.max = data["max"]
+        return histogram
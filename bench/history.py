@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import json
+import os
+import platform
+import subprocess
+import sys
+from dataclasses import dataclass
+from importlib import metadata
+from pathlib import Path
+from typing import Any
+
+from bench.histogram import Histogram
+
+SCHEMA_VERSION = 1
+SUMMARY_PERCENTILES = (50.0, 90.0, 95.0, 99.0, 99.9)
+COMPARABLE_CONFIG = (
+    "scenario",
+    "mode",
+    "concurrency",
+    "steps",
+    "arrival",
+    "stream",
+    "processes",
+    "model",
+)
+
+
+@dataclass
+class Thresholds:
+    max_p95_increase_pct: float = 10.0
+    max_rps_decrease_pct: float = 10.0
+    max_error_rate: float = 0.01
+
+
+@dataclass
+class Check:
+    name: str
+    baseline: float
+    candidate: float
+    change: str
+    limit: str
+    passed: bool
+
+
+def git_info() -> dict[str, Any]:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=10
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=30,
+        ).stdout
+    except (OSError, subprocess.SubprocessError):
+        return {"sha": os.environ.get("GITHUB_SHA"), "dirty": None}
+    return {"sha": sha, "dirty": bool(status.strip())}
+
+
+def package_version(name: str) -> str | None:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "hostname": platform.node(),
+        "cpu_count": os.cpu_count(),
+        "httpx": package_version("httpx"),
+    }
+
+
+def histogram_summary(histogram: Histogram) -> dict[str, float | int]:
+    summary: dict[str, float | int] = {
+        f"p{pct:g}": histogram.percentile(pct) for pct in SUMMARY_PERCENTILES
+    }
+    summary["max"] = histogram.max
+    summary["mean"] = histogram.mean
+    summary["count"] = histogram.count
+    return summary
+
+
+def write_result(path: Path, result: dict[str, Any]) -> None:
+    path.write_text(json.dumps(result, indent=2, sort_keys=True) + "\n")
+
+
+def load_result(path: Path) -> dict[str, Any]:
+    result: dict[str, Any] = json.loads(path.read_text())
+    if result.get("schema") != SCHEMA_VERSION:
+        raise ValueError(f"{path}: unsupported result schema {result.get('schema')!r}")
+    return result
+
+
+def scenario_name(result: dict[str, Any]) -> str | None:
+    scenario = result["config"].get("scenario")
+    return scenario["name"] if scenario else None
+
+
+def series_key(result: dict[str, Any]) -> tuple[str | None, str | None]:
+    return scenario_name(result), result["config"].get("mode")
+
+
+def load_history(
+    directory: Path, limit: int, like: dict[str, Any] | None = None
+) -> list[dict[str, Any]]:
+    results = []
+    for path in directory.glob("bench-*.json"):
+        try:
+            result = load_result(path)
+        except (OSError, ValueError):
+            continue
+        if like is None or series_key(result) == series_key(like):
+            results.append(result)
+    results.sort(key=lambda result: result["created_at"])
+    return results[-limit:] if limit > 0 else []
+
+
+def percent_change(baseline: float, candidate: float) -> float | None:
+    if baseline <= 0:
+        return None
+    return (candidate - baseline) / baseline * 100
+
+
+def compare_results(
+    baseline: dict[str, Any], candidate: dict[str, Any], thresholds: Thresholds
+) -> list[Check]:
+    base, cand = baseline["summary"], candidate["summary"]
+    checks = []
+
+    p95_change = percent_change(base["latency_s"]["p95"], cand["latency_s"]["p95"])
+    checks.append(
+        Check(
+            name="p95 latency (s)",
+            baseline=base["latency_s"]["p95"],
+            candidate=cand["latency_s"]["p95"],
+            change="n/a" if p95_change is None else f"{p95_change:+.1f}%",
+            limit=f"<= +{thresholds.max_p95_increase_pct:g}%",
+            passed=p95_change is None or p95_change <= thresholds.max_p95_increase_pct,
+        )
+    )
+
+    rps_change = percent_change(base["rps"], cand["rps"])
+    checks.append(
+        Check(
+            name="RPS",
+            baseline=base["rps"],
+            candidate=cand["rps"],
+            change="n/a" if rps_change is None else f"{rps_change:+.1f}%",
+            limit=f">= -{thresholds.max_rps_decrease_pct:g}%",
+            passed=rps_change is None or -rps_change <= thresholds.max_rps_decrease_pct,
+        )
+    )
+
+    checks.append(
+        Check(
+            name="error rate",
+            baseline=base["error_rate"],
+            candidate=cand["error_rate"],
+            change=f"{(cand['error_rate'] - base['error_rate']) * 100:+.2f}pp",
+            limit=f"<= {thresholds.max_error_rate:.2%}",
+            passed=cand["error_rate"] <= thresholds.max_error_rate,
+        )
+    )
+    return checks
+
+
+def config_differences(baseline: dict[str, Any], candidate: dict[str, Any]) -> list[str]:
+    differences = []
+    for key in COMPARABLE_CONFIG:
+        before, after = baseline["config"].get(key), candidate["config"].get(key)
+        if before != after:
+            differences.append(f"{key}: {before!r} -> {after!r}")
+    return differences
+
+
+def render_checks(checks: list[Check]) -> list[str]:
+    lines = [
+        "| check | baseline | candidate | change | limit | result |",
+        "| --- | --- | --- | --- | --- | --- |",
+    ]
+    for check in checks:
+        lines.append(
+            f"| {check.name} | {check.baseline:.4g} | {check.candidate:.4g} | {check.change} "
+            f"| {check.limit} | {'pass' if check.passed else 'FAIL'} |"
+        )
+    return lines
+
+
+def render_trend(results: list[dict[str, Any]]) -> list[str]:
+    lines = [
+        "| run | git sha | requests | rps | p50 s | p95 s | p99 s | error rate |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for result in results:
+        summary = result["summary"]
+        latency = summary["latency_s"]
+        sha = result["git"]["sha"] or "unknown"
+        dirty = "+" if result["git"]["dirty"] else ""
+        lines.append(
+            f"| {result['run_id']} | {sha[:10]}{dirty} | {summary['requests']} "
+            f"| {summary['rps']:.2f} | {latency['p50']:.3f} | {latency['p95']:.3f} "
+            f"| {latency['p99']:.3f} | {summary['error_rate']:.2%} |"
+        )
+    return lines
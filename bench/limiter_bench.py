@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+
+from gateway.app.limits import Bucket, RateLimiter
+
+
+class LockedRateLimiter:
+    def __init__(self, rate: float, burst: int) -> None:
+        self._rate = rate
+        self._burst = burst
+        self._buckets: dict[str, Bucket] = {}
+        self._lock = asyncio.Lock()
+
+    async def allow(self, key: str) -> bool:
+        async with self._lock:
+            now = time.monotonic()
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = Bucket(tokens=float(self._burst), last_refill=now)
+                self._buckets[key] = bucket
+            elapsed = now - bucket.last_refill
+            bucket.tokens = min(self._burst, bucket.tokens + elapsed * self._rate)
+            bucket.last_refill = now
+            if bucket.tokens >= 1:
+                bucket.tokens -= 1
+                return True
+            return False
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+async def time_allow(
+    limiter: RateLimiter | LockedRateLimiter, keys: list[str]
+) -> tuple[float, int]:
+    start = time.perf_counter()
+    for key in keys:
+        await limiter.allow(key)
+    return (time.perf_counter() - start) / len(keys), len(limiter)
+
+
+def time_allow_nowait(limiter: RateLimiter, keys: list[str]) -> tuple[float, int]:
+    start = time.perf_counter()
+    for key in keys:
+        limiter.allow_nowait(key)
+    return (time.perf_counter() - start) / len(keys), len(limiter)
+
+
+async def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    population = [f"10.{i // 65536}.{(i // 256) % 256}.{i % 256}" for i in range(args.keys)]
+    keys = [rng.choice(population) for _ in range(args.calls)]
+
+    rows = [
+        (
+            "global asyncio.Lock (previous)",
+            await time_allow(LockedRateLimiter(args.rate, args.burst), keys),
+        ),
+        (
+            "lock-free allow()",
+            await time_allow(RateLimiter(args.rate, args.burst, max_keys=args.keys), keys),
+        ),
+        (
+            "lock-free allow_nowait()",
+            time_allow_nowait(RateLimiter(args.rate, args.burst, max_keys=args.keys), keys),
+        ),
+        (
+            f"lock-free, max_keys={args.keys // 10} (LRU evicting)",
+            await time_allow(RateLimiter(args.rate, args.burst, max_keys=args.keys // 10), keys),
+        ),
+    ]
+
+    print(f"# RateLimiter.allow() at {args.keys} distinct keys, {args.calls} calls")
+    print("")
+    print("| limiter | ns/call | buckets held |")
+    print("| --- | --- | --- |")
+    for name, (seconds, buckets) in rows:
+        print(f"| {name} | {seconds * 1e9:.0f} | {buckets} |")
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark the gateway rate limiter")
+    parser.add_argument("--keys", type=int, default=100_000)
+    parser.add_argument("--calls", type=int, default=500_000)
+    parser.add_argument("--rate", type=float, default=5.0)
+    parser.add_argument("--burst", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
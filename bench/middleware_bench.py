@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+import uuid
+from collections.abc import AsyncIterator, Awaitable, Callable
+from typing import Any
+
+import orjson
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.types import ASGIApp, Message
+
+from gateway.app.config import settings
+from gateway.app.limits import RateLimiter
+from gateway.app.middleware import RequestMiddleware
+from gateway.app.serialization import ORJSONResponse, read_json
+from gateway.app.timing import RequestTimings
+
+
+def build_app(chunks: int) -> FastAPI:
+    app = FastAPI(default_response_class=ORJSONResponse)
+
+    @app.post("/json")
+    async def json_endpoint(request: Request) -> Response:
+        payload = await read_json(request)
+        return ORJSONResponse({"request_id": request.state.request_id, "keys": len(payload)})
+
+    @app.post("/stream")
+    async def stream_endpoint(request: Request) -> Response:
+        await read_json(request)
+
+        async def body() -> AsyncIterator[bytes]:
+            for index in range(chunks):
+                yield b"data: " + str(index).encode() + b"\n\n"
+
+        return StreamingResponse(body(), media_type="text/event-stream")
+
+    return app
+
+
+def base_http_app(limiter: RateLimiter, chunks: int) -> FastAPI:
+    app = build_app(chunks)
+
+    @app.middleware("http")
+    async def request_middleware(
+        request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        timings = RequestTimings()
+        request.state.timings = timings
+        request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
+        request.state.request_id = request_id
+        client_key = request.client.host if request.client else "unknown"
+        with timings.stage("ratelimit"):
+            allowed = await limiter.allow(client_key)
+        if not allowed:
+            return ORJSONResponse({"error": "rate_limited"}, status_code=429)
+        content_length = request.headers.get("content-length")
+        if content_length and int(content_length) > settings.request_size_limit_bytes:
+            return ORJSONResponse({"error": "payload_too_large"}, status_code=413)
+        response = await call_next(request)
+        response.headers["x-request-id"] = request_id
+        return response
+
+    return app
+
+
+def asgi_app(limiter: RateLimiter, chunks: int) -> FastAPI:
+    app = build_app(chunks)
+    app.add_middleware(RequestMiddleware, limiter=lambda: limiter)
+    return app
+
+
+async def call(app: ASGIApp, path: str, body: bytes) -> None:
+    disconnected = asyncio.Event()
+    delivered = False
+
+    async def receive() -> Message:
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: Message) -> None:
+        pass
+
+    scope: dict[str, Any] = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("10.0.0.1", 40000),
+        "server": ("gateway", 8000),
+    }
+    await app(scope, receive, send)
+
+
+async def seconds_per_request(app: ASGIApp, path: str, body: bytes, requests: int) -> float:
+    for _ in range(min(requests, 200)):
+        await call(app, path, body)
+    start = time.perf_counter()
+    for _ in range(requests):
+        await call(app, path, body)
+    return (time.perf_counter() - start) / requests
+
+
+async def run(args: argparse.Namespace) -> None:
+    limiter = RateLimiter(1e9, 1_000_000_000)
+    body = orjson.dumps({"messages": [{"role": "user", "content": "x" * args.body_chars}]})
+    print("# Per-request middleware cost: request ID, rate limit, body-size limit")
+    print("")
+    print("| response | BaseHTTPMiddleware us/req | pure ASGI us/req | saved us | speedup |")
+    print("| --- | --- | --- | --- | --- |")
+    for chunks in args.chunks:
+        path, label = ("/json", "JSON") if chunks == 0 else ("/stream", f"stream x{chunks}")
+        before = await seconds_per_request(
+            base_http_app(limiter, chunks), path, body, args.requests
+        )
+        after = await seconds_per_request(asgi_app(limiter, chunks), path, body, args.requests)
+        print(
+            f"| {label} | {before * 1e6:.1f} | {after * 1e6:.1f} "
+            f"| {(before - after) * 1e6:.1f} | {before / after:.2f}x |"
+        )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark the gateway request middleware")
+    parser.add_argument("--requests", type=int, default=5_000)
+    parser.add_argument("--chunks", type=int, nargs="+", default=[0, 16, 256])
+    parser.add_argument("--body-chars", type=int, default=1_000)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(parse_args()))
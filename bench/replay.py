@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import random
+from pathlib import Path
+from typing import Any
+
+from bench.scenarios import RequestSpec, synthetic_text
+
+
+def synthetic_chars(rng: random.Random, chars: int) -> str:
+    if chars <= 0:
+        return ""
+    return synthetic_text(rng, chars // 4 + 1)[:chars]
+
+
+def redacted_body(redacted: dict[str, Any]) -> dict[str, Any]:
+    rng = random.Random(hashlib.sha256(redacted["sha256"].encode()).digest())
+    body: dict[str, Any] = {}
+    if redacted.get("model") is not None:
+        body["model"] = redacted["model"]
+    if redacted.get("max_tokens") is not None:
+        body["max_tokens"] = redacted["max_tokens"]
+    if "messages" in redacted:
+        body["messages"] = [
+            {
+                "role": message.get("role") or "user",
+                "content": synthetic_chars(rng, message["chars"]),
+            }
+            for message in redacted["messages"]
+        ]
+    if "input_chars" in redacted:
+        body["input"] = [synthetic_chars(rng, chars) for chars in redacted["input_chars"]]
+    return body
+
+
+def capture_files(path: Path) -> list[Path]:
+    if path.is_dir():
+        return sorted(path.glob("*.jsonl*"))
+    rotated = [item for item in path.parent.glob(f"{path.name}.*") if item.suffix[1:].isdigit()]
+    return [*rotated, path]
+
+
+def load_capture(
+    paths: list[Path], speed: float = 1.0, limit: int | None = None
+) -> list[tuple[float, RequestSpec]]:
+    if speed <= 0:
+        raise ValueError("speed must be positive")
+    entries: list[dict[str, Any]] = []
+    for path in paths:
+        for file in capture_files(path):
+            with file.open() as handle:
+                entries.extend(json.loads(line) for line in handle if line.strip())
+    entries.sort(key=lambda entry: entry["ts"])
+    if limit is not None:
+        entries = entries[:limit]
+    if not entries:
+        raise ValueError(f"no captured requests in {', '.join(map(str, paths))}")
+    start = entries[0]["ts"]
+    replay = []
+    seen: set[str] = set()
+    for entry in entries:
+        body = entry.get("payload") or redacted_body(entry["redacted"])
+        key = (
+            entry["redacted"]["sha256"] if "redacted" in entry else json.dumps(body, sort_keys=True)
+        )
+        body.pop("stream", None)
+        body.pop("stream_options", None)
+        path = entry["path"]
+        kind = "embed" if path == "/embed" else "chat-stream" if entry["stream"] else "chat"
+        spec = RequestSpec(path, body, kind=kind, stream=entry["stream"], repeat=key in seen)
+        seen.add(key)
+        replay.append(((entry["ts"] - start) / speed, spec))
+    return replay
+
+
+class ReplayWorkload:
+    def __init__(self, specs: list[RequestSpec]) -> None:
+        self._specs = iter(specs)
+
+    def next_request(self) -> RequestSpec:
+        return next(self._specs)
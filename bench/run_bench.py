@@ -2,25 +2,65 @@ from __future__ import annotations
 
 import argparse
 import asyncio
+import csv
 import json
+import math
+import multiprocessing
 import random
+import secrets
+import sys
 import time
-from dataclasses import dataclass
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Any
 
 import httpx
 
+from bench.histogram import Histogram
+from bench.history import (
+    SCHEMA_VERSION,
+    Thresholds,
+    compare_results,
+    config_differences,
+    environment,
+    git_info,
+    histogram_summary,
+    load_history,
+    load_result,
+    render_checks,
+    render_trend,
+    series_key,
+    write_result,
+)
+from bench.replay import ReplayWorkload, load_capture
+from bench.scenarios import (
+    PromptWorkload,
+    RequestSpec,
+    Scenario,
+    ScenarioWorkload,
+    builtin_scenarios,
+    load_scenario,
+)
+
 PROMPTS_PATH = Path("data/prompts.jsonl")
 REPORTS_DIR = Path("reports")
-
-
-def percentile(values: list[float], pct: float) -> float:
-    if not values:
-        return 0.0
-    sorted_values = sorted(values)
-    k = int(round((pct / 100) * (len(sorted_values) - 1)))
-    return sorted_values[k]
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+RECORD_FIELDS = [
+    "step",
+    "kind",
+    "repeat",
+    "status",
+    "error",
+    "latency_s",
+    "ttft_s",
+    "tpot_s",
+    "itl_mean_s",
+    "itl_max_s",
+    "output_tokens",
+    "tokens",
+]
 
 
 @dataclass
@@ -28,6 +68,99 @@ class BenchResult:
     latency_s: float
     tokens: int
     error: bool
+    status: int = 0
+    step: int = 0
+    ttft_s: float | None = None
+    itl_s: list[float] = field(default_factory=list)
+    output_tokens: int = 0
+    kind: str = "chat"
+    repeat: bool = False
+
+    @property
+    def tpot_s(self) -> float | None:
+        if self.ttft_s is None or self.output_tokens < 2:
+            return None
+        return (self.latency_s - self.ttft_s) / (self.output_tokens - 1)
+
+    def to_record(self) -> dict[str, Any]:
+        return {
+            "step": self.step,
+            "kind": self.kind,
+            "repeat": self.repeat,
+            "status": self.status,
+            "error": self.error,
+            "latency_s": self.latency_s,
+            "ttft_s": self.ttft_s,
+            "tpot_s": self.tpot_s,
+            "itl_mean_s": sum(self.itl_s) / len(self.itl_s) if self.itl_s else None,
+            "itl_max_s": max(self.itl_s) if self.itl_s else None,
+            "output_tokens": self.output_tokens,
+            "tokens": self.tokens,
+        }
+
+
+@dataclass(frozen=True)
+class Step:
+    rps: float
+    seconds: float
+
+
+@dataclass
+class StepStats:
+    target_rps: float
+    seconds: float
+    latency: Histogram = field(default_factory=Histogram)
+    ttft: Histogram = field(default_factory=Histogram)
+    itl: Histogram = field(default_factory=Histogram)
+    tpot: Histogram = field(default_factory=Histogram)
+    records: list[BenchResult] = field(default_factory=list)
+    sent: int = 0
+    errors: int = 0
+    tokens: int = 0
+    max_send_lag_s: float = 0.0
+
+    def add(self, result: BenchResult) -> None:
+        self.records.append(result)
+        self.latency.record(result.latency_s)
+        self.sent += 1
+        self.errors += int(result.error)
+        self.tokens += result.tokens
+        if result.error:
+            return
+        if result.ttft_s is not None:
+            self.ttft.record(result.ttft_s)
+        for gap in result.itl_s:
+            self.itl.record(gap)
+        if result.tpot_s is not None:
+            self.tpot.record(result.tpot_s)
+
+    def merge(self, other: StepStats) -> None:
+        self.records.extend(other.records)
+        self.latency.merge(other.latency)
+        self.ttft.merge(other.ttft)
+        self.itl.merge(other.itl)
+        self.tpot.merge(other.tpot)
+        self.sent += other.sent
+        self.errors += other.errors
+        self.tokens += other.tokens
+        self.max_send_lag_s = max(self.max_send_lag_s, other.max_send_lag_s)
+
+
+@dataclass
+class Shard:
+    gateway_url: str
+    model: str
+    seed: int
+    steps: list[Step]
+    arrivals: list[tuple[float, int]] = field(default_factory=list)
+    start_at: float = 0.0
+    total_requests: int = 0
+    concurrency: int = 0
+    max_connections: int = 1000
+    stream: bool = False
+    scenario: Scenario | None = None
+    nonce: str = ""
+    replay: list[RequestSpec] | None = None
 
 
 def load_prompts() -> list[dict[str, Any]]:
@@ -38,97 +171,611 @@ def load_prompts() -> list[dict[str, Any]]:
     return prompts
 
 
+def parse_schedule(text: str) -> list[Step]:
+    steps = []
+    for part in text.split(","):
+        rps, _, seconds = part.strip().partition(":")
+        steps.append(Step(float(rps), float(seconds)))
+    if not steps or any(step.rps <= 0 or step.seconds <= 0 for step in steps):
+        raise ValueError(f"invalid schedule: {text!r} (expected rps:seconds,...)")
+    return steps
+
+
+def ramp_schedule(text: str) -> list[Step]:
+    start, end, step, seconds = (float(value) for value in text.split(":"))
+    if start <= 0 or step <= 0 or end < start:
+        raise ValueError(f"invalid ramp: {text!r} (expected start:end:step:seconds)")
+    count = int((end - start) / step + 1e-9) + 1
+    return [Step(start + index * step, seconds) for index in range(count)]
+
+
+def arrival_offsets(
+    steps: list[Step], arrival: str, rng: random.Random
+) -> Iterator[tuple[float, int]]:
+    base = 0.0
+    for index, step in enumerate(steps):
+        if arrival == "poisson":
+            offset = base + rng.expovariate(step.rps)
+            while offset < base + step.seconds:
+                yield offset, index
+                offset += rng.expovariate(step.rps)
+        else:
+            for position in range(math.ceil(step.rps * step.seconds - 1e-9)):
+                yield base + position / step.rps, index
+        base += step.seconds
+
+
 async def send_request(
     client: httpx.AsyncClient,
-    url: str,
-    model: str,
-    payload: dict[str, Any],
+    base_url: str,
+    spec: RequestSpec,
+    intended_start: float | None = None,
+    step: int = 0,
 ) -> BenchResult:
-    start = time.time()
-    tokens = 0
+    loop = asyncio.get_running_loop()
+    start = intended_start if intended_start is not None else loop.time()
+    url = f"{base_url.rstrip('/')}{spec.path}"
+    body = dict(spec.body)
+    result = BenchResult(
+        latency_s=0.0, tokens=0, error=False, step=step, kind=spec.kind, repeat=spec.repeat
+    )
     try:
-        response = await client.post(
-            url,
-            json={
-                "model": model,
-                "messages": payload["messages"],
-                "max_tokens": payload.get("max_tokens", 128),
-            },
-            timeout=120,
-        )
-        response.raise_for_status()
-        data = response.json()
-        usage = data.get("usage") or {}
-        tokens = sum(value for value in usage.values() if isinstance(value, int))
-        return BenchResult(latency_s=time.time() - start, tokens=tokens, error=False)
+        if spec.stream:
+            body["stream"] = True
+            body["stream_options"] = {"include_usage": True}
+            await read_stream(client, url, body, start, result)
+        else:
+            response = await client.post(url, json=body, timeout=120)
+            result.status = response.status_code
+            response.raise_for_status()
+            usage = response.json().get("usage") or {}
+            result.tokens = sum(value for value in usage.values() if isinstance(value, int))
+            result.output_tokens = usage.get("completion_tokens", 0)
     except (httpx.HTTPError, ValueError):
-        return BenchResult(latency_s=time.time() - start, tokens=0, error=True)
+        result.error = True
+    result.latency_s = loop.time() - start
+    return result
+
+
+async def read_stream(
+    client: httpx.AsyncClient,
+    url: str,
+    body: dict[str, Any],
+    start: float,
+    result: BenchResult,
+) -> None:
+    loop = asyncio.get_running_loop()
+    last_token: float | None = None
+    deltas = 0
+    usage: dict[str, Any] = {}
+    async with client.stream("POST", url, json=body, timeout=120) as response:
+        result.status = response.status_code
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            usage = event.get("usage") or usage
+            for choice in event.get("choices") or ():
+                if not (choice.get("delta") or {}).get("content"):
+                    continue
+                now = loop.time()
+                if last_token is None:
+                    result.ttft_s = now - start
+                else:
+                    result.itl_s.append(now - last_token)
+                last_token = now
+                deltas += 1
+    result.output_tokens = usage.get("completion_tokens", deltas)
+    result.tokens = usage.get("total_tokens", deltas)
 
 
-async def run_benchmark(args: argparse.Namespace) -> None:
-    prompts = load_prompts()
-    total = args.total_requests
-    concurrency = args.concurrency
-    url = f"{args.gateway_url.rstrip('/')}/chat"
+def build_client(max_connections: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=max_connections, max_keepalive_connections=max_connections
+    )
+    return httpx.AsyncClient(limits=limits)
 
-    results: list[BenchResult] = []
-    start_time = time.time()
 
-    sem = asyncio.Semaphore(concurrency)
+def build_workload(shard: Shard) -> PromptWorkload | ScenarioWorkload | ReplayWorkload:
+    if shard.replay is not None:
+        return ReplayWorkload(shard.replay)
+    rng = random.Random(shard.seed)
+    if shard.scenario is not None:
+        return ScenarioWorkload(shard.scenario, shard.model, rng, shard.nonce)
+    return PromptWorkload(load_prompts(), shard.model, shard.stream, rng)
 
-    async with httpx.AsyncClient() as client:
+
+async def run_closed_loop(shard: Shard) -> list[StepStats]:
+    workload = build_workload(shard)
+    stats = StepStats(target_rps=0.0, seconds=0.0)
+    sem = asyncio.Semaphore(shard.concurrency)
+
+    async with build_client(shard.max_connections) as client:
+        await asyncio.sleep(max(0.0, shard.start_at - time.time()))
 
         async def worker() -> None:
-            prompt = random.choice(prompts)
+            spec = workload.next_request()
             async with sem:
-                result = await send_request(client, url, args.model, prompt)
-                results.append(result)
+                stats.add(await send_request(client, shard.gateway_url, spec))
+
+        await asyncio.gather(*(worker() for _ in range(shard.total_requests)))
+    return [stats]
+
+
+async def run_open_loop(shard: Shard) -> list[StepStats]:
+    workload = build_workload(shard)
+    stats = [StepStats(step.rps, step.seconds) for step in shard.steps]
+    loop = asyncio.get_running_loop()
+    pending: set[asyncio.Task[None]] = set()
+
+    async with build_client(shard.max_connections) as client:
+        base = loop.time() + max(0.0, shard.start_at - time.time())
+
+        async def fire(intended: float, index: int, spec: RequestSpec) -> None:
+            stats[index].add(await send_request(client, shard.gateway_url, spec, intended, index))
+
+        for offset, index in shard.arrivals:
+            intended = base + offset
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            step = stats[index]
+            step.max_send_lag_s = max(step.max_send_lag_s, loop.time() - intended)
+            task = asyncio.create_task(fire(intended, index, workload.next_request()))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+    return stats
+
+
+async def run_local(shard: Shard) -> list[StepStats]:
+    if shard.arrivals:
+        return await run_open_loop(shard)
+    return await run_closed_loop(shard)
 
-        await asyncio.gather(*(worker() for _ in range(total)))
 
-    duration = time.time() - start_time
-    latencies = [r.latency_s for r in results]
-    errors = [r for r in results if r.error]
-    tokens_total = sum(r.tokens for r in results)
+def run_shard(shard: Shard) -> list[StepStats]:
+    return asyncio.run(run_local(shard))
 
-    p50 = percentile(latencies, 50)
-    p95 = percentile(latencies, 95)
+
+def build_shards(args: argparse.Namespace, steps: list[Step]) -> list[Shard]:
+    processes = max(1, args.processes)
+    nonce = secrets.token_hex(4)
+    shards = [
+        Shard(
+            gateway_url=args.gateway_url,
+            model=args.model,
+            seed=args.seed + index,
+            steps=steps,
+            max_connections=args.max_connections,
+            stream=args.stream,
+            scenario=args.scenario,
+            nonce=nonce,
+        )
+        for index in range(processes)
+    ]
+    start_at = time.time() + (2.0 if processes > 1 else 0.0)
+    if args.replay:
+        arrivals = [(offset, 0) for offset, _ in args.replay]
+        specs = [spec for _, spec in args.replay]
+    else:
+        arrivals = list(arrival_offsets(steps, args.arrival, random.Random(args.seed)))
+    for index, shard in enumerate(shards):
+        shard.start_at = start_at
+        shard.arrivals = arrivals[index::processes]
+        if args.replay:
+            shard.replay = specs[index::processes]
+        if not steps:
+            shard.total_requests = share(args.total_requests, processes, index)
+            shard.concurrency = max(1, share(args.concurrency, processes, index))
+    return [shard for shard in shards if shard.arrivals or shard.total_requests]
+
+
+def share(total: int, parts: int, index: int) -> int:
+    return total // parts + int(index < total % parts)
+
+
+async def execute(shards: list[Shard]) -> list[StepStats]:
+    if len(shards) == 1:
+        return await run_local(shards[0])
+    loop = asyncio.get_running_loop()
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(shards), mp_context=context) as pool:
+        results = await asyncio.gather(
+            *(loop.run_in_executor(pool, run_shard, shard) for shard in shards)
+        )
+    merged = results[0]
+    for shard_stats in results[1:]:
+        for total, part in zip(merged, shard_stats, strict=True):
+            total.merge(part)
+    return merged
+
+
+def apply_scenario(args: argparse.Namespace, scenario: Scenario) -> argparse.Namespace:
+    return argparse.Namespace(
+        **{
+            **vars(args),
+            "scenario": scenario,
+            "seed": scenario.seed,
+            "rps": scenario.rps,
+            "duration": scenario.duration_s,
+            "schedule": scenario.schedule,
+            "ramp": None,
+            "arrival": scenario.arrival,
+            "concurrency": scenario.concurrency,
+            "total_requests": scenario.total_requests,
+            "stream": False,
+        }
+    )
+
+
+def resolve_steps(args: argparse.Namespace) -> list[Step]:
+    if args.replay:
+        seconds = max(args.replay[-1][0], 1e-3)
+        return [Step(len(args.replay) / seconds, seconds)]
+    if args.schedule:
+        return parse_schedule(args.schedule)
+    if args.ramp:
+        return ramp_schedule(args.ramp)
+    if args.rps:
+        seconds = args.duration or args.total_requests / args.rps
+        return [Step(args.rps, seconds)]
+    return []
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    steps = resolve_steps(args)
+    shards = build_shards(args, steps)
+    created_at = time.time()
+    stats = await execute(shards)
+    duration = time.time() - shards[0].start_at
+
+    overall = StepStats(target_rps=0.0, seconds=duration)
+    for step in stats:
+        overall.merge(step)
+    total = overall.sent
+    latency = overall.latency
     throughput = total / duration if duration else 0
-    tokens_per_sec = tokens_total / duration if duration else 0
-    error_rate = len(errors) / total if total else 0
+    tokens_per_sec = overall.tokens / duration if duration else 0
+    error_rate = overall.errors / total if total else 0
 
     REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+    if args.replay:
+        mode = f"replay at {args.speed:g}x speed"
+        load = f"- Capture: {', '.join(args.capture)} over {steps[0].seconds:.1f}s"
+    elif steps:
+        mode = f"open loop, {args.arrival} arrivals"
+        load = f"- Schedule: {', '.join(f'{s.rps:g} rps x {s.seconds:g}s' for s in steps)}"
+    else:
+        mode = "closed loop"
+        load = f"- Concurrency: {args.concurrency}"
+    if args.stream:
+        mode += ", streaming"
+    scenario: Scenario | None = args.scenario
     report_lines = [
-        "# Benchmark Report",
+        "# Benchmark Report" if scenario is None else f"# Benchmark Report: {scenario.name}",
         "",
+    ]
+    if scenario is not None:
+        report_lines += [
+            f"- Scenario: {scenario.description or scenario.name}",
+            f"- Target cache-hit ratio: {scenario.cache_hit_ratio:.0%}",
+        ]
+    report_lines += [
+        f"- Mode: {mode}",
+        f"- Processes: {len(shards)}",
         f"- Total requests: {total}",
-        f"- Concurrency: {concurrency}",
+        load,
         f"- Duration: {duration:.2f}s",
-        f"- p50 latency: {p50:.3f}s",
-        f"- p95 latency: {p95:.3f}s",
+        f"- p50 latency: {latency.percentile(50):.3f}s",
+        f"- p95 latency: {latency.percentile(95):.3f}s",
+        f"- p99 latency: {latency.percentile(99):.3f}s",
+        f"- Max latency: {latency.max:.3f}s",
         f"- RPS: {throughput:.2f}",
         f"- Tokens/sec (approx): {tokens_per_sec:.2f}",
         f"- Error rate: {error_rate:.2%}",
+        "",
+        "| metric (ms) | p50 | p90 | p99 | p99.9 | max | samples |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
     ]
+    for name, histogram in (
+        ("latency", overall.latency),
+        ("ttft", overall.ttft),
+        ("itl", overall.itl),
+        ("tpot", overall.tpot),
+    ):
+        if histogram.count:
+            cells = " | ".join(f"{histogram.percentile(pct) * 1000:.2f}" for pct in PERCENTILES)
+            report_lines.append(
+                f"| {name} | {cells} | {histogram.max * 1000:.2f} | {histogram.count} |"
+            )
+    if steps:
+        report_lines += [
+            "",
+            "Latency is measured from each request's intended send time.",
+            "",
+            "| target rps | sent rps | p50 s | p95 s | p99 s | max s | errors | send lag s |",
+            "| --- | --- | --- | --- | --- | --- | --- | --- |",
+        ]
+        for step in stats:
+            report_lines.append(
+                f"| {step.target_rps:g} | {step.sent / step.seconds:.2f} "
+                f"| {step.latency.percentile(50):.3f} | {step.latency.percentile(95):.3f} "
+                f"| {step.latency.percentile(99):.3f} | {step.latency.max:.3f} "
+                f"| {step.errors} | {step.max_send_lag_s:.3f} |"
+            )
+    if scenario is not None or args.replay:
+        report_lines += [
+            "",
+            "| request kind | requests | errors | p50 s | p95 s | p99 s | max s |",
+            "| --- | --- | --- | --- | --- | --- | --- |",
+        ]
+        for kind, histogram, errors in breakdown(overall.records):
+            report_lines.append(
+                f"| {kind} | {histogram.count} | {errors} | {histogram.percentile(50):.3f} "
+                f"| {histogram.percentile(95):.3f} | {histogram.percentile(99):.3f} "
+                f"| {histogram.max:.3f} |"
+            )
 
-    report_path = REPORTS_DIR / f"bench-{int(time.time())}.md"
+    run_id = f"bench-{int(time.time())}"
+    if scenario is not None:
+        run_id += f"-{scenario.name}"
+    report_path = REPORTS_DIR / f"{run_id}.md"
     latest_path = REPORTS_DIR / "latest.md"
     report_content = "\n".join(report_lines)
     report_path.write_text(report_content)
     latest_path.write_text(report_content)
+    write_records(report_path, overall.records)
+
+    result = {
+        "schema": SCHEMA_VERSION,
+        "run_id": run_id,
+        "created_at": created_at,
+        "config": {
+            **{key: value for key, value in vars(args).items() if key != "replay"},
+            "scenario": scenario.to_dict() if scenario is not None else None,
+            "mode": "replay" if args.replay else "open" if steps else "closed",
+            "steps": [[step.rps, step.seconds] for step in steps],
+            "processes": len(shards),
+        },
+        "environment": environment(),
+        "git": git_info(),
+        "summary": {
+            "requests": total,
+            "errors": overall.errors,
+            "error_rate": error_rate,
+            "duration_s": duration,
+            "rps": throughput,
+            "tokens_per_sec": tokens_per_sec,
+            **{
+                f"{name}_s": histogram_summary(histogram)
+                for name, histogram in (
+                    ("latency", overall.latency),
+                    ("ttft", overall.ttft),
+                    ("itl", overall.itl),
+                    ("tpot", overall.tpot),
+                )
+                if histogram.count or name == "latency"
+            },
+        },
+        "steps": [
+            {
+                "target_rps": step.target_rps,
+                "seconds": step.seconds,
+                "sent": step.sent,
+                "errors": step.errors,
+                "max_send_lag_s": step.max_send_lag_s,
+                "latency_s": histogram_summary(step.latency),
+            }
+            for step in stats
+        ]
+        if steps
+        else [],
+        "histograms": {
+            "latency": overall.latency.to_dict(),
+            "ttft": overall.ttft.to_dict(),
+            "itl": overall.itl.to_dict(),
+            "tpot": overall.tpot.to_dict(),
+        },
+    }
+    write_result(report_path.with_suffix(".json"), result)
+    write_result(REPORTS_DIR / "latest.json", result)
+    if scenario is not None:
+        write_result(REPORTS_DIR / f"latest-{scenario.name}.json", result)
 
     print(f"Report written to {report_path}")
+    print(f"Per-request records: {report_path.with_suffix('.jsonl')}, .csv")
+    print(f"Structured result: {report_path.with_suffix('.json')}")
     print(f"Latest report updated at {latest_path}")
+    return result
+
 
+def breakdown(records: list[BenchResult]) -> list[tuple[str, Histogram, int]]:
+    groups: dict[str, tuple[Histogram, list[int]]] = {}
+    for record in records:
+        kind = f"{record.kind} ({'repeat' if record.repeat else 'fresh'})"
+        histogram, errors = groups.setdefault(kind, (Histogram(), [0]))
+        histogram.record(record.latency_s)
+        errors[0] += int(record.error)
+    return [(kind, histogram, errors[0]) for kind, (histogram, errors) in sorted(groups.items())]
 
-def parse_args() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Benchmark gateway /chat endpoint")
+
+async def run_suite(args: argparse.Namespace, names: list[str]) -> None:
+    results = []
+    for name in names:
+        print(f"== scenario {name}")
+        results.append(await run_benchmark(apply_scenario(args, load_scenario(name))))
+    lines = [
+        "# Benchmark Suite",
+        "",
+        "| scenario | requests | rps | p50 s | p95 s | p99 s | error rate | result |",
+        "| --- | --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for result in results:
+        summary = result["summary"]
+        latency = summary["latency_s"]
+        lines.append(
+            f"| {result['config']['scenario']['name']} | {summary['requests']} "
+            f"| {summary['rps']:.2f} | {latency['p50']:.3f} | {latency['p95']:.3f} "
+            f"| {latency['p99']:.3f} | {summary['error_rate']:.2%} | {result['run_id']}.json |"
+        )
+    suite_path = REPORTS_DIR / f"suite-{int(time.time())}.md"
+    suite_path.write_text("\n".join(lines) + "\n")
+    print("\n".join(lines))
+    print(f"Suite summary written to {suite_path}")
+
+
+def write_records(report_path: Path, records: list[BenchResult]) -> None:
+    rows = [record.to_record() for record in records]
+    with report_path.with_suffix(".jsonl").open("w") as handle:
+        for row in rows:
+            handle.write(json.dumps(row) + "\n")
+    with report_path.with_suffix(".csv").open("w", newline="") as handle:
+        writer = csv.DictWriter(handle, fieldnames=RECORD_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def compare(args: argparse.Namespace) -> int:
+    candidate = load_result(args.candidate)
+    if not args.baseline.exists():
+        if args.update_baseline:
+            write_result(args.baseline, candidate)
+            print(f"Baseline {args.baseline} created from {args.candidate}")
+            return 0
+        print(f"Baseline {args.baseline} not found; create one with --update-baseline")
+        return 2
+    baseline = load_result(args.baseline)
+    thresholds = Thresholds(
+        max_p95_increase_pct=args.max_p95_increase,
+        max_rps_decrease_pct=args.max_rps_decrease,
+        max_error_rate=args.max_error_rate,
+    )
+    checks = compare_results(baseline, candidate, thresholds)
+    regressed = not all(check.passed for check in checks)
+    lines = [
+        f"# Benchmark comparison: {candidate['run_id']} vs baseline {baseline['run_id']}",
+        "",
+        *render_checks(checks),
+    ]
+    differences = config_differences(baseline, candidate)
+    if differences:
+        lines += ["", "Warning: runs used different load settings:"]
+        lines += [f"- {difference}" for difference in differences]
+    history = load_history(args.history_dir, args.trend, like=candidate)
+    if history:
+        scenario, mode = series_key(candidate)
+        heading = f"## Recent runs: scenario {scenario or 'none'}, mode {mode}"
+        lines += ["", heading, "", *render_trend(history)]
+    lines += ["", "Result: REGRESSION" if regressed else "Result: OK"]
+    print("\n".join(lines))
+    if args.update_baseline and not regressed:
+        write_result(args.baseline, candidate)
+        print(f"Baseline updated from {args.candidate}")
+    return 1 if regressed else 0
+
+
+def parse_compare_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="run_bench compare", description="Check a benchmark result against a baseline"
+    )
+    parser.add_argument("--baseline", type=Path, default=REPORTS_DIR / "baseline.json")
+    parser.add_argument("--candidate", type=Path, default=REPORTS_DIR / "latest.json")
+    parser.add_argument("--max-p95-increase", type=float, default=10.0, help="percent")
+    parser.add_argument("--max-rps-decrease", type=float, default=10.0, help="percent")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="fraction, 0.01 = 1%%")
+    parser.add_argument("--history-dir", type=Path, default=REPORTS_DIR)
+    parser.add_argument("--trend", type=int, default=10, help="recent runs in the trend table")
+    parser.add_argument(
+        "--update-baseline", action="store_true", help="save the candidate as the new baseline"
+    )
+    return parser.parse_args(argv)
+
+
+def parse_replay_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="run_bench replay", description="Replay captured gateway traffic with its timing"
+    )
+    parser.add_argument(
+        "capture", nargs="+", help="capture file (rotated siblings included) or dir"
+    )
+    parser.add_argument("--gateway-url", default="http://localhost:8000")
+    parser.add_argument("--speed", type=float, default=1.0, help="2 replays twice as fast")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    args = parser.parse_args(argv)
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+    replay = load_capture([Path(path) for path in args.capture], args.speed, args.limit)
+    return argparse.Namespace(
+        **vars(args),
+        replay=replay,
+        model="",
+        total_requests=len(replay),
+        concurrency=0,
+        rps=None,
+        duration=None,
+        schedule=None,
+        ramp=None,
+        arrival="replay",
+        stream=False,
+        seed=0,
+        scenario=None,
+    )
+
+
+def parse_args(argv: list[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Benchmark gateway /chat endpoint",
+        epilog=(
+            "Subcommands: 'run_bench compare --help' (regression gate), "
+            "'run_bench replay --help' (captured traffic)."
+        ),
+    )
     parser.add_argument("--gateway-url", default="http://localhost:8000")
     parser.add_argument("--model", default="Qwen/Qwen2-0.5B-Instruct")
     parser.add_argument("--total-requests", type=int, default=50)
     parser.add_argument("--concurrency", type=int, default=5)
-    return parser.parse_args()
+    parser.add_argument("--rps", type=float, help="open loop: fixed arrival rate")
+    parser.add_argument("--duration", type=float, help="open loop: seconds at --rps")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="poisson")
+    parser.add_argument("--schedule", help="open loop steps, e.g. 10:30,20:30,40:30 (rps:seconds)")
+    parser.add_argument("--ramp", help="open loop ramp start:end:step:seconds, e.g. 10:100:10:20")
+    parser.add_argument("--stream", action="store_true", help="measure TTFT/ITL/TPOT over SSE")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--max-connections", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--scenario",
+        dest="scenarios",
+        action="append",
+        help="scenario name from data/scenarios or a .toml path; repeat to run several",
+    )
+    parser.add_argument("--suite", action="store_true", help="run every built-in scenario")
+    parser.set_defaults(scenario=None, replay=None)
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> int:
+    if argv[:1] == ["compare"]:
+        return compare(parse_compare_args(argv[1:]))
+    if argv[:1] == ["replay"]:
+        asyncio.run(run_benchmark(parse_replay_args(argv[1:])))
+        return 0
+    args = parse_args(argv)
+    names = builtin_scenarios() if args.suite else args.scenarios
+    if names:
+        asyncio.run(run_suite(args, names))
+    else:
+        asyncio.run(run_benchmark(args))
+    return 0
 
 
 if __name__ == "__main__":
-    asyncio.run(run_benchmark(parse_args()))
+    sys.exit(main(sys.argv[1:]))
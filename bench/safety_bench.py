@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import argparse
+import random
+import string
+import time
+
+from gateway.app.safety import SafetyChecker
+
+
+class NaiveSafetyChecker:
+    def __init__(self, denylist_words: list[str]) -> None:
+        self._denylist = {word.lower() for word in denylist_words}
+
+    def check(self, payload: dict[str, object]) -> bool:
+        messages = payload.get("messages", [])
+        if isinstance(messages, list):
+            for message in messages:
+                if not isinstance(message, dict):
+                    continue
+                content = str(message.get("content", "")).lower()
+                if any(word in content for word in self._denylist):
+                    return False
+        return True
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12)))
+
+
+def time_check(checker: SafetyChecker | NaiveSafetyChecker, payload: dict[str, object]) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        checker.check(payload)
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if elapsed > 0.2:
+            return elapsed / calls
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    print("# SafetyChecker.check() latency (clean prompt, worst case: full scan)")
+    print("")
+    print(
+        "| denylist terms | prompt chars | previous us/call | fallback backend "
+        "| fallback us/call | automaton us/call | speedup |"
+    )
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+    for terms in args.terms:
+        words = [random_word(rng) for _ in range(terms)]
+        naive = NaiveSafetyChecker(words)
+        fallback = SafetyChecker(max_tokens_cap=512, denylist_words=words, use_automaton=False)
+        automaton = SafetyChecker(max_tokens_cap=512, denylist_words=words)
+        for chars in args.chars:
+            text = "".join(rng.choices(string.ascii_letters + "  ", k=chars))
+            payload: dict[str, object] = {
+                "messages": [
+                    {"role": "system", "content": "You are a helpful assistant."},
+                    {"role": "user", "content": text},
+                ]
+            }
+            naive_s = time_check(naive, payload)
+            fallback_s = time_check(fallback, payload)
+            automaton_cell = automaton.backend
+            best_s = fallback_s
+            if automaton.backend == "automaton":
+                best_s = time_check(automaton, payload)
+                automaton_cell = f"{best_s * 1e6:.1f}"
+            print(
+                f"| {terms} | {chars} | {naive_s * 1e6:.1f} | {fallback.backend} "
+                f"| {fallback_s * 1e6:.1f} "
+                f"| {automaton_cell} | {naive_s / best_s:.1f}x |"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark the safety denylist")
+    parser.add_argument("--terms", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--chars", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
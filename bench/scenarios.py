@@ -0,0 +1,263 @@
+from __future__ import annotations
+
+import math
+import random
+import tomllib
+from dataclasses import asdict, dataclass, field, replace
+from pathlib import Path
+from typing import Any
+
+SCENARIOS_DIR = Path("data/scenarios")
+DISTRIBUTIONS = {
+    "fixed": {"value"},
+    "uniform": {"min", "max"},
+    "normal": {"mean", "stddev"},
+    "lognormal": {"median", "sigma"},
+}
+SCENARIO_KEYS = {
+    "name",
+    "description",
+    "seed",
+    "rps",
+    "duration_s",
+    "schedule",
+    "arrival",
+    "concurrency",
+    "total_requests",
+    "cache_hit_ratio",
+    "hot_set_size",
+    "mix",
+    "chat",
+    "embed",
+}
+SYSTEM_PROMPT = "You are a helpful assistant. Answer accurately and concisely."
+VOCABULARY = (
+    "the service gateway model request latency token cache replica queue batch stream "
+    "throughput prompt response cluster memory kernel scheduler budget metric trace error "
+    "retry timeout network packet storage index vector search policy deploy rollout region "
+    "window buffer context summary report analyze explain compare describe list outline "
+    "quickly carefully briefly with for from into over under about between during after"
+).split()
+
+
+@dataclass(frozen=True)
+class Distribution:
+    kind: str = "fixed"
+    value: float = 0.0
+    low: float = 1.0
+    high: float | None = None
+    mean: float = 0.0
+    stddev: float = 0.0
+    median: float = 0.0
+    sigma: float = 0.0
+
+    @classmethod
+    def from_value(cls, value: Any, where: str) -> Distribution:
+        if isinstance(value, int | float) and not isinstance(value, bool):
+            return cls(kind="fixed", value=float(value))
+        if not isinstance(value, dict):
+            raise ValueError(f"{where}: expected a number or a distribution table")
+        options = dict(value)
+        kind = options.pop("distribution", "fixed")
+        if kind not in DISTRIBUTIONS:
+            raise ValueError(f"{where}: unknown distribution {kind!r}")
+        allowed = DISTRIBUTIONS[kind] | {"min", "max"}
+        unknown = set(options) - allowed
+        missing = DISTRIBUTIONS[kind] - set(options)
+        if unknown or missing:
+            raise ValueError(
+                f"{where}: {kind} takes {sorted(allowed)}, "
+                f"missing {sorted(missing)}, unknown {sorted(unknown)}"
+            )
+        low = float(options.pop("min", 1))
+        high = float(options["max"]) if "max" in options else None
+        options.pop("max", None)
+        if high is not None and low > high:
+            raise ValueError(f"{where}: min must not exceed max")
+        return cls(kind=kind, low=low, high=high, **{k: float(v) for k, v in options.items()})
+
+    def sample(self, rng: random.Random) -> int:
+        if self.kind == "uniform":
+            value = rng.uniform(self.low, self.high or self.low)
+        elif self.kind == "normal":
+            value = rng.gauss(self.mean, self.stddev)
+        elif self.kind == "lognormal":
+            value = self.median * math.exp(rng.gauss(0.0, self.sigma))
+        else:
+            value = self.value
+        if self.high is not None:
+            value = min(value, self.high)
+        return max(1, round(max(value, self.low)))
+
+
+@dataclass
+class Scenario:
+    name: str
+    description: str = ""
+    seed: int = 0
+    rps: float | None = None
+    duration_s: float | None = None
+    schedule: str | None = None
+    arrival: str = "poisson"
+    concurrency: int = 5
+    total_requests: int = 50
+    cache_hit_ratio: float = 0.0
+    hot_set_size: int = 100
+    chat_weight: float = 1.0
+    embed_weight: float = 0.0
+    stream_ratio: float = 0.0
+    prompt_tokens: Distribution = field(default_factory=lambda: Distribution(value=64.0))
+    output_tokens: Distribution = field(default_factory=lambda: Distribution(value=64.0))
+    embed_inputs: Distribution = field(default_factory=lambda: Distribution(value=1.0))
+    embed_input_tokens: Distribution = field(default_factory=lambda: Distribution(value=32.0))
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def scenario_table(data: dict[str, Any], name: str, key: str, allowed: set[str]) -> dict[str, Any]:
+    table = data.get(key, {})
+    if not isinstance(table, dict):
+        raise ValueError(f"{name}: [{key}] must be a table")
+    unknown = set(table) - allowed
+    if unknown:
+        raise ValueError(f"{name}: unknown [{key}] keys {sorted(unknown)}")
+    return table
+
+
+def parse_scenario(data: dict[str, Any], default_name: str) -> Scenario:
+    name = str(data.get("name", default_name))
+    unknown = set(data) - SCENARIO_KEYS
+    if unknown:
+        raise ValueError(f"{name}: unknown keys {sorted(unknown)}")
+    mix = scenario_table(data, name, "mix", {"chat", "embed"})
+    chat = scenario_table(data, name, "chat", {"stream_ratio", "prompt_tokens", "output_tokens"})
+    embed = scenario_table(data, name, "embed", {"inputs", "input_tokens"})
+    scenario = Scenario(
+        name=name,
+        description=str(data.get("description", "")),
+        seed=int(data.get("seed", 0)),
+        rps=float(data["rps"]) if "rps" in data else None,
+        duration_s=float(data["duration_s"]) if "duration_s" in data else None,
+        schedule=data.get("schedule"),
+        arrival=str(data.get("arrival", "poisson")),
+        concurrency=int(data.get("concurrency", 5)),
+        total_requests=int(data.get("total_requests", 50)),
+        cache_hit_ratio=float(data.get("cache_hit_ratio", 0.0)),
+        hot_set_size=int(data.get("hot_set_size", 100)),
+        chat_weight=float(mix.get("chat", 1.0)),
+        embed_weight=float(mix.get("embed", 0.0)),
+        stream_ratio=float(chat.get("stream_ratio", 0.0)),
+    )
+    for attr, section, key in (
+        ("prompt_tokens", "chat", "prompt_tokens"),
+        ("output_tokens", "chat", "output_tokens"),
+        ("embed_inputs", "embed", "inputs"),
+        ("embed_input_tokens", "embed", "input_tokens"),
+    ):
+        table = chat if section == "chat" else embed
+        if key in table:
+            where = f"{name}: [{section}].{key}"
+            setattr(scenario, attr, Distribution.from_value(table[key], where))
+    if scenario.arrival not in ("constant", "poisson"):
+        raise ValueError(f"{name}: arrival must be 'constant' or 'poisson'")
+    if not 0.0 <= scenario.cache_hit_ratio <= 1.0 or not 0.0 <= scenario.stream_ratio <= 1.0:
+        raise ValueError(f"{name}: cache_hit_ratio and stream_ratio must be within [0, 1]")
+    if scenario.chat_weight < 0 or scenario.embed_weight < 0:
+        raise ValueError(f"{name}: mix weights must not be negative")
+    if scenario.chat_weight + scenario.embed_weight <= 0:
+        raise ValueError(f"{name}: mix weights must not all be zero")
+    if scenario.rps is not None and scenario.schedule is not None:
+        raise ValueError(f"{name}: set either rps or schedule, not both")
+    return scenario
+
+
+def load_scenario(name_or_path: str) -> Scenario:
+    path = Path(name_or_path)
+    if not path.suffix:
+        path = SCENARIOS_DIR / f"{name_or_path}.toml"
+    with path.open("rb") as handle:
+        return parse_scenario(tomllib.load(handle), path.stem)
+
+
+def builtin_scenarios() -> list[str]:
+    return sorted(path.stem for path in SCENARIOS_DIR.glob("*.toml"))
+
+
+def synthetic_text(rng: random.Random, tokens: int) -> str:
+    words: list[str] = []
+    chars = 0
+    while chars < tokens * 4:
+        word = rng.choice(VOCABULARY)
+        words.append(word)
+        chars += len(word) + 1
+    return " ".join(words)
+
+
+@dataclass
+class RequestSpec:
+    path: str
+    body: dict[str, Any]
+    kind: str = "chat"
+    stream: bool = False
+    repeat: bool = False
+
+
+class PromptWorkload:
+    def __init__(
+        self, prompts: list[dict[str, Any]], model: str, stream: bool, rng: random.Random
+    ) -> None:
+        self._prompts = prompts
+        self._model = model
+        self._stream = stream
+        self._rng = rng
+
+    def next_request(self) -> RequestSpec:
+        prompt = self._rng.choice(self._prompts)
+        body: dict[str, Any] = {
+            "model": self._model,
+            "messages": prompt["messages"],
+            "max_tokens": prompt.get("max_tokens", 128),
+        }
+        return RequestSpec("/chat", body, stream=self._stream)
+
+
+class ScenarioWorkload:
+    def __init__(self, scenario: Scenario, model: str, rng: random.Random, nonce: str) -> None:
+        self._scenario = scenario
+        self._model = model
+        self._rng = rng
+        self._nonce = nonce
+        self._sequence = 0
+        self._hot: list[RequestSpec] = []
+
+    def next_request(self) -> RequestSpec:
+        scenario = self._scenario
+        if self._hot and self._rng.random() < scenario.cache_hit_ratio:
+            return replace(self._rng.choice(self._hot), repeat=True)
+        self._sequence += 1
+        tag = f"[{self._nonce}-{self._sequence}]"
+        embed_share = scenario.embed_weight / (scenario.chat_weight + scenario.embed_weight)
+        if self._rng.random() < embed_share:
+            inputs = [
+                f"{tag} {synthetic_text(self._rng, scenario.embed_input_tokens.sample(self._rng))}"
+                for _ in range(scenario.embed_inputs.sample(self._rng))
+            ]
+            spec = RequestSpec("/embed", {"model": self._model, "input": inputs}, kind="embed")
+        else:
+            prompt = synthetic_text(self._rng, scenario.prompt_tokens.sample(self._rng))
+            stream = self._rng.random() < scenario.stream_ratio
+            body: dict[str, Any] = {
+                "model": self._model,
+                "messages": [
+                    {"role": "system", "content": SYSTEM_PROMPT},
+                    {"role": "user", "content": f"{tag} {prompt}"},
+                ],
+                "max_tokens": scenario.output_tokens.sample(self._rng),
+            }
+            spec = RequestSpec(
+                "/chat", body, kind="chat-stream" if stream else "chat", stream=stream
+            )
+        if len(self._hot) < scenario.hot_set_size:
+            self._hot.append(spec)
+        return spec
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import random
+import string
+import time
+from collections.abc import Callable
+from datetime import UTC, datetime
+from functools import partial
+from typing import Any
+
+import orjson
+
+from gateway.app.logging import JsonFormatter
+from gateway.app.serialization import ORJSONResponse
+
+
+class StdlibJsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "timestamp": datetime.now(UTC).isoformat(),
+            "level": record.levelname,
+            "message": record.getMessage(),
+            "logger": record.name,
+        }
+        if hasattr(record, "extra"):
+            payload.update(record.extra)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def stdlib_request(body: bytes, formatter: logging.Formatter, record: logging.LogRecord) -> None:
+    payload = json.loads(body)
+    json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    json.dumps({"detail": "ok", "messages": len(payload["messages"])}).encode()
+    formatter.format(record)
+
+
+def orjson_request(body: bytes, formatter: logging.Formatter, record: logging.LogRecord) -> None:
+    payload = orjson.loads(body)
+    orjson.dumps(payload)
+    ORJSONResponse({"detail": "ok", "messages": len(payload["messages"])})
+    formatter.format(record)
+
+
+def cpu_per_call(call: Callable[[], None]) -> float:
+    calls = 0
+    start = time.process_time()
+    while True:
+        call()
+        calls += 1
+        elapsed = time.process_time() - start
+        if elapsed > 0.2:
+            return elapsed / calls
+
+
+def build_body(rng: random.Random, messages: int, chars: int) -> bytes:
+    alphabet = string.ascii_letters + "     éü中"
+    body = {
+        "model": "mock-model",
+        "max_tokens": 128,
+        "messages": [
+            {
+                "role": "user" if index % 2 == 0 else "assistant",
+                "content": "".join(rng.choices(alphabet, k=chars)),
+            }
+            for index in range(messages)
+        ],
+    }
+    return json.dumps(body).encode()
+
+
+def run(args: argparse.Namespace) -> None:
+    rng = random.Random(args.seed)
+    record = logging.LogRecord("gateway", logging.INFO, __file__, 0, "chat_response", None, None)
+    record.extra = {"cached": False, "coalesced": False, "tokens": 128, "path": "/chat"}
+    stdlib_formatter, orjson_formatter = StdlibJsonFormatter(), JsonFormatter()
+    print("# Per-request JSON CPU: parse body, encode upstream body, render response, log line")
+    print("")
+    print(
+        "| messages | chars/message | body KiB | stdlib us/req | orjson us/req | saved us "
+        "| speedup |"
+    )
+    print("| --- | --- | --- | --- | --- | --- | --- |")
+    for messages in args.messages:
+        for chars in args.chars:
+            body = build_body(rng, messages, chars)
+            stdlib_s = cpu_per_call(partial(stdlib_request, body, stdlib_formatter, record))
+            orjson_s = cpu_per_call(partial(orjson_request, body, orjson_formatter, record))
+            print(
+                f"| {messages} | {chars} | {len(body) / 1024:.1f} | {stdlib_s * 1e6:.1f} "
+                f"| {orjson_s * 1e6:.1f} | {(stdlib_s - orjson_s) * 1e6:.1f} "
+                f"| {stdlib_s / orjson_s:.1f}x |"
+            )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Microbenchmark gateway JSON serialization")
+    parser.add_argument("--messages", type=int, nargs="+", default=[2, 16, 64])
+    parser.add_argument("--chars", type=int, nargs="+", default=[200, 2_000, 20_000])
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    run(parse_args())
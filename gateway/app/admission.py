@@ -0,0 +1,227 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Literal
+
+import httpx
+
+from gateway.app.metrics import (
+    record_admission_shed,
+    record_admission_state,
+    record_admission_wait,
+)
+from gateway.app.upstream import is_upstream_failure
+
+logger = logging.getLogger("gateway.admission")
+
+VLLM_WAITING_PATTERN = re.compile(r"^vllm:num_requests_waiting(?:\{[^}]*\})?\s+([0-9.eE+-]+)", re.M)
+
+RequestClass = Literal["stream", "unary", "embed"]
+
+
+class Overloaded(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+@dataclass(slots=True)
+class LatencyBaseline:
+    recent: float
+    baseline: float
+
+    def observe(self, sample: float) -> None:
+        self.recent = 0.7 * self.recent + 0.3 * sample
+        self.baseline = 0.98 * self.baseline + 0.02 * sample
+
+
+class Slot:
+    def __init__(self, limiter: AdaptiveLimiter, kind: RequestClass) -> None:
+        self._limiter = limiter
+        self._kind = kind
+        self._granted_at = limiter.clock()
+        self._released = False
+
+    def __enter__(self) -> Slot:
+        return self
+
+    def __exit__(self, exc_type: object, exc: BaseException | None, tb: object) -> None:
+        if exc is None:
+            self.release()
+        elif is_upstream_failure(exc):
+            self.release(ok=False)
+        else:
+            self.discard()
+
+    def release(self, ok: bool = True, sample: float | None = None) -> None:
+        if self._released:
+            return
+        self._released = True
+        held = self._limiter.clock() - self._granted_at
+        if sample is None and ok:
+            sample = held
+        self._limiter.release(ok, sample, self._kind, held)
+
+    def discard(self) -> None:
+        if not self._released:
+            self._released = True
+            self._limiter.release(True, None, self._kind, self._limiter.clock() - self._granted_at)
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        queue_size: int,
+        latency_tolerance: float = 2.0,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._queue_size = queue_size
+        self._tolerance = latency_tolerance
+        self._backoff = backoff
+        self.clock = clock
+        self.inflight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self._latency: dict[RequestClass, LatencyBaseline] = {}
+        self._hold: float | None = None
+        self._last_decrease = -math.inf
+
+    @property
+    def limit(self) -> int:
+        return max(self._min_limit, int(self._limit))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    def estimated_wait(self, position: int) -> float:
+        service_time = self._hold if self._hold is not None else 1.0
+        return position * service_time / self.limit
+
+    async def acquire(self, timeout: float, kind: RequestClass = "unary") -> Slot:
+        if self.inflight < self.limit and not self._waiters:
+            self.inflight += 1
+            self._publish()
+            return Slot(self, kind)
+
+        position = len(self._waiters) + 1
+        expected = self.estimated_wait(position)
+        if len(self._waiters) >= self._queue_size:
+            record_admission_shed("queue_full")
+            raise Overloaded("queue_full", expected)
+        if expected > timeout:
+            record_admission_shed("deadline")
+            raise Overloaded("deadline", expected)
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self._publish()
+        queued_at = self.clock()
+        try:
+            async with asyncio.timeout(timeout):
+                await waiter
+        except (TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                self.inflight -= 1
+                self._wake()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._publish()
+            if isinstance(exc, TimeoutError):
+                record_admission_shed("timeout")
+                raise Overloaded("timeout", self.estimated_wait(len(self._waiters) + 1)) from exc
+            raise
+        finally:
+            record_admission_wait(self.clock() - queued_at)
+        return Slot(self, kind)
+
+    def release(self, ok: bool, sample: float | None, kind: RequestClass, held: float) -> None:
+        self.inflight -= 1
+        self._hold = held if self._hold is None else 0.8 * self._hold + 0.2 * held
+        if not ok:
+            self._decrease()
+        elif sample is not None:
+            self._observe(kind, sample)
+        self._wake()
+
+    def observe_queue_depth(self, waiting: float, max_waiting: float) -> None:
+        if waiting > max_waiting:
+            self._decrease()
+            self._publish()
+
+    def _observe(self, kind: RequestClass, sample: float) -> None:
+        latency = self._latency.get(kind)
+        if latency is None:
+            latency = self._latency[kind] = LatencyBaseline(sample, sample)
+        else:
+            latency.observe(sample)
+        if latency.recent > latency.baseline * self._tolerance:
+            self._decrease()
+        elif self.inflight + 1 >= self.limit:
+            self._limit = min(self._max_limit, self._limit + 1 / self._limit)
+
+    def _decrease(self) -> None:
+        now = self.clock()
+        cooldown = self._hold if self._hold is not None else 0.0
+        if now - self._last_decrease < cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(self._min_limit, self._limit * self._backoff)
+
+    def _wake(self) -> None:
+        while self._waiters and self.inflight < self.limit:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            waiter.set_result(None)
+            self.inflight += 1
+        self._publish()
+
+    def _publish(self) -> None:
+        record_admission_state(self.limit, self.inflight, len(self._waiters))
+
+
+def parse_vllm_queue_depth(text: str) -> float | None:
+    values = [float(match) for match in VLLM_WAITING_PATTERN.findall(text)]
+    return sum(values) if values else None
+
+
+async def scrape_vllm_queue(
+    client: httpx.AsyncClient,
+    urls: list[str],
+    limiter: AdaptiveLimiter,
+    max_waiting: float,
+    interval_seconds: float,
+) -> None:
+    async def scrape(url: str) -> float | None:
+        try:
+            response = await client.get(url)
+            response.raise_for_status()
+        except httpx.HTTPError as exc:
+            logger.debug("vllm_metrics_scrape_failed", extra={"extra": {"error": str(exc)}})
+            return None
+        return parse_vllm_queue_depth(response.text)
+
+    while True:
+        depths = [d for d in await asyncio.gather(*map(scrape, urls)) if d is not None]
+        if depths:
+            limiter.observe_queue_depth(max(depths), max_waiting)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import httpx
+
+from gateway.app.metrics import record_embed_batch
+
+SendEmbeddings = Callable[[str, list[str]], Awaitable[tuple[list[Any], int]]]
+
+
+class EmbeddingCountMismatch(httpx.DecodingError):
+    pass
+
+
+@dataclass(slots=True)
+class PendingEmbed:
+    inputs: list[str]
+    future: asyncio.Future[tuple[list[Any], int]]
+    enqueued_at: float
+
+
+@dataclass(slots=True)
+class Batch:
+    pending: list[PendingEmbed] = field(default_factory=list)
+    size: int = 0
+    timer: asyncio.TimerHandle | None = None
+
+
+def apportion_tokens(tokens: int, groups: list[list[str]]) -> list[int]:
+    weights = [sum(max(1, len(text)) for text in group) for group in groups]
+    total = sum(weights)
+    shares: list[int] = []
+    allocated = 0
+    running = 0
+    for weight in weights:
+        running += weight
+        upto = tokens * running // total if total else 0
+        shares.append(upto - allocated)
+        allocated = upto
+    return shares
+
+
+class EmbedBatcher:
+    def __init__(
+        self,
+        send: SendEmbeddings,
+        max_batch_size: int,
+        max_wait_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._send = send
+        self._max_size = max(1, max_batch_size)
+        self._max_wait = max_wait_seconds
+        self._clock = clock
+        self._batches: dict[str, Batch] = {}
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def embed(self, model: str, inputs: list[str]) -> tuple[list[Any], int]:
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(model)
+        if batch is not None and batch.size + len(inputs) > self._max_size:
+            self._flush(model)
+            batch = None
+        if batch is None:
+            batch = self._batches[model] = Batch()
+        future: asyncio.Future[tuple[list[Any], int]] = loop.create_future()
+        batch.pending.append(PendingEmbed(inputs, future, self._clock()))
+        batch.size += len(inputs)
+        if batch.size >= self._max_size or self._max_wait <= 0:
+            self._flush(model)
+        elif batch.timer is None:
+            batch.timer = loop.call_later(self._max_wait, self._flush, model)
+        return await future
+
+    def _flush(self, model: str) -> None:
+        batch = self._batches.pop(model, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.get_running_loop().create_task(self._dispatch(model, batch.pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, model: str, pending: list[PendingEmbed]) -> None:
+        live = [item for item in pending if not item.future.done()]
+        if not live:
+            return
+        now = self._clock()
+        positions: dict[str, int] = {}
+        for item in live:
+            for text in item.inputs:
+                positions.setdefault(text, len(positions))
+        inputs = list(positions)
+        record_embed_batch(len(inputs), [now - item.enqueued_at for item in live])
+        try:
+            vectors, tokens = await self._send(model, inputs)
+            if len(vectors) != len(inputs):
+                raise EmbeddingCountMismatch(
+                    f"expected {len(inputs)} embeddings, upstream returned {len(vectors)}"
+                )
+        except asyncio.CancelledError:
+            for item in live:
+                item.future.cancel()
+            raise
+        except Exception as exc:
+            for item in live:
+                if not item.future.done():
+                    item.future.set_exception(exc)
+            return
+        shares = apportion_tokens(tokens, [item.inputs for item in live])
+        for item, share in zip(live, shares, strict=True):
+            if not item.future.done():
+                item.future.set_result(([vectors[positions[text]] for text in item.inputs], share))
+
+    def close(self) -> None:
+        for batch in self._batches.values():
+            if batch.timer is not None:
+                batch.timer.cancel()
+            for item in batch.pending:
+                item.future.cancel()
+        self._batches.clear()
+        for task in self._tasks:
+            task.cancel()
@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import importlib
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from gateway.app.metrics import record_cache_eviction, record_cache_lookup, record_local_cache_size
+
+logger = logging.getLogger("gateway.cache")
+
+MAGIC = b"\x00GW"
+FORMAT_VERSION = 1
+HEADER_SIZE = len(MAGIC) + 2
+CODEC_IDS = {"none": 0, "zlib": 1, "zstd": 2, "lz4": 3}
+CODEC_MODULES = {"zstd": "zstandard", "lz4": "lz4.frame"}
+
+
+class CacheFormatError(ValueError):
+    pass
+
+
+def _load_codec_module(name: str) -> Any:
+    module_name = CODEC_MODULES.get(name)
+    if module_name is None:
+        return None
+    try:
+        return importlib.import_module(module_name)
+    except ImportError:
+        return None
+
+
+class CacheCodec:
+    def __init__(self, compression: str = "none", min_bytes: int = 1024) -> None:
+        if compression not in CODEC_IDS:
+            raise ValueError(f"unknown cache compression: {compression}")
+        if compression in CODEC_MODULES and _load_codec_module(compression) is None:
+            logger.warning(
+                "cache_compression_unavailable",
+                extra={"extra": {"compression": compression, "fallback": "none"}},
+            )
+            compression = "none"
+        self.compression = compression
+        self._min_bytes = min_bytes
+        self._modules: dict[str, Any] = {}
+
+    def encode(self, body: bytes) -> bytes:
+        codec = self.compression if len(body) >= self._min_bytes else "none"
+        header = MAGIC + bytes((FORMAT_VERSION, CODEC_IDS[codec]))
+        if codec == "none":
+            return header + body
+        if codec == "zlib":
+            return header + zlib.compress(body, 1)
+        module = self._module(codec)
+        if codec == "zstd":
+            return header + bytes(module.ZstdCompressor(level=3).compress(body))
+        return header + bytes(module.compress(body))
+
+    def decode(self, blob: bytes) -> bytes:
+        if not blob.startswith(MAGIC):
+            return blob
+        if len(blob) < HEADER_SIZE or blob[len(MAGIC)] != FORMAT_VERSION:
+            raise CacheFormatError("unsupported cache entry version")
+        codec_id = blob[len(MAGIC) + 1]
+        body = memoryview(blob)[HEADER_SIZE:]
+        if codec_id == CODEC_IDS["none"]:
+            return bytes(body)
+        if codec_id == CODEC_IDS["zlib"]:
+            return zlib.decompress(body)
+        if codec_id == CODEC_IDS["zstd"]:
+            return bytes(self._module("zstd").ZstdDecompressor().decompress(body))
+        if codec_id == CODEC_IDS["lz4"]:
+            return bytes(self._module("lz4").decompress(body))
+        raise CacheFormatError(f"unknown cache codec id: {codec_id}")
+
+    def _module(self, codec: str) -> Any:
+        module = self._modules.get(codec)
+        if module is None:
+            module = _load_codec_module(codec)
+            if module is None:
+                raise CacheFormatError(f"cache codec not installed: {codec}")
+            self._modules[codec] = module
+        return module
+
+
+@dataclass(slots=True)
+class CacheEntry:
+    value: bytes
+    fresh_until: float
+    stale_until: float
+
+
+class LocalCache:
+    def __init__(
+        self,
+        max_entries: int,
+        max_bytes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if self._clock() >= entry.stale_until:
+            self._remove(key, "expired")
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def set(self, key: str, value: bytes, ttl_seconds: float, stale_seconds: float = 0.0) -> None:
+        if key in self._entries:
+            self._remove(key, None)
+        if len(value) > self._max_bytes or self._max_entries <= 0 or ttl_seconds <= 0:
+            return
+        now = self._clock()
+        fresh_until = now + ttl_seconds
+        self._entries[key] = CacheEntry(value, fresh_until, fresh_until + stale_seconds)
+        self._bytes += len(value)
+        while len(self._entries) > self._max_entries or self._bytes > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest, "capacity")
+        record_local_cache_size(len(self._entries), self._bytes)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return self._clock() < entry.fresh_until
+
+    def _remove(self, key: str, reason: str | None) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.value)
+        if reason is not None:
+            record_cache_eviction("l1", reason)
+        record_local_cache_size(len(self._entries), self._bytes)
+
+
+class ResponseCache:
+    def __init__(
+        self,
+        local: LocalCache | None,
+        ttl_seconds: int,
+        stale_seconds: float,
+        redis: Redis[Any] | None = None,
+        codec: CacheCodec | None = None,
+    ) -> None:
+        self.local = local
+        self.redis = redis
+        self.codec = codec or CacheCodec()
+        self._ttl_seconds = ttl_seconds
+        self._stale_seconds = stale_seconds
+        self._refreshing: dict[str, asyncio.Task[None]] = {}
+
+    async def get(
+        self, key: str, revalidate: Callable[[], Awaitable[object]] | None = None
+    ) -> bytes | None:
+        if self.local is not None:
+            entry = self.local.get(key)
+            if entry is not None:
+                if self.local.is_fresh(entry):
+                    record_cache_lookup("l1", "hit")
+                else:
+                    record_cache_lookup("l1", "stale")
+                    if revalidate is not None:
+                        self._schedule_refresh(key, revalidate)
+                return entry.value
+            record_cache_lookup("l1", "miss")
+
+        if self.redis is None:
+            return None
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            value, pttl = await pipe.execute()
+        except RedisError:
+            record_cache_lookup("l2", "error")
+            return None
+        if value is None:
+            record_cache_lookup("l2", "miss")
+            return None
+        try:
+            data = self.codec.decode(value)
+        except Exception as exc:
+            record_cache_lookup("l2", "corrupt")
+            logger.warning("cache_decode_failed", extra={"extra": {"error": str(exc)}})
+            return None
+        record_cache_lookup("l2", "hit")
+        if self.local is not None:
+            ttl = pttl / 1000 if pttl and pttl > 0 else self._ttl_seconds
+            self.local.set(key, data, ttl, self._stale_seconds)
+        return data
+
+    async def set(self, key: str, value: bytes) -> None:
+        if self.local is not None:
+            self.local.set(key, value, self._ttl_seconds, self._stale_seconds)
+        if self.redis is not None:
+            await self.redis.setex(key, self._ttl_seconds, self.codec.encode(value))
+
+    def _schedule_refresh(self, key: str, revalidate: Callable[[], Awaitable[object]]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                await revalidate()
+            except Exception as exc:
+                logger.warning("cache_revalidate_failed", extra={"extra": {"error": str(exc)}})
+            finally:
+                self._refreshing.pop(key, None)
+
+        self._refreshing[key] = asyncio.create_task(refresh())
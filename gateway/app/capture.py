@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import random
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import orjson
+
+from gateway.app.metrics import record_capture
+
+CAPTURE_PATHS = frozenset({"/chat", "/embed"})
+
+logger = logging.getLogger("gateway.capture")
+
+
+def redact_payload(body: bytes, payload: dict[str, Any]) -> dict[str, Any]:
+    summary: dict[str, Any] = {
+        "sha256": hashlib.sha256(body).hexdigest(),
+        "bytes": len(body),
+        "model": payload.get("model"),
+        "max_tokens": payload.get("max_tokens"),
+    }
+    messages = payload.get("messages")
+    if isinstance(messages, list):
+        summary["messages"] = [
+            {
+                "role": message.get("role") if isinstance(message, dict) else None,
+                "chars": len(str(message.get("content", ""))) if isinstance(message, dict) else 0,
+            }
+            for message in messages
+        ]
+    inputs = payload.get("input")
+    if isinstance(inputs, str):
+        summary["input_chars"] = [len(inputs)]
+    elif isinstance(inputs, list):
+        summary["input_chars"] = [len(str(item)) for item in inputs]
+    return summary
+
+
+@dataclass(slots=True)
+class CapturedRequest:
+    arrival: float
+    path: str
+    body: bytes
+    status: int
+    latency_s: float
+    request_id: str
+
+
+def capture_entry(request: CapturedRequest, redact: bool) -> dict[str, Any]:
+    try:
+        payload = orjson.loads(request.body)
+    except orjson.JSONDecodeError:
+        payload = None
+    entry: dict[str, Any] = {
+        "ts": request.arrival,
+        "path": request.path,
+        "request_id": request.request_id,
+        "status": request.status,
+        "latency_s": request.latency_s,
+        "stream": isinstance(payload, dict) and bool(payload.get("stream")),
+    }
+    if not isinstance(payload, dict):
+        digest = hashlib.sha256(request.body).hexdigest()
+        entry["redacted"] = {"sha256": digest, "bytes": len(request.body)}
+    elif redact:
+        entry["redacted"] = redact_payload(request.body, payload)
+    else:
+        entry["payload"] = payload
+    return entry
+
+
+class TrafficCapture:
+    def __init__(
+        self,
+        path: str | Path,
+        sample_rate: float = 1.0,
+        redact: bool = True,
+        max_bytes: int = 100 * 1024 * 1024,
+        backups: int = 5,
+        queue_size: int = 10_000,
+    ) -> None:
+        self.path = Path(path)
+        self.sample_rate = sample_rate
+        self.redact = redact
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._queue: asyncio.Queue[CapturedRequest] = asyncio.Queue(maxsize=queue_size)
+        self._writer: asyncio.Task[None] | None = None
+
+    def sampled(self) -> bool:
+        return self.sample_rate >= 1.0 or random.random() < self.sample_rate
+
+    def record(self, request: CapturedRequest) -> None:
+        try:
+            self._queue.put_nowait(request)
+        except asyncio.QueueFull:
+            record_capture("dropped")
+
+    def start(self) -> None:
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._writer is None:
+            return
+        if not self._writer.done():
+            await self._queue.join()
+        self._writer.cancel()
+        self._writer = None
+
+    async def _run(self) -> None:
+        while True:
+            entries = [await self._queue.get()]
+            while not self._queue.empty():
+                entries.append(self._queue.get_nowait())
+            try:
+                await asyncio.to_thread(self._write, entries)
+            except OSError as exc:
+                record_capture("failed", len(entries))
+                logger.warning("capture_write_failed", extra={"extra": {"error": str(exc)}})
+            finally:
+                for _ in entries:
+                    self._queue.task_done()
+
+    def _write(self, entries: list[CapturedRequest]) -> None:
+        data = b"".join(
+            orjson.dumps(capture_entry(entry, self.redact)) + b"\n" for entry in entries
+        )
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            size = self.path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        if size and size + len(data) > self._max_bytes:
+            self._rotate()
+        with self.path.open("ab") as handle:
+            handle.write(data)
+        record_capture("written", len(entries))
+
+    def _rotate(self) -> None:
+        if self._backups <= 0:
+            self.path.unlink(missing_ok=True)
+            return
+        for index in range(self._backups - 1, 0, -1):
+            source = self.path.with_name(f"{self.path.name}.{index}")
+            if source.exists():
+                os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+        os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
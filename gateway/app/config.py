@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import Field
 from pydantic_settings import BaseSettings
 
@@ -8,21 +10,104 @@ class Settings(BaseSettings):
     gateway_host: str = "0.0.0.0"
     gateway_port: int = 8000
     vllm_base_url: str = "http://vllm:8000"
+    vllm_upstream_urls: list[str] = Field(default_factory=list)
     model_id: str = "Qwen/Qwen2-0.5B-Instruct"
 
     redis_url: str = "redis://redis:6379/0"
     cache_ttl_seconds: int = 300
+    cache_stale_seconds: float = 30.0
+    cache_l1_enabled: bool = True
+    cache_l1_max_entries: int = 1024
+    cache_l1_max_bytes: int = 64 * 1024 * 1024
+    cache_compression: Literal["none", "zlib", "zstd", "lz4"] = "none"
+    cache_compression_min_bytes: int = 1024
+    cache_streams: bool = True
+    cache_stream_max_bytes: int = 1_000_000
+    cache_stream_replay_events_per_chunk: int = 0
+    cache_stream_replay_delay_ms: float = 0.0
+
+    embed_batching_enabled: bool = True
+    embed_batch_max_size: int = 64
+    embed_batch_max_wait_ms: float = 5.0
+    embed_cache_enabled: bool = True
+
+    singleflight_enabled: bool = True
+    singleflight_redis_lock: bool = False
+    singleflight_lock_ttl_seconds: float = 30.0
+    singleflight_poll_interval_seconds: float = 0.05
 
     rate_limit_rps: float = 5.0
     rate_limit_burst: int = 10
+    rate_limit_backend: Literal["local", "redis"] = "local"
+    rate_limit_max_keys: int = 100_000
+    rate_limit_idle_seconds: float | None = None
     request_size_limit_bytes: int = 1_000_000
 
+    capture_enabled: bool = False
+    capture_path: str = "captures/traffic.jsonl"
+    capture_sample_rate: float = 1.0
+    capture_redact: bool = True
+    capture_max_bytes: int = 100 * 1024 * 1024
+    capture_backups: int = 5
+    capture_queue_size: int = 10_000
+
+    server_timing_enabled: bool = False
+    server_timing_request_header: str = "x-server-timing"
+    admin_token: str = ""
+    profile_max_seconds: float = 60.0
+    profile_interval_ms: float = 10.0
+
+    log_queue_size: int = 10_000
+    log_queue_policy: Literal["drop", "block"] = "drop"
+    log_sample_rates: dict[str, float] = Field(default_factory=dict)
+
     max_tokens_cap: int = 512
     denylist_words: list[str] = Field(default_factory=lambda: ["hack", "exploit"])
+    denylist_word_boundary: bool = False
+    denylist_casefold: bool = False
 
     retry_attempts: int = 3
     retry_min_seconds: float = 0.5
     retry_max_seconds: float = 3.0
+    retry_statuses: list[int] = Field(default_factory=lambda: [408, 429, 500, 502, 503, 504])
+    retry_budget_ratio: float = 0.2
+    retry_budget_min_per_second: float = 1.0
+    retry_budget_burst: int = 10
+    hedge_enabled: bool = False
+    hedge_percentile: float = 95.0
+    hedge_min_delay_ms: float = 50.0
+
+    admission_enabled: bool = True
+    admission_initial_limit: int = 32
+    admission_min_limit: int = 4
+    admission_max_limit: int = 256
+    admission_queue_size: int = 256
+    admission_queue_timeout_seconds: float = 10.0
+    admission_latency_tolerance: float = 2.0
+    admission_backoff: float = 0.9
+    admission_vllm_queue_max: int = 0
+    admission_vllm_scrape_interval_seconds: float = 2.0
+
+    upstream_balancer: Literal["least_outstanding", "p2c"] = "least_outstanding"
+    upstream_max_inflight: int = 0
+    upstream_routing: Literal["balanced", "prefix_affinity"] = "balanced"
+    affinity_prefix_chars: int = 256
+    affinity_load_factor: float = 1.25
+    affinity_virtual_nodes: int = 100
+    upstream_health_check_interval_seconds: float = 5.0
+    upstream_health_check_timeout_seconds: float = 2.0
+    upstream_eject_consecutive_failures: int = 5
+    upstream_eject_base_seconds: float = 10.0
+    upstream_eject_max_seconds: float = 120.0
+
+    upstream_max_connections: int = 100
+    upstream_max_keepalive_connections: int = 20
+    upstream_keepalive_expiry_seconds: float = 30.0
+    upstream_http2: bool = False
+    upstream_connect_timeout_seconds: float = 5.0
+    upstream_read_timeout_seconds: float = 60.0
+    upstream_write_timeout_seconds: float = 10.0
+    upstream_pool_timeout_seconds: float = 5.0
 
     class Config:
         env_prefix = "GATEWAY_"
@@ -1,8 +1,42 @@
 from __future__ import annotations
 
-import asyncio
+import math
 import time
+from collections import OrderedDict
+from collections.abc import Callable
 from dataclasses import dataclass
+from typing import Any
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from gateway.app.metrics import (
+    record_rate_limit_buckets,
+    record_rate_limit_eviction,
+    record_rate_limit_fallback,
+)
+
+ZERO_RATE_TTL_SECONDS = 86_400
+
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local ttl_ms = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call("HMGET", KEYS[1], "tokens", "ts")
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "ts", tostring(now))
+redis.call("PEXPIRE", KEYS[1], ttl_ms)
+return allowed
+"""
 
 
 @dataclass(slots=True)
@@ -12,23 +46,86 @@ class Bucket:
 
 
 class RateLimiter:
-    def __init__(self, rate: float, burst: int) -> None:
+    def __init__(
+        self,
+        rate: float,
+        burst: int,
+        max_keys: int = 100_000,
+        idle_seconds: float | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
         self._rate = rate
         self._burst = burst
-        self._buckets: dict[str, Bucket] = {}
-        self._lock = asyncio.Lock()
+        self._max_keys = max_keys
+        if idle_seconds is None:
+            idle_seconds = burst / rate if rate > 0 else math.inf
+        self._idle_seconds = idle_seconds
+        self._clock = clock
+        self._buckets: OrderedDict[str, Bucket] = OrderedDict()
+        self._capacity_evictions = 0
+        self._next_sweep = clock() + self._idle_seconds
+
+    def __len__(self) -> int:
+        return len(self._buckets)
 
     async def allow(self, key: str) -> bool:
-        async with self._lock:
-            now = time.monotonic()
-            bucket = self._buckets.get(key)
-            if bucket is None:
-                bucket = Bucket(tokens=float(self._burst), last_refill=now)
-                self._buckets[key] = bucket
-            elapsed = now - bucket.last_refill
-            bucket.tokens = min(self._burst, bucket.tokens + elapsed * self._rate)
+        return self.allow_nowait(key)
+
+    def allow_nowait(self, key: str) -> bool:
+        now = self._clock()
+        if now >= self._next_sweep:
+            self.evict_idle(now)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._max_keys:
+                self._buckets.popitem(last=False)
+                self._capacity_evictions += 1
+            bucket = Bucket(tokens=float(self._burst), last_refill=now)
+            self._buckets[key] = bucket
+        else:
+            self._buckets.move_to_end(key)
+            tokens = bucket.tokens + (now - bucket.last_refill) * self._rate
+            bucket.tokens = tokens if tokens < self._burst else float(self._burst)
             bucket.last_refill = now
-            if bucket.tokens >= 1:
-                bucket.tokens -= 1
-                return True
-            return False
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return True
+        return False
+
+    def evict_idle(self, now: float) -> int:
+        cutoff = now - self._idle_seconds
+        evicted = 0
+        while self._buckets:
+            oldest = next(iter(self._buckets.values()))
+            if oldest.last_refill > cutoff:
+                break
+            self._buckets.popitem(last=False)
+            evicted += 1
+        if evicted:
+            record_rate_limit_eviction("idle", evicted)
+        if self._capacity_evictions:
+            record_rate_limit_eviction("capacity", self._capacity_evictions)
+            self._capacity_evictions = 0
+        record_rate_limit_buckets(len(self._buckets))
+        self._next_sweep = now + self._idle_seconds
+        return evicted
+
+
+class RedisRateLimiter:
+    def __init__(self, redis: Redis[Any], rate: float, burst: int, fallback: RateLimiter) -> None:
+        self._rate = rate
+        self._burst = burst
+        refill_seconds = burst / rate if rate > 0 else ZERO_RATE_TTL_SECONDS
+        self._ttl_ms = max(1000, int(refill_seconds * 1000) + 1000)
+        self._fallback = fallback
+        self._script = redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def allow(self, key: str) -> bool:
+        try:
+            allowed = await self._script(
+                keys=[f"ratelimit:{key}"], args=[self._rate, self._burst, self._ttl_ms]
+            )
+        except RedisError:
+            record_rate_limit_fallback()
+            return self._fallback.allow_nowait(key)
+        return bool(allowed)
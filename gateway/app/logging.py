@@ -1,15 +1,27 @@
 from __future__ import annotations
 
-import json
+import atexit
+import copy
 import logging
+import queue
+import random
 from datetime import UTC, datetime
-from typing import Any
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Literal
+
+import orjson
+
+from gateway.app.metrics import record_log_dropped
+
+QueuePolicy = Literal["drop", "block"]
+
+_listener: DrainingQueueListener | None = None
 
 
 class JsonFormatter(logging.Formatter):
     def format(self, record: logging.LogRecord) -> str:
         payload: dict[str, Any] = {
-            "timestamp": datetime.now(UTC).isoformat(),
+            "timestamp": datetime.fromtimestamp(record.created, UTC).isoformat(),
             "level": record.levelname,
             "message": record.getMessage(),
             "logger": record.name,
@@ -20,12 +32,81 @@ class JsonFormatter(logging.Formatter):
             payload["model_id"] = record.model_id
         if hasattr(record, "extra"):
             payload.update(record.extra)
-        return json.dumps(payload, ensure_ascii=False)
+        return orjson.dumps(payload, default=str).decode()
+
+
+class EventSampler(logging.Filter):
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self._rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rates.get(str(record.msg))
+        if rate is None or rate >= 1.0 or random.random() < rate:
+            return True
+        record_log_dropped("sampled")
+        return False
+
+
+class BoundedQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue[Any], policy: QueuePolicy) -> None:
+        super().__init__(log_queue)
+        self._log_queue = log_queue
+        self.policy = policy
 
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        record.exc_info = None
+        return record
 
-def configure_logging() -> None:
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self.policy == "block":
+            self._log_queue.put(record)
+            return
+        try:
+            self._log_queue.put_nowait(record)
+        except queue.Full:
+            record_log_dropped("queue_full")
+
+
+class DrainingQueueListener(QueueListener):
+    def __init__(self, log_queue: queue.Queue[Any], handler: logging.Handler) -> None:
+        super().__init__(log_queue, handler, respect_handler_level=True)
+        self._log_queue = log_queue
+
+    def enqueue_sentinel(self) -> None:
+        self._log_queue.put(None)
+
+
+def configure_logging(
+    queue_size: int = 10_000,
+    policy: QueuePolicy = "drop",
+    sample_rates: dict[str, float] | None = None,
+) -> None:
+    global _listener
+    stop_logging()
     handler = logging.StreamHandler()
     handler.setFormatter(JsonFormatter())
+    log_queue: queue.Queue[Any] = queue.Queue(maxsize=queue_size)
+    queue_handler = BoundedQueueHandler(log_queue, policy)
+    if sample_rates:
+        queue_handler.addFilter(EventSampler(sample_rates))
     root = logging.getLogger()
-    root.handlers = [handler]
+    root.handlers = [queue_handler]
     root.setLevel(logging.INFO)
+    _listener = DrainingQueueListener(log_queue, handler)
+    _listener.start()
+
+
+def stop_logging() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -1,52 +1,207 @@
 from __future__ import annotations
 
+import asyncio
 import hashlib
-import json
+import hmac
 import logging
 import time
-import uuid
-from collections.abc import AsyncIterator, Awaitable, Callable
-from typing import Any
+import weakref
+from collections import defaultdict
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable
+from contextlib import aclosing, nullcontext, suppress
+from typing import Any, TypeVar
 
 import httpx
 import orjson
 from fastapi import FastAPI, HTTPException, Request, Response
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.responses import StreamingResponse
 from redis.asyncio import Redis
 from redis.exceptions import RedisError
-from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
-
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.requests import ClientDisconnect
+
+from gateway.app.admission import (
+    AdaptiveLimiter,
+    Overloaded,
+    RequestClass,
+    Slot,
+    scrape_vllm_queue,
+)
+from gateway.app.batching import EmbedBatcher, EmbeddingCountMismatch
+from gateway.app.cache import CacheCodec, LocalCache, ResponseCache
+from gateway.app.capture import TrafficCapture
 from gateway.app.config import settings
-from gateway.app.limits import RateLimiter
+from gateway.app.limits import RateLimiter, RedisRateLimiter
 from gateway.app.logging import configure_logging
 from gateway.app.metrics import (
     aggregate_tokens,
+    mark_worker_exit,
+    record_aborted,
     record_cache_hit,
+    record_coalesced,
+    record_embed_inputs,
     record_error,
+    record_hedge,
     record_latency,
     record_request,
+    record_retry,
+    record_stream,
     record_tokens,
     render_metrics,
 )
+from gateway.app.middleware import RequestMiddleware
+from gateway.app.profiling import render_collapsed, sample_stacks
+from gateway.app.retry import LatencyTracker, RetryBudget, backoff_seconds, is_retryable
+from gateway.app.routing import prefix_hash
 from gateway.app.safety import SafetyChecker
+from gateway.app.serialization import JSON_HEADERS, ORJSONResponse, read_json
+from gateway.app.singleflight import RedisFlightLock, SingleFlight
+from gateway.app.streaming import (
+    ClosingStreamingResponse,
+    StreamMonitor,
+    StreamRecorder,
+    replay_sse,
+)
+from gateway.app.timing import RequestTimings, timed_chunks
+from gateway.app.upstream import (
+    NoUpstreamAvailable,
+    Upstream,
+    UpstreamPool,
+    build_upstream_client,
+)
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 logger = logging.getLogger("gateway")
+T = TypeVar("T")
 
-configure_logging()
+configure_logging(settings.log_queue_size, settings.log_queue_policy, settings.log_sample_rates)
 
-rate_limiter = RateLimiter(settings.rate_limit_rps, settings.rate_limit_burst)
-safety_checker = SafetyChecker(settings.max_tokens_cap, settings.denylist_words)
+rate_limiter: RateLimiter | RedisRateLimiter = RateLimiter(
+    settings.rate_limit_rps,
+    settings.rate_limit_burst,
+    settings.rate_limit_max_keys,
+    settings.rate_limit_idle_seconds,
+)
+safety_checker = SafetyChecker(
+    settings.max_tokens_cap,
+    settings.denylist_words,
+    settings.denylist_word_boundary,
+    settings.denylist_casefold,
+)
 redis_client: Redis[Any] | None = None
+http_client: httpx.AsyncClient | None = None
+flight_lock: RedisFlightLock | None = None
+chat_flights: SingleFlight[tuple[bytes, int]] = SingleFlight()
+response_cache = ResponseCache(
+    LocalCache(settings.cache_l1_max_entries, settings.cache_l1_max_bytes)
+    if settings.cache_l1_enabled
+    else None,
+    settings.cache_ttl_seconds,
+    settings.cache_stale_seconds,
+    codec=CacheCodec(settings.cache_compression, settings.cache_compression_min_bytes),
+)
+admission: AdaptiveLimiter | None = (
+    AdaptiveLimiter(
+        settings.admission_initial_limit,
+        settings.admission_min_limit,
+        settings.admission_max_limit,
+        settings.admission_queue_size,
+        settings.admission_latency_tolerance,
+        settings.admission_backoff,
+    )
+    if settings.admission_enabled
+    else None
+)
+upstream_pool = UpstreamPool(
+    settings.vllm_upstream_urls or [settings.vllm_base_url],
+    settings.upstream_balancer,
+    settings.upstream_max_inflight,
+    settings.upstream_eject_consecutive_failures,
+    settings.upstream_eject_base_seconds,
+    settings.upstream_eject_max_seconds,
+    settings.affinity_load_factor,
+    settings.affinity_virtual_nodes,
+)
+background_tasks: set[asyncio.Task[None]] = set()
+embed_batcher: EmbedBatcher | None = None
+traffic_capture: TrafficCapture | None = None
+profile_lock = asyncio.Lock()
+retry_budget = RetryBudget(
+    settings.retry_budget_ratio, settings.retry_budget_min_per_second, settings.retry_budget_burst
+)
+hedge_trackers: defaultdict[str, LatencyTracker] = defaultdict(
+    lambda: LatencyTracker(settings.hedge_percentile)
+)
+app.add_middleware(RequestMiddleware, limiter=lambda: rate_limiter, capture=lambda: traffic_capture)
+
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None:
+        http_client = build_upstream_client(settings)
+    return http_client
+
+
+def get_embed_batcher() -> EmbedBatcher:
+    global embed_batcher
+    if embed_batcher is None:
+        embed_batcher = EmbedBatcher(
+            send_embeddings, settings.embed_batch_max_size, settings.embed_batch_max_wait_ms / 1000
+        )
+    return embed_batcher
 
 
 @app.on_event("startup")
 async def startup() -> None:
-    global redis_client
-    redis = Redis.from_url(settings.redis_url, decode_responses=True)
+    global redis_client, flight_lock, rate_limiter, traffic_capture
+    client = get_http_client()
+    if settings.capture_enabled and traffic_capture is None:
+        traffic_capture = TrafficCapture(
+            settings.capture_path,
+            settings.capture_sample_rate,
+            settings.capture_redact,
+            settings.capture_max_bytes,
+            settings.capture_backups,
+            settings.capture_queue_size,
+        )
+        traffic_capture.start()
+    if settings.upstream_health_check_interval_seconds > 0:
+        background_tasks.add(
+            asyncio.create_task(
+                upstream_pool.health_loop(
+                    client,
+                    settings.upstream_health_check_interval_seconds,
+                    settings.upstream_health_check_timeout_seconds,
+                )
+            )
+        )
+    if admission is not None and settings.admission_vllm_queue_max > 0:
+        background_tasks.add(
+            asyncio.create_task(
+                scrape_vllm_queue(
+                    client,
+                    [f"{upstream.url}/metrics" for upstream in upstream_pool.upstreams],
+                    admission,
+                    settings.admission_vllm_queue_max,
+                    settings.admission_vllm_scrape_interval_seconds,
+                )
+            )
+        )
+    redis = Redis.from_url(settings.redis_url)
     try:
         await redis.ping()
         redis_client = redis
+        response_cache.redis = redis
+        if settings.rate_limit_backend == "redis" and isinstance(rate_limiter, RateLimiter):
+            rate_limiter = RedisRateLimiter(
+                redis, settings.rate_limit_rps, settings.rate_limit_burst, fallback=rate_limiter
+            )
+        if settings.singleflight_redis_lock:
+            flight_lock = RedisFlightLock(
+                redis,
+                settings.singleflight_lock_ttl_seconds,
+                settings.singleflight_poll_interval_seconds,
+            )
     except RedisError:
         logger.warning("redis_unavailable_startup", extra={"model_id": settings.model_id})
         redis_client = None
@@ -54,31 +209,75 @@ async def startup() -> None:
 
 @app.on_event("shutdown")
 async def shutdown() -> None:
+    global http_client, traffic_capture
+    if embed_batcher is not None:
+        embed_batcher.close()
+    if traffic_capture is not None:
+        await traffic_capture.close()
+        traffic_capture = None
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
     if redis_client:
         await redis_client.close()
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+    mark_worker_exit()
 
 
-@app.middleware("http")
-async def request_middleware(
-    request: Request, call_next: Callable[[Request], Awaitable[Response]]
-) -> Response:
-    request_id = request.headers.get("x-request-id", str(uuid.uuid4()))
-    request.state.request_id = request_id
-    client_key = request.client.host if request.client else "unknown"
-    if not await rate_limiter.allow(client_key):
-        record_request(request.url.path, "429")
-        return JSONResponse({"error": "rate_limited", "request_id": request_id}, status_code=429)
-
-    content_length = request.headers.get("content-length")
-    if content_length and int(content_length) > settings.request_size_limit_bytes:
-        record_request(request.url.path, "413")
-        return JSONResponse(
-            {"error": "payload_too_large", "request_id": request_id}, status_code=413
-        )
+def admission_timeout(request: Request) -> float:
+    timeout = settings.admission_queue_timeout_seconds
+    deadline_ms = request.headers.get("x-request-deadline-ms")
+    if deadline_ms:
+        with suppress(ValueError):
+            timeout = min(timeout, float(deadline_ms) / 1000)
+    return timeout
 
-    response = await call_next(request)
-    response.headers["x-request-id"] = request_id
-    return response
+
+async def admit(timeout: float, kind: RequestClass = "unary") -> Slot | None:
+    if admission is None:
+        return None
+    return await admission.acquire(timeout, kind)
+
+
+def overloaded_response(path: str, exc: Overloaded) -> HTTPException:
+    record_request(path, "503")
+    return HTTPException(
+        status_code=503,
+        detail="Gateway overloaded, retry later.",
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def unless_disconnected(request: Request, work: Awaitable[T]) -> T:
+    task = asyncio.ensure_future(work)
+    watcher = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        done, _ = await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task in done:
+        return task.result()
+    raise ClientDisconnect()
+
+
+def requested_tokens(payload: dict[str, Any]) -> int:
+    max_tokens = payload.get("max_tokens")
+    return max_tokens if isinstance(max_tokens, int) else settings.max_tokens_cap
+
+
+def affinity_key(payload: dict[str, Any]) -> int | None:
+    if settings.upstream_routing != "prefix_affinity":
+        return None
+    return prefix_hash(payload.get("messages"), settings.affinity_prefix_chars)
 
 
 def cache_key(path: str, payload: dict[str, Any]) -> str:
@@ -87,37 +286,166 @@ def cache_key(path: str, payload: dict[str, Any]) -> str:
     return f"cache:{path}:{settings.model_id}:{digest}"
 
 
-async def fetch_with_retry(method: str, url: str, json_body: dict[str, Any]) -> httpx.Response:
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        retryer = AsyncRetrying(
-            stop=stop_after_attempt(settings.retry_attempts),
-            wait=wait_exponential(min=settings.retry_min_seconds, max=settings.retry_max_seconds),
-            retry=retry_if_exception_type(httpx.HTTPError),
-            reraise=True,
+def embedding_cache_key(model: str, text: str) -> str:
+    digest = hashlib.sha256(f"{model}\x1f{text}".encode()).hexdigest()
+    return f"cache:embedding:{digest}"
+
+
+def embedding_inputs(payload: dict[str, Any]) -> list[str] | None:
+    if not (settings.embed_batching_enabled or settings.embed_cache_enabled):
+        return None
+    if not set(payload) <= {"model", "input", "encoding_format"}:
+        return None
+    if payload.get("encoding_format", "float") != "float" or not isinstance(payload["model"], str):
+        return None
+    inputs = payload.get("input")
+    if isinstance(inputs, str):
+        return [inputs]
+    if isinstance(inputs, list) and inputs and all(isinstance(text, str) for text in inputs):
+        return inputs
+    return None
+
+
+def retry_allowed(path: str, exc: httpx.HTTPError, attempt: int) -> bool:
+    if attempt >= settings.retry_attempts or not is_retryable(exc, settings.retry_statuses):
+        return False
+    if not retry_budget.withdraw():
+        record_retry(path, "budget_exhausted")
+        return False
+    record_retry(path, "retried")
+    return True
+
+
+def hedge_delay(path: str) -> float | None:
+    if not settings.hedge_enabled:
+        return None
+    threshold = hedge_trackers[path].threshold()
+    if threshold is None:
+        return None
+    return max(threshold, settings.hedge_min_delay_ms / 1000)
+
+
+async def send_upstream(
+    client: httpx.AsyncClient, method: str, upstream: Upstream, path: str, body: bytes
+) -> httpx.Response:
+    started = time.perf_counter()
+    with upstream_pool.track(upstream):
+        response = await client.request(
+            method, f"{upstream.url}{path}", content=body, headers=JSON_HEADERS
         )
-        async for attempt in retryer:
-            with attempt:
-                response = await client.request(method, url, json=json_body)
-                response.raise_for_status()
-                return response
-    raise HTTPException(status_code=502, detail="upstream_unavailable")
-
-
-async def stream_with_retry(url: str, payload: dict[str, Any]) -> AsyncIterator[bytes]:
-    async with httpx.AsyncClient(timeout=None) as client:
-        retryer = AsyncRetrying(
-            stop=stop_after_attempt(settings.retry_attempts),
-            wait=wait_exponential(min=settings.retry_min_seconds, max=settings.retry_max_seconds),
-            retry=retry_if_exception_type(httpx.HTTPError),
-            reraise=True,
+        response.raise_for_status()
+    if settings.hedge_enabled:
+        hedge_trackers[path].observe(time.perf_counter() - started)
+    return response
+
+
+async def send_hedged(
+    client: httpx.AsyncClient,
+    method: str,
+    path: str,
+    body: bytes,
+    tried: list[Upstream],
+    affinity: int | None,
+) -> httpx.Response:
+    upstream = upstream_pool.pick(exclude=tried, affinity=affinity)
+    tried.append(upstream)
+    delay = hedge_delay(path)
+    if delay is None:
+        return await send_upstream(client, method, upstream, path, body)
+    primary = asyncio.ensure_future(send_upstream(client, method, upstream, path, body))
+    attempts = [primary]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done:
+            try:
+                upstream = upstream_pool.pick(exclude=tried, affinity=affinity)
+            except NoUpstreamAvailable:
+                record_hedge(path, "no_upstream")
+            else:
+                if retry_budget.withdraw():
+                    record_hedge(path, "sent")
+                    tried.append(upstream)
+                    hedge = send_upstream(client, method, upstream, path, body)
+                    attempts.append(asyncio.ensure_future(hedge))
+                else:
+                    record_hedge(path, "budget_exhausted")
+        pending = set(attempts)
+        failures: list[BaseException] = []
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            failures.extend(exc for task in done if (exc := task.exception()) is not None)
+            for task in done:
+                if task.exception() is None:
+                    if len(attempts) > 1:
+                        record_hedge(path, "lost" if task is primary else "won")
+                    return task.result()
+        raise failures[0]
+    finally:
+        for task in attempts:
+            task.cancel()
+
+
+async def fetch_with_retry(method: str, path: str, json_body: dict[str, Any]) -> httpx.Response:
+    client = get_http_client()
+    tried: list[Upstream] = []
+    affinity = affinity_key(json_body)
+    body = orjson.dumps(json_body)
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            return await send_hedged(client, method, path, body, tried, affinity)
+        except httpx.HTTPError as exc:
+            if not retry_allowed(path, exc, attempt):
+                raise
+        await asyncio.sleep(
+            backoff_seconds(attempt, settings.retry_min_seconds, settings.retry_max_seconds)
         )
-        async for attempt in retryer:
-            with attempt:
-                async with client.stream("POST", url, json=payload) as response:
+
+
+async def stream_with_retry(path: str, payload: dict[str, Any]) -> AsyncGenerator[bytes, None]:
+    client = get_http_client()
+    tried: list[Upstream] = []
+    affinity = affinity_key(payload)
+    body = orjson.dumps(payload)
+    retry_budget.deposit()
+    attempt = 0
+    while True:
+        attempt += 1
+        upstream = upstream_pool.pick(exclude=tried, affinity=affinity)
+        tried.append(upstream)
+        streamed = False
+        try:
+            with upstream_pool.track(upstream):
+                url = f"{upstream.url}{path}"
+                async with client.stream(
+                    "POST", url, content=body, headers=JSON_HEADERS
+                ) as response:
                     response.raise_for_status()
                     async for chunk in response.aiter_bytes():
+                        streamed = True
                         yield chunk
-                return
+            return
+        except httpx.HTTPError as exc:
+            if streamed or not retry_allowed(path, exc, attempt):
+                raise
+        await asyncio.sleep(
+            backoff_seconds(attempt, settings.retry_min_seconds, settings.retry_max_seconds)
+        )
+
+
+async def json_body(request: Request, path: str) -> dict[str, Any]:
+    try:
+        return await read_json(request)
+    except HTTPException as exc:
+        record_request(path, str(exc.status_code))
+        raise
+
+
+@app.exception_handler(StarletteHTTPException)
+async def http_exception_handler(request: Request, exc: StarletteHTTPException) -> Response:
+    return ORJSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
 
 
 @app.get("/health")
@@ -131,14 +459,45 @@ async def metrics() -> Response:
     return Response(content=data, media_type=content_type)
 
 
+def require_admin(request: Request) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get("authorization", "").encode()
+    if not hmac.compare_digest(supplied, f"Bearer {settings.admin_token}".encode()):
+        raise HTTPException(
+            status_code=401, detail="Invalid admin token.", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+@app.post("/admin/profile")
+async def profile(request: Request, seconds: float = 10.0) -> Response:
+    require_admin(request)
+    if profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A profile is already running.")
+    duration = min(max(seconds, 0.0), settings.profile_max_seconds)
+    async with profile_lock:
+        stacks = await asyncio.to_thread(
+            sample_stacks, duration, settings.profile_interval_ms / 1000
+        )
+    filename = f"gateway-profile-{int(time.time())}.collapsed"
+    return Response(
+        render_collapsed(stacks),
+        media_type="text/plain",
+        headers={"content-disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @app.post("/chat")
 async def chat(request: Request) -> Response:
     start_time = time.time()
-    payload = await request.json()
+    timings: RequestTimings = request.state.timings
+    with timings.stage("parse"):
+        payload = await json_body(request, "/chat")
     payload.setdefault("model", settings.model_id)
     request_id = request.state.request_id
 
-    safety = safety_checker.check(payload)
+    with timings.stage("safety"):
+        safety = safety_checker.check(payload)
     if not safety.allowed:
         record_request("/chat", "400")
         logger.info(
@@ -154,16 +513,19 @@ async def chat(request: Request) -> Response:
         payload["max_tokens"] = safety.adjusted_max_tokens
 
     stream = bool(payload.get("stream"))
-    redis = redis_client
-    cacheable = not stream and redis is not None
-    if cacheable:
-        assert redis is not None
-        key = cache_key("chat", payload)
-        try:
-            cached = await redis.get(key)
-        except RedisError:
-            cached = None
+    key = cache_key("chat", payload)
+    if not stream or settings.cache_streams:
+
+        async def revalidate() -> None:
+            await chat_flights.do(
+                key,
+                lambda: generate_chat(
+                    payload, key, request_id, settings.admission_queue_timeout_seconds
+                ),
+            )
 
+        with timings.stage("cache"):
+            cached = await response_cache.get(key, None if stream else revalidate)
         if cached:
             record_cache_hit("/chat")
             record_request("/chat", "200")
@@ -173,26 +535,97 @@ async def chat(request: Request) -> Response:
                 extra={
                     "request_id": request_id,
                     "model_id": settings.model_id,
-                    "extra": {"path": "/chat"},
+                    "extra": {"path": "/chat", "stream": stream},
                 },
             )
+            if stream:
+                return StreamingResponse(
+                    replay_sse(
+                        cached,
+                        settings.cache_stream_replay_events_per_chunk,
+                        settings.cache_stream_replay_delay_ms / 1000,
+                    ),
+                    media_type="text/event-stream",
+                )
             return Response(content=cached, media_type="application/json")
 
+    timeout = admission_timeout(request)
     try:
         if stream:
+            monitor = StreamMonitor()
+            slot = await admit(timeout, "stream")
 
             async def streamer() -> AsyncIterator[bytes]:
-                async for chunk in stream_with_retry(
-                    f"{settings.vllm_base_url}/v1/chat/completions", payload
-                ):
-                    yield chunk
-
-            record_request("/chat", "200")
-            record_latency("/chat", start_time)
-            return StreamingResponse(streamer(), media_type="text/event-stream")
-        response = await fetch_with_retry(
-            "POST", f"{settings.vllm_base_url}/v1/chat/completions", payload
+                recorder = (
+                    StreamRecorder(settings.cache_stream_max_bytes)
+                    if settings.cache_streams
+                    else None
+                )
+                status = "499"
+                upstream_started = time.monotonic()
+                first_chunk: float | None = None
+                try:
+                    upstream = stream_with_retry("/v1/chat/completions", payload)
+                    async with aclosing(upstream) as chunks:
+                        async for chunk in timed_chunks(chunks, timings, "upstream"):
+                            if first_chunk is None:
+                                first_chunk = time.monotonic() - upstream_started
+                            monitor.feed(chunk)
+                            if recorder is not None:
+                                recorder.feed(chunk)
+                            yield chunk
+                    status = "200"
+                except httpx.HTTPError:
+                    status = "502"
+                    if slot is not None:
+                        slot.release(ok=False)
+                    raise
+                finally:
+                    if slot is not None:
+                        if status == "200" and first_chunk is not None:
+                            slot.release(sample=first_chunk)
+                        else:
+                            slot.discard()
+                    if status == "499":
+                        saved = requested_tokens(payload) - monitor.completion_tokens
+                        record_aborted("/chat", "stream", saved)
+                    finish_stream("/chat", monitor, status, start_time, request_id)
+                if recorder is not None and recorder.complete:
+                    try:
+                        await response_cache.set(key, recorder.getvalue())
+                    except RedisError:
+                        logger.warning(
+                            "cache_write_failed",
+                            extra={"request_id": request_id, "model_id": settings.model_id},
+                        )
+
+            body_iterator = streamer()
+            if slot is not None:
+                weakref.finalize(body_iterator, slot.discard)
+            return ClosingStreamingResponse(body_iterator, media_type="text/event-stream")
+        with timings.stage("upstream"):
+            if settings.singleflight_enabled:
+                (body, tokens), coalesced = await unless_disconnected(
+                    request,
+                    chat_flights.do(key, lambda: generate_chat(payload, key, request_id, timeout)),
+                )
+            else:
+                (body, tokens), coalesced = (
+                    await unless_disconnected(
+                        request, generate_chat(payload, key, request_id, timeout)
+                    ),
+                    False,
+                )
+    except ClientDisconnect:
+        record_request("/chat", "499")
+        record_latency("/chat", start_time)
+        logger.info(
+            "client_disconnected",
+            extra={"request_id": request_id, "model_id": settings.model_id},
         )
+        return Response(status_code=499)
+    except Overloaded as exc:
+        raise overloaded_response("/chat", exc) from exc
     except httpx.HTTPError as exc:
         record_error("/chat")
         record_request("/chat", "502")
@@ -206,50 +639,121 @@ async def chat(request: Request) -> Response:
         )
         raise HTTPException(status_code=502, detail="Upstream error") from exc
 
-    response_payload = response.json()
-    usage = response_payload.get("usage")
-    tokens = aggregate_tokens(usage)
-    latency_s = time.time() - start_time
-    record_tokens("/chat", tokens, latency_s)
+    if coalesced:
+        record_coalesced("/chat", "local")
     record_request("/chat", "200")
     record_latency("/chat", start_time)
 
-    if cacheable:
-        assert redis is not None
-        try:
-            await redis.setex(key, settings.cache_ttl_seconds, json.dumps(response_payload))
-        except RedisError:
-            logger.warning(
-                "cache_write_failed",
-                extra={"request_id": request_id, "model_id": settings.model_id},
-            )
-
     logger.info(
         "chat_response",
         extra={
             "request_id": request_id,
             "model_id": settings.model_id,
-            "extra": {"cached": False, "tokens": tokens},
+            "extra": {"cached": False, "coalesced": coalesced, "tokens": tokens},
+        },
+    )
+
+    return Response(content=body, media_type="application/json")
+
+
+def finish_stream(
+    path: str,
+    monitor: StreamMonitor,
+    status: str,
+    start_time: float,
+    request_id: str,
+) -> None:
+    duration = monitor.elapsed()
+    tokens = monitor.completion_tokens
+    record_request(path, status)
+    record_latency(path, start_time)
+    record_stream(path, status, monitor.ttft, monitor.inter_token, duration)
+    record_tokens(path, tokens, duration)
+    if status == "502":
+        record_error(path)
+    logger.info(
+        "chat_stream_complete",
+        extra={
+            "request_id": request_id,
+            "model_id": settings.model_id,
+            "extra": {
+                "status": status,
+                "tokens": tokens,
+                "ttft_ms": round(monitor.ttft * 1000, 1) if monitor.ttft is not None else None,
+                "duration_ms": round(duration * 1000, 1),
+                "done": monitor.done,
+            },
         },
     )
 
-    return JSONResponse(response_payload)
+
+async def generate_chat(
+    payload: dict[str, Any], key: str, request_id: str, timeout: float
+) -> tuple[bytes, int]:
+    lock = flight_lock
+    token: str | None = None
+    if lock is not None:
+        try:
+            token = await lock.acquire(key)
+            if token is None and await lock.wait(key):
+                cached = await response_cache.get(key)
+                if cached is not None:
+                    record_coalesced("/chat", "redis")
+                    return cached, 0
+        except RedisError:
+            token = None
+
+    try:
+        slot = await admit(timeout)
+        start_time = time.time()
+        with slot or nullcontext():
+            try:
+                response = await fetch_with_retry("POST", "/v1/chat/completions", payload)
+            except asyncio.CancelledError:
+                record_aborted("/chat", "unary", requested_tokens(payload))
+                raise
+        body = response.content
+        tokens = aggregate_tokens(orjson.loads(body).get("usage"))
+        record_tokens("/chat", tokens, time.time() - start_time)
+
+        try:
+            await response_cache.set(key, body)
+        except RedisError:
+            logger.warning(
+                "cache_write_failed",
+                extra={"request_id": request_id, "model_id": settings.model_id},
+            )
+        return body, tokens
+    finally:
+        if lock is not None and token is not None:
+            with suppress(RedisError):
+                await lock.release(key, token)
 
 
 @app.post("/embed")
 async def embed(request: Request) -> Response:
     start_time = time.time()
-    payload = await request.json()
+    timings: RequestTimings = request.state.timings
+    with timings.stage("parse"):
+        payload = await json_body(request, "/embed")
     payload.setdefault("model", settings.model_id)
     request_id = request.state.request_id
 
+    inputs = embedding_inputs(payload)
     try:
-        response = await fetch_with_retry(
-            "POST", f"{settings.vllm_base_url}/v1/embeddings", payload
-        )
+        if inputs is not None:
+            body = await embed_inputs(payload["model"], inputs, timings)
+        else:
+            with timings.stage("upstream"):
+                slot = await admit(admission_timeout(request), "embed")
+                with slot or nullcontext():
+                    response = await fetch_with_retry("POST", "/v1/embeddings", payload)
+            body = response.content
         record_request("/embed", "200")
         record_latency("/embed", start_time)
-        return JSONResponse(response.json())
+        return Response(content=body, media_type="application/json")
+    except Overloaded as exc:
+        raise overloaded_response("/embed", exc) from exc
     except httpx.HTTPStatusError as exc:
         record_request("/embed", str(exc.response.status_code))
         record_error("/embed")
@@ -279,4 +783,61 @@ async def embed(request: Request) -> Response:
         "object": "list",
         "warning": "Embeddings not available in vLLM deployment.",
     }
-    return JSONResponse(stub, status_code=501)
+    return ORJSONResponse(stub, status_code=501)
+
+
+async def send_embeddings(model: str, inputs: list[str]) -> tuple[list[Any], int]:
+    slot = await admit(settings.admission_queue_timeout_seconds, "embed")
+    with slot or nullcontext():
+        response = await fetch_with_retry(
+            "POST", "/v1/embeddings", {"model": model, "input": inputs}
+        )
+    body = orjson.loads(response.content)
+    data = sorted(body.get("data") or [], key=lambda item: item.get("index", 0))
+    if len(data) != len(inputs):
+        raise EmbeddingCountMismatch(
+            f"expected {len(inputs)} embeddings, upstream returned {len(data)}"
+        )
+    usage = body.get("usage") or {}
+    return [item.get("embedding") for item in data], int(usage.get("prompt_tokens", 0))
+
+
+async def embed_inputs(model: str, inputs: list[str], timings: RequestTimings) -> bytes:
+    keys = [embedding_cache_key(model, text) for text in inputs]
+    if settings.embed_cache_enabled:
+        with timings.stage("cache"):
+            encoded = list(await asyncio.gather(*(response_cache.get(key) for key in keys)))
+    else:
+        encoded = [None] * len(inputs)
+    misses = [index for index, value in enumerate(encoded) if value is None]
+    record_embed_inputs("cache", len(inputs) - len(misses))
+    record_embed_inputs("upstream", len(misses))
+    tokens = 0
+    if misses:
+        texts = [inputs[index] for index in misses]
+        with timings.stage("upstream"):
+            if settings.embed_batching_enabled:
+                vectors, tokens = await get_embed_batcher().embed(model, texts)
+            else:
+                vectors, tokens = await send_embeddings(model, texts)
+        fresh = [orjson.dumps(vector) for vector in vectors]
+        for index, value in zip(misses, fresh, strict=True):
+            encoded[index] = value
+        if settings.embed_cache_enabled:
+            try:
+                await asyncio.gather(
+                    *(response_cache.set(keys[i], v) for i, v in zip(misses, fresh, strict=True))
+                )
+            except RedisError:
+                logger.warning("cache_write_failed", extra={"model_id": settings.model_id})
+    vectors_json = [value for value in encoded if value is not None]
+    data = b",".join(
+        b'{"object":"embedding","index":%d,"embedding":%s}' % (index, value)
+        for index, value in enumerate(vectors_json)
+    )
+    usage = orjson.dumps({"prompt_tokens": tokens, "total_tokens": tokens})
+    return b'{"object":"list","data":[%s],"model":%s,"usage":%s}' % (
+        data,
+        orjson.dumps(model),
+        usage,
+    )
@@ -1,41 +1,451 @@
 from __future__ import annotations
 
+import os
 import time
+from collections.abc import Iterable, Mapping
+from typing import Generic, TypeVar
 
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
 
-REQUEST_LATENCY = Histogram("gateway_request_latency_seconds", "Latency per request", ["path"])
-REQUEST_COUNT = Counter("gateway_requests_total", "Total requests", ["path", "status"])
-CACHE_HITS = Counter("gateway_cache_hits_total", "Cache hits", ["path"])
-ERROR_COUNT = Counter("gateway_errors_total", "Errors", ["path"])
-TOKENS_TOTAL = Counter("gateway_tokens_total", "Tokens generated", ["path"])
-TOKENS_PER_SECOND = Gauge("gateway_tokens_per_second", "Tokens per second", ["path"])
+M = TypeVar("M", Counter, Gauge, Histogram)
+
+PATHS = ("/chat", "/embed")
+STATUSES = ("200", "400", "413", "429", "499", "502", "503")
+STAGES = ("ratelimit", "parse", "safety", "cache", "upstream", "overhead")
+CACHE_LOOKUP_RESULTS = (
+    ("l1", "hit"),
+    ("l1", "stale"),
+    ("l1", "miss"),
+    ("l2", "hit"),
+    ("l2", "miss"),
+)
+
+
+class Children(Generic[M]):
+    def __init__(self, metric: M, prebind: Iterable[tuple[str, ...]] = ()) -> None:
+        self.metric: M = metric
+        self._children: dict[tuple[str, ...], M] = {}
+        for labels in prebind:
+            self.get(*labels)
+
+    def get(self, *labels: str) -> M:
+        child = self._children.get(labels)
+        if child is None:
+            child = self._children[labels] = self.metric.labels(*labels)
+        return child
+
+
+def per_path(*values: tuple[str, ...]) -> list[tuple[str, ...]]:
+    return [(path, *value) for path in PATHS for value in values or [()]]
+
+
+REQUEST_LATENCY = Children(
+    Histogram("gateway_request_latency_seconds", "Latency per request", ["path"]), per_path()
+)
+REQUEST_COUNT = Children(
+    Counter("gateway_requests_total", "Total requests", ["path", "status"]),
+    per_path(*((status,) for status in STATUSES)),
+)
+REQUEST_STAGE = Children(
+    Histogram(
+        "gateway_request_stage_seconds",
+        "Request time by stage; overhead is the time not spent in any other stage",
+        ["path", "stage"],
+        buckets=(
+            0.0001,
+            0.0005,
+            0.001,
+            0.0025,
+            0.005,
+            0.01,
+            0.025,
+            0.05,
+            0.1,
+            0.25,
+            0.5,
+            1.0,
+            2.5,
+            5.0,
+            10.0,
+        ),
+    ),
+    per_path(*((stage,) for stage in STAGES)),
+)
+CACHE_HITS = Children(Counter("gateway_cache_hits_total", "Cache hits", ["path"]), per_path())
+CACHE_LOOKUPS = Children(
+    Counter("gateway_cache_lookups_total", "Response cache lookups", ["tier", "result"]),
+    CACHE_LOOKUP_RESULTS,
+)
+CACHE_EVICTIONS = Children(
+    Counter("gateway_cache_evictions_total", "Response cache evictions", ["tier", "reason"])
+)
+CACHE_L1_ENTRIES = Gauge(
+    "gateway_cache_l1_entries", "Entries held in the in-process cache", multiprocess_mode="livesum"
+)
+CACHE_L1_BYTES = Gauge(
+    "gateway_cache_l1_bytes", "Bytes held in the in-process cache", multiprocess_mode="livesum"
+)
+COALESCED = Children(
+    Counter(
+        "gateway_singleflight_coalesced_total",
+        "Requests served by another request's in-flight upstream call",
+        ["path", "scope"],
+    )
+)
+ERROR_COUNT = Children(Counter("gateway_errors_total", "Errors", ["path"]), per_path())
+TOKENS_TOTAL = Children(Counter("gateway_tokens_total", "Tokens generated", ["path"]), per_path())
+TOKENS_PER_SECOND = Children(
+    Histogram(
+        "gateway_tokens_per_second",
+        "Tokens per second of each completed request",
+        ["path"],
+        buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    ),
+    per_path(),
+)
+STREAM_TTFT = Children(
+    Histogram(
+        "gateway_stream_ttft_seconds",
+        "Time from request arrival to the first streamed token",
+        ["path"],
+        buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+    ),
+    per_path(),
+)
+STREAM_INTER_TOKEN = Children(
+    Histogram(
+        "gateway_stream_inter_token_seconds",
+        "Gap between consecutive streamed tokens",
+        ["path"],
+        buckets=(0.001, 0.005, 0.01, 0.02, 0.035, 0.05, 0.075, 0.1, 0.25, 0.5, 1.0),
+    ),
+    per_path(),
+)
+STREAM_DURATION = Children(
+    Histogram(
+        "gateway_stream_duration_seconds",
+        "Total streamed response duration by final status",
+        ["path", "status"],
+        buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+    ),
+    per_path(("200",), ("499",), ("502",)),
+)
+ABORTED_GENERATIONS = Children(
+    Counter(
+        "gateway_aborted_generations_total",
+        "Upstream generations cancelled because the client disconnected",
+        ["path", "mode"],
+    )
+)
+ABORTED_TOKENS_SAVED = Children(
+    Counter(
+        "gateway_aborted_tokens_saved_total",
+        "Estimated completion tokens not generated thanks to aborts (max_tokens minus tokens seen)",
+        ["path"],
+    )
+)
+CAPTURE_ENTRIES = Children(
+    Counter("gateway_capture_entries_total", "Traffic capture entries by outcome", ["outcome"])
+)
+LOG_RECORDS_DROPPED = Children(
+    Counter("gateway_log_records_dropped_total", "Log records not written", ["reason"])
+)
+RATE_LIMIT_BUCKETS = Gauge(
+    "gateway_rate_limit_buckets", "Token buckets held in memory", multiprocess_mode="livesum"
+)
+RATE_LIMIT_EVICTIONS = Children(
+    Counter("gateway_rate_limit_evictions_total", "Token buckets evicted", ["reason"])
+)
+RATE_LIMIT_FALLBACKS = Counter(
+    "gateway_rate_limit_fallbacks_total", "Redis rate limit checks served by the local limiter"
+)
+ADMISSION_LIMIT = Gauge(
+    "gateway_admission_limit",
+    "Adaptive upstream concurrency limit",
+    multiprocess_mode="livesum",
+)
+ADMISSION_INFLIGHT = Gauge(
+    "gateway_admission_inflight",
+    "Admitted upstream requests in flight",
+    multiprocess_mode="livesum",
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "gateway_admission_queue_depth",
+    "Requests waiting for admission",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram("gateway_admission_wait_seconds", "Time spent in the admission queue")
+ADMISSION_SHED = Children(
+    Counter("gateway_admission_shed_total", "Requests shed with 503", ["reason"])
+)
+UPSTREAM_INFLIGHT = Gauge(
+    "gateway_upstream_inflight",
+    "Upstream requests holding a connection",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_POOL_MAX = Gauge(
+    "gateway_upstream_pool_max_connections", "Upstream pool size", multiprocess_mode="livesum"
+)
+UPSTREAM_REQUESTS_INFLIGHT = Children(
+    Gauge(
+        "gateway_upstream_requests_inflight",
+        "In-flight requests per upstream",
+        ["upstream"],
+        multiprocess_mode="livesum",
+    )
+)
+UPSTREAM_LATENCY = Children(
+    Histogram("gateway_upstream_latency_seconds", "Upstream response latency", ["upstream"])
+)
+UPSTREAM_FAILURES = Children(
+    Counter(
+        "gateway_upstream_failures_total",
+        "Upstream 5xx/429 and transport errors",
+        ["upstream", "kind"],
+    )
+)
+UPSTREAM_EJECTIONS = Children(
+    Counter("gateway_upstream_ejections_total", "Outlier ejections per upstream", ["upstream"])
+)
+UPSTREAM_AFFINITY = Children(
+    Counter(
+        "gateway_upstream_affinity_total",
+        "Prefix-affinity routing outcomes by home replica",
+        ["upstream", "result"],
+    )
+)
+UPSTREAM_PATHS = ("/v1/chat/completions", "/v1/embeddings")
+UPSTREAM_RETRIES = Children(
+    Counter(
+        "gateway_upstream_retries_total",
+        "Upstream retries sent, or skipped because the retry budget was empty",
+        ["path", "outcome"],
+    ),
+    [(path, outcome) for path in UPSTREAM_PATHS for outcome in ("retried", "budget_exhausted")],
+)
+UPSTREAM_HEDGES = Children(
+    Counter(
+        "gateway_upstream_hedges_total",
+        "Hedged upstream requests: sent, won by the hedge, lost to the primary, or skipped "
+        "for lack of budget or a free upstream",
+        ["path", "outcome"],
+    ),
+    [
+        (path, outcome)
+        for path in UPSTREAM_PATHS
+        for outcome in ("sent", "won", "lost", "budget_exhausted", "no_upstream")
+    ],
+)
+RETRY_BUDGET_TOKENS = Gauge(
+    "gateway_retry_budget_tokens",
+    "Retries and hedges the shared budget currently allows",
+    multiprocess_mode="livesum",
+)
+UPSTREAM_HEALTHY = Children(
+    Gauge(
+        "gateway_upstream_healthy",
+        "Active health check status",
+        ["upstream"],
+        multiprocess_mode="livemin",
+    )
+)
+UPSTREAM_POOL_TIMEOUTS = Counter(
+    "gateway_upstream_pool_timeouts_total", "Requests that timed out waiting for a connection"
+)
+EMBED_BATCH_SIZE = Histogram(
+    "gateway_embed_batch_size",
+    "Inputs per upstream embeddings call",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+EMBED_BATCH_WAIT = Histogram(
+    "gateway_embed_batch_wait_seconds",
+    "Time an embed input waited for its batch to be sent",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+EMBED_INPUTS = Children(
+    Counter("gateway_embed_inputs_total", "Embedding inputs by source", ["source"]),
+    [("cache",), ("upstream",)],
+)
 
 
 def record_latency(path: str, start_time: float) -> None:
-    REQUEST_LATENCY.labels(path=path).observe(time.time() - start_time)
+    REQUEST_LATENCY.get(path).observe(time.time() - start_time)
 
 
 def record_request(path: str, status: str) -> None:
-    REQUEST_COUNT.labels(path=path, status=status).inc()
+    REQUEST_COUNT.get(path, status).inc()
 
 
 def record_cache_hit(path: str) -> None:
-    CACHE_HITS.labels(path=path).inc()
+    CACHE_HITS.get(path).inc()
+
+
+def record_cache_lookup(tier: str, result: str) -> None:
+    CACHE_LOOKUPS.get(tier, result).inc()
+
+
+def record_cache_eviction(tier: str, reason: str) -> None:
+    CACHE_EVICTIONS.get(tier, reason).inc()
+
+
+def record_local_cache_size(entries: int, nbytes: int) -> None:
+    CACHE_L1_ENTRIES.set(entries)
+    CACHE_L1_BYTES.set(nbytes)
+
+
+def record_coalesced(path: str, scope: str) -> None:
+    COALESCED.get(path, scope).inc()
 
 
 def record_error(path: str) -> None:
-    ERROR_COUNT.labels(path=path).inc()
+    ERROR_COUNT.get(path).inc()
+
+
+def record_stages(path: str, stages: Mapping[str, float], total_s: float) -> None:
+    for stage, seconds in stages.items():
+        REQUEST_STAGE.get(path, stage).observe(seconds)
+    REQUEST_STAGE.get(path, "overhead").observe(max(0.0, total_s - sum(stages.values())))
 
 
 def record_tokens(path: str, tokens: int, latency_s: float) -> None:
-    TOKENS_TOTAL.labels(path=path).inc(tokens)
-    if latency_s > 0:
-        TOKENS_PER_SECOND.labels(path=path).set(tokens / latency_s)
+    TOKENS_TOTAL.get(path).inc(tokens)
+    if tokens > 0 and latency_s > 0:
+        TOKENS_PER_SECOND.get(path).observe(tokens / latency_s)
+
+
+def record_stream(
+    path: str, status: str, ttft_s: float | None, inter_token_s: list[float], duration_s: float
+) -> None:
+    if ttft_s is not None:
+        STREAM_TTFT.get(path).observe(ttft_s)
+    inter_token = STREAM_INTER_TOKEN.get(path)
+    for gap in inter_token_s:
+        inter_token.observe(gap)
+    STREAM_DURATION.get(path, status).observe(duration_s)
+
+
+def record_aborted(path: str, mode: str, tokens_saved: int) -> None:
+    ABORTED_GENERATIONS.get(path, mode).inc()
+    if tokens_saved > 0:
+        ABORTED_TOKENS_SAVED.get(path).inc(tokens_saved)
+
+
+def record_rate_limit_buckets(count: int) -> None:
+    RATE_LIMIT_BUCKETS.set(count)
+
+
+def record_rate_limit_eviction(reason: str, count: int = 1) -> None:
+    RATE_LIMIT_EVICTIONS.get(reason).inc(count)
+
+
+def record_rate_limit_fallback() -> None:
+    RATE_LIMIT_FALLBACKS.inc()
+
+
+def record_admission_state(limit: int, inflight: int, queued: int) -> None:
+    ADMISSION_LIMIT.set(limit)
+    ADMISSION_INFLIGHT.set(inflight)
+    ADMISSION_QUEUE_DEPTH.set(queued)
+
+
+def record_admission_wait(seconds: float) -> None:
+    ADMISSION_WAIT.observe(seconds)
+
+
+def record_admission_shed(reason: str) -> None:
+    ADMISSION_SHED.get(reason).inc()
+
+
+def record_upstream_pool_size(max_connections: int) -> None:
+    UPSTREAM_POOL_MAX.set(max_connections)
+
+
+def record_upstream_start() -> None:
+    UPSTREAM_INFLIGHT.inc()
+
+
+def record_upstream_end() -> None:
+    UPSTREAM_INFLIGHT.dec()
+
+
+def record_pool_timeout() -> None:
+    UPSTREAM_POOL_TIMEOUTS.inc()
+
+
+def record_upstream_inflight(upstream: str, inflight: int) -> None:
+    UPSTREAM_REQUESTS_INFLIGHT.get(upstream).set(inflight)
+
+
+def record_upstream_latency(upstream: str, latency_s: float) -> None:
+    UPSTREAM_LATENCY.get(upstream).observe(latency_s)
+
+
+def record_upstream_failure(upstream: str, kind: str) -> None:
+    UPSTREAM_FAILURES.get(upstream, kind).inc()
+
+
+def record_upstream_ejection(upstream: str) -> None:
+    UPSTREAM_EJECTIONS.get(upstream).inc()
+
+
+def record_upstream_health(upstream: str, healthy: bool) -> None:
+    UPSTREAM_HEALTHY.get(upstream).set(1 if healthy else 0)
+
+
+def record_affinity(upstream: str, result: str) -> None:
+    UPSTREAM_AFFINITY.get(upstream, result).inc()
+
+
+def record_retry(path: str, outcome: str) -> None:
+    UPSTREAM_RETRIES.get(path, outcome).inc()
+
+
+def record_hedge(path: str, outcome: str) -> None:
+    UPSTREAM_HEDGES.get(path, outcome).inc()
+
+
+def record_retry_budget(tokens: float) -> None:
+    RETRY_BUDGET_TOKENS.set(tokens)
+
+
+def record_embed_batch(size: int, waits: list[float]) -> None:
+    EMBED_BATCH_SIZE.observe(size)
+    for wait in waits:
+        EMBED_BATCH_WAIT.observe(wait)
+
+
+def record_embed_inputs(source: str, count: int) -> None:
+    if count:
+        EMBED_INPUTS.get(source).inc(count)
+
+
+def record_capture(outcome: str, count: int = 1) -> None:
+    CAPTURE_ENTRIES.get(outcome).inc(count)
+
+
+def record_log_dropped(reason: str) -> None:
+    LOG_RECORDS_DROPPED.get(reason).inc()
 
 
 def render_metrics() -> tuple[bytes, str]:
-    return generate_latest(), CONTENT_TYPE_LATEST
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(), CONTENT_TYPE_LATEST
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+def mark_worker_exit() -> None:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        multiprocess.mark_process_dead(os.getpid())  # type: ignore[no-untyped-call]
 
 
 def aggregate_tokens(usage: dict[str, int] | None) -> int:
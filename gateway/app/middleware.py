@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import time
+import uuid
+from collections.abc import Callable
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from gateway.app.capture import CAPTURE_PATHS, CapturedRequest, TrafficCapture
+from gateway.app.config import settings
+from gateway.app.limits import RateLimiter, RedisRateLimiter
+from gateway.app.metrics import PATHS, record_request, record_stages
+from gateway.app.serialization import ORJSONResponse
+from gateway.app.timing import RequestTimings
+
+
+class PayloadTooLarge(Exception):
+    pass
+
+
+def server_timing_requested(headers: Headers) -> bool:
+    header = settings.server_timing_request_header
+    return settings.server_timing_enabled or bool(header and headers.get(header))
+
+
+class RequestMiddleware:
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: Callable[[], RateLimiter | RedisRateLimiter],
+        capture: Callable[[], TrafficCapture | None] = lambda: None,
+    ) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.capture = capture
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        timings = RequestTimings()
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id")
+        if request_id is None:
+            request_id = str(uuid.uuid4())
+        state = scope.setdefault("state", {})
+        state["timings"] = timings
+        state["request_id"] = request_id
+        path: str = scope["path"]
+        timing_header = server_timing_requested(headers)
+        status = 500
+        started = False
+
+        async def send_with_headers(message: Message) -> None:
+            nonlocal status, started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                started = True
+                response_headers = MutableHeaders(scope=message)
+                response_headers["x-request-id"] = request_id
+                if timing_header:
+                    response_headers["server-timing"] = timings.server_timing()
+            await send(message)
+
+        async def reject(status_code: int, error: str) -> None:
+            record_request(path, str(status_code))
+            response = ORJSONResponse(
+                {"error": error, "request_id": request_id}, status_code=status_code
+            )
+            await response(scope, receive, send_with_headers)
+
+        try:
+            client = scope.get("client")
+            with timings.stage("ratelimit"):
+                allowed = await self.limiter().allow(client[0] if client else "unknown")
+            if not allowed:
+                await reject(429, "rate_limited")
+                return
+
+            limit = settings.request_size_limit_bytes
+            content_length = headers.get("content-length")
+            if content_length and int(content_length) > limit:
+                await reject(413, "payload_too_large")
+                return
+
+            capture = self.capture()
+            body: list[bytes] | None = None
+            if capture is not None and path in CAPTURE_PATHS and capture.sampled():
+                body = []
+            received = 0
+
+            async def receive_limited() -> Message:
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    chunk: bytes = message.get("body", b"")
+                    received += len(chunk)
+                    if received > limit:
+                        raise PayloadTooLarge()
+                    if body is not None:
+                        body.append(chunk)
+                return message
+
+            arrival = time.time()
+            try:
+                await self.app(scope, receive_limited, send_with_headers)
+            except PayloadTooLarge:
+                body = None
+                if started:
+                    raise
+                await reject(413, "payload_too_large")
+            finally:
+                if capture is not None and body is not None:
+                    capture.record(
+                        CapturedRequest(
+                            arrival, path, b"".join(body), status, time.time() - arrival, request_id
+                        )
+                    )
+        finally:
+            if path in PATHS:
+                record_stages(path, timings.stages, timings.elapsed())
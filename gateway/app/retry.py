@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import deque
+from collections.abc import Callable, Collection
+
+import httpx
+
+from gateway.app.metrics import record_retry_budget
+
+
+def is_retryable(exc: BaseException, statuses: Collection[int]) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in statuses
+    return isinstance(exc, httpx.TransportError)
+
+
+def backoff_seconds(attempt: int, min_seconds: float, max_seconds: float) -> float:
+    return min(max_seconds, min_seconds * 2.0 ** (attempt - 1))
+
+
+class RetryBudget:
+    def __init__(
+        self,
+        ratio: float,
+        min_per_second: float,
+        burst: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._ratio = ratio
+        self._min_per_second = min_per_second
+        self._burst = burst
+        self._clock = clock
+        self._tokens = float(burst)
+        self._updated = clock()
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated
+        self._updated = now
+        self._tokens = min(self._burst, self._tokens + elapsed * self._min_per_second)
+
+    def deposit(self) -> None:
+        self._refill()
+        self._tokens = min(self._burst, self._tokens + self._ratio)
+        record_retry_budget(self._tokens)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        record_retry_budget(self._tokens)
+        return True
+
+
+class LatencyTracker:
+    def __init__(
+        self, percentile: float, window: int = 1000, min_samples: int = 20, refresh: int = 50
+    ) -> None:
+        self._percentile = percentile
+        self._samples: deque[float] = deque(maxlen=window)
+        self._min_samples = min_samples
+        self._refresh = refresh
+        self._since_refresh = 0
+        self._threshold: float | None = None
+
+    def observe(self, seconds: float) -> None:
+        self._samples.append(seconds)
+        self._since_refresh += 1
+        if self._threshold is None and len(self._samples) < self._min_samples:
+            return
+        if self._threshold is None or self._since_refresh >= self._refresh:
+            ordered = sorted(self._samples)
+            index = math.ceil(self._percentile / 100 * len(ordered)) - 1
+            self._threshold = ordered[max(0, index)]
+            self._since_refresh = 0
+
+    def threshold(self) -> float | None:
+        return self._threshold
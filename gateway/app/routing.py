@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+from collections.abc import Iterator
+
+import orjson
+
+
+def stable_hash(data: bytes) -> int:
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def prefix_hash(messages: object, prefix_chars: int) -> int | None:
+    if not isinstance(messages, list):
+        return None
+    parts: list[str] = []
+    budget = prefix_chars
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        content = message.get("content", "")
+        text = content if isinstance(content, str) else orjson.dumps(content).decode()
+        if message.get("role") == "system" and budget == prefix_chars:
+            parts.append(text)
+            continue
+        if budget <= 0:
+            break
+        parts.append(text[:budget])
+        budget -= len(parts[-1])
+    if not parts:
+        return None
+    return stable_hash("\x1f".join(parts).encode())
+
+
+class HashRing:
+    def __init__(self, nodes: list[str], virtual_nodes: int = 100) -> None:
+        points = sorted(
+            (stable_hash(f"{node}#{replica}".encode()), index)
+            for index, node in enumerate(nodes)
+            for replica in range(virtual_nodes)
+        )
+        self._hashes = [point for point, _ in points]
+        self._owners = [owner for _, owner in points]
+        self._size = len(nodes)
+
+    def walk(self, key: int) -> Iterator[int]:
+        if not self._hashes:
+            return
+        start = bisect.bisect(self._hashes, key) % len(self._hashes)
+        seen: set[int] = set()
+        for offset in range(len(self._hashes)):
+            owner = self._owners[(start + offset) % len(self._hashes)]
+            if owner not in seen:
+                seen.add(owner)
+                yield owner
+                if len(seen) == self._size:
+                    return
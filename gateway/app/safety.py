@@ -1,6 +1,14 @@
 from __future__ import annotations
 
+import importlib
+import re
+from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from typing import Any
+
+SEPARATOR = "\x00"
+SCAN_MAX_TERMS = 128
+AUTOMATON_MODULE = "ahocorasick"
 
 
 @dataclass(slots=True)
@@ -10,20 +18,124 @@ class SafetyResult:
     adjusted_max_tokens: int | None = None
 
 
+def trie_pattern(words: Iterable[str], shortest_match: bool) -> str | None:
+    root: dict[str, Any] = {}
+    for word in words:
+        node = root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node: dict[str, Any]) -> str:
+        terminal = "" in node
+        if terminal and shortest_match:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        if len(branches) == 1 and not terminal:
+            return branches[0]
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if terminal else body
+
+    pattern = build(root)
+    return pattern or None
+
+
+def _load_automaton_module() -> Any:
+    try:
+        return importlib.import_module(AUTOMATON_MODULE)
+    except ImportError:
+        return None
+
+
+def build_automaton(words: Iterable[str]) -> Any:
+    module = _load_automaton_module()
+    if module is None:
+        return None
+    automaton = module.Automaton()
+    for word in words:
+        automaton.add_word(word, len(word))
+    if len(automaton) == 0:
+        return None
+    automaton.make_automaton()
+    return automaton
+
+
+def is_word_char(text: str, index: int) -> bool:
+    return 0 <= index < len(text) and (text[index].isalnum() or text[index] == "_")
+
+
+def message_texts(messages: object) -> Iterator[str]:
+    if not isinstance(messages, list):
+        return
+    for message in messages:
+        if not isinstance(message, dict):
+            continue
+        content = message.get("content", "")
+        if isinstance(content, str):
+            yield content
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, str):
+                    yield part
+                elif isinstance(part, dict) and isinstance(part.get("text"), str):
+                    yield part["text"]
+        elif content is not None:
+            yield str(content)
+
+
 class SafetyChecker:
-    def __init__(self, max_tokens_cap: int, denylist_words: list[str]) -> None:
+    def __init__(
+        self,
+        max_tokens_cap: int,
+        denylist_words: list[str],
+        word_boundary: bool = False,
+        casefold: bool = False,
+        use_automaton: bool = True,
+    ) -> None:
         self._max_tokens_cap = max_tokens_cap
-        self._denylist = {word.lower() for word in denylist_words}
+        self._fold = str.casefold if casefold else str.lower
+        self._word_boundary = word_boundary
+        words = {self._fold(word) for word in denylist_words if word}
+        self._terms: tuple[str, ...] = ()
+        self._automaton: Any = None
+        self._denylist: re.Pattern[str] | None = None
+        if not word_boundary and len(words) <= SCAN_MAX_TERMS:
+            self._terms = tuple(sorted(words))
+            return
+        if use_automaton:
+            self._automaton = build_automaton(words)
+        if self._automaton is None:
+            pattern = trie_pattern(words, shortest_match=not word_boundary)
+            if pattern is not None and word_boundary:
+                pattern = rf"(?<!\w){pattern}(?!\w)"
+            self._denylist = re.compile(pattern) if pattern is not None else None
+
+    @property
+    def backend(self) -> str:
+        if self._automaton is not None:
+            return "automaton"
+        return "regex" if self._denylist is not None else "scan"
+
+    def denied(self, payload: dict[str, object]) -> bool:
+        if not self._terms and self._automaton is None and self._denylist is None:
+            return False
+        text = self._fold(SEPARATOR.join(message_texts(payload.get("messages", []))))
+        if self._automaton is not None:
+            for end, length in self._automaton.iter(text):
+                if not self._word_boundary:
+                    return True
+                if not is_word_char(text, end - length) and not is_word_char(text, end + 1):
+                    return True
+            return False
+        if self._denylist is not None:
+            return self._denylist.search(text) is not None
+        return any(term in text for term in self._terms)
 
     def check(self, payload: dict[str, object]) -> SafetyResult:
-        messages = payload.get("messages", [])
-        if isinstance(messages, list):
-            for message in messages:
-                if not isinstance(message, dict):
-                    continue
-                content = str(message.get("content", "")).lower()
-                if any(word in content for word in self._denylist):
-                    return SafetyResult(allowed=False, reason="denylist")
+        if self.denied(payload):
+            return SafetyResult(allowed=False, reason="denylist")
         max_tokens = payload.get("max_tokens")
         if isinstance(max_tokens, int) and max_tokens > self._max_tokens_cap:
             return SafetyResult(
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from redis.asyncio import Redis
+
+T = TypeVar("T")
+
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(slots=True)
+class _Call(Generic[T]):
+    task: asyncio.Future[T]
+    waiters: int = field(default=0)
+
+
+class SingleFlight(Generic[T]):
+    def __init__(self) -> None:
+        self._calls: dict[str, _Call[T]] = {}
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> tuple[T, bool]:
+        call = self._calls.get(key)
+        shared = call is not None
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                call.task.cancel()
+        return result, shared
+
+    def _forget(self, key: str, call: _Call[T]) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+
+class RedisFlightLock:
+    def __init__(self, redis: Redis[Any], ttl_seconds: float, poll_interval_seconds: float) -> None:
+        self._redis = redis
+        self._ttl_ms = max(1, int(ttl_seconds * 1000))
+        self._poll_interval = poll_interval_seconds
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    async def acquire(self, key: str) -> str | None:
+        token = uuid.uuid4().hex
+        acquired = await self._redis.set(f"lock:{key}", token, nx=True, px=self._ttl_ms)
+        return token if acquired else None
+
+    async def wait(self, key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self._ttl_ms / 1000
+        while loop.time() < deadline:
+            pipe = self._redis.pipeline(transaction=False)
+            pipe.exists(f"lock:{key}")
+            pipe.exists(key)
+            locked, ready = await pipe.execute()
+            if ready or not locked:
+                return bool(ready)
+            await asyncio.sleep(self._poll_interval)
+        return False
+
+    async def release(self, key: str, token: str) -> None:
+        await self._release(keys=[f"lock:{key}"], args=[token])
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable
+
+import orjson
+from starlette.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+DONE_EVENT = b"data: [DONE]"
+
+
+class StreamRecorder:
+    def __init__(self, max_bytes: int) -> None:
+        self._max_bytes = max_bytes
+        self._chunks: list[bytes] = []
+        self._size = 0
+        self.overflowed = False
+
+    def feed(self, chunk: bytes) -> None:
+        if self.overflowed:
+            return
+        self._size += len(chunk)
+        if self._size > self._max_bytes:
+            self.overflowed = True
+            self._chunks.clear()
+            return
+        self._chunks.append(chunk)
+
+    @property
+    def complete(self) -> bool:
+        if self.overflowed or not self._chunks:
+            return False
+        tail = b"".join(self._chunks[-2:]).rstrip()
+        return tail.endswith(DONE_EVENT)
+
+    def getvalue(self) -> bytes:
+        return b"".join(self._chunks)
+
+
+class StreamMonitor:
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._pending = b""
+        self.started = clock()
+        self.first_token_at: float | None = None
+        self.last_token_at: float | None = None
+        self.inter_token: list[float] = []
+        self.delta_tokens = 0
+        self.usage_tokens: int | None = None
+        self.done = False
+
+    def feed(self, chunk: bytes) -> None:
+        lines = (self._pending + chunk).split(b"\n")
+        self._pending = lines.pop()
+        now = self._clock()
+        for line in lines:
+            line = line.strip()
+            if line.startswith(b"data:"):
+                self._observe(line[5:].strip(), now)
+
+    def _observe(self, data: bytes, now: float) -> None:
+        if data == b"[DONE]":
+            self.done = True
+            return
+        try:
+            event = orjson.loads(data)
+        except orjson.JSONDecodeError:
+            return
+        if not isinstance(event, dict):
+            return
+        usage = event.get("usage")
+        if isinstance(usage, dict) and isinstance(usage.get("completion_tokens"), int):
+            self.usage_tokens = usage["completion_tokens"]
+        for choice in event.get("choices") or ():
+            if not isinstance(choice, dict):
+                continue
+            delta = choice.get("delta")
+            text = delta.get("content") if isinstance(delta, dict) else choice.get("text")
+            if not text:
+                continue
+            self.delta_tokens += 1
+            if self.last_token_at is None:
+                self.first_token_at = now
+            else:
+                self.inter_token.append(now - self.last_token_at)
+            self.last_token_at = now
+
+    @property
+    def ttft(self) -> float | None:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started
+
+    @property
+    def completion_tokens(self) -> int:
+        return self.usage_tokens if self.usage_tokens is not None else self.delta_tokens
+
+    def elapsed(self) -> float:
+        return self._clock() - self.started
+
+
+def split_sse_events(data: bytes) -> list[bytes]:
+    normalized = data.replace(b"\r\n", b"\n")
+    return [event + b"\n\n" for event in normalized.split(b"\n\n") if event.strip()]
+
+
+async def replay_sse(
+    data: bytes, events_per_chunk: int, delay_seconds: float
+) -> AsyncIterator[bytes]:
+    if events_per_chunk <= 0:
+        yield data
+        return
+    events = split_sse_events(data)
+    for start in range(0, len(events), events_per_chunk):
+        if start and delay_seconds > 0:
+            await asyncio.sleep(delay_seconds)
+        yield b"".join(events[start : start + events_per_chunk])
+
+
+class ClosingStreamingResponse(StreamingResponse):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            aclose = getattr(self.body_iterator, "aclose", None)
+            if aclose is not None:
+                await aclose()
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+from collections.abc import AsyncIterable, AsyncIterator, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(slots=True)
+class RequestTimings:
+    stages: dict[str, float] = field(default_factory=dict)
+    started: float = field(default_factory=time.perf_counter)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        total = self.elapsed()
+        overhead = max(0.0, total - sum(self.stages.values()))
+        entries = [*self.stages.items(), ("overhead", overhead), ("total", total)]
+        return ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in entries)
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - started)
+
+
+async def timed_chunks(
+    chunks: AsyncIterable[T], timings: RequestTimings, stage: str
+) -> AsyncIterator[T]:
+    iterator = aiter(chunks)
+    while True:
+        started = time.perf_counter()
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            timings.add(stage, time.perf_counter() - started)
+        yield chunk
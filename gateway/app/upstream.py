@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import math
+import random
+import time
+from collections.abc import Callable, Collection, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+import httpx
+
+from gateway.app.config import Settings
+from gateway.app.metrics import (
+    record_affinity,
+    record_pool_timeout,
+    record_upstream_ejection,
+    record_upstream_end,
+    record_upstream_failure,
+    record_upstream_health,
+    record_upstream_inflight,
+    record_upstream_latency,
+    record_upstream_pool_size,
+    record_upstream_start,
+)
+from gateway.app.routing import HashRing
+
+logger = logging.getLogger("gateway.upstream")
+
+
+class NoUpstreamAvailable(httpx.TransportError):
+    pass
+
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code == 429 or exc.response.status_code >= 500
+    return isinstance(exc, httpx.TransportError)
+
+
+@dataclass(slots=True)
+class Upstream:
+    url: str
+    inflight: int = 0
+    healthy: bool = True
+    consecutive_failures: int = 0
+    ejections: int = 0
+    ejected_until: float = 0.0
+    ewma_latency: float = 0.0
+
+    def score(self) -> tuple[int, float]:
+        return self.inflight, self.ewma_latency
+
+
+def build_upstream_client(settings: Settings) -> httpx.AsyncClient:
+    limits = httpx.Limits(
+        max_connections=settings.upstream_max_connections,
+        max_keepalive_connections=settings.upstream_max_keepalive_connections,
+        keepalive_expiry=settings.upstream_keepalive_expiry_seconds,
+    )
+    timeout = httpx.Timeout(
+        connect=settings.upstream_connect_timeout_seconds,
+        read=settings.upstream_read_timeout_seconds,
+        write=settings.upstream_write_timeout_seconds,
+        pool=settings.upstream_pool_timeout_seconds,
+    )
+    http2 = settings.upstream_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("upstream_http2_unavailable", extra={"extra": {"fallback": "http/1.1"}})
+        http2 = False
+    record_upstream_pool_size(settings.upstream_max_connections)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+@contextmanager
+def track_upstream() -> Iterator[None]:
+    record_upstream_start()
+    try:
+        yield
+    except httpx.PoolTimeout:
+        record_pool_timeout()
+        raise
+    finally:
+        record_upstream_end()
+
+
+class UpstreamPool:
+    def __init__(
+        self,
+        urls: list[str],
+        strategy: str = "least_outstanding",
+        max_inflight: int = 0,
+        eject_after_failures: int = 5,
+        eject_base_seconds: float = 10.0,
+        eject_max_seconds: float = 120.0,
+        affinity_load_factor: float = 1.25,
+        virtual_nodes: int = 100,
+        rng: random.Random | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not urls:
+            raise ValueError("at least one upstream url is required")
+        if strategy not in ("least_outstanding", "p2c"):
+            raise ValueError(f"unknown balancing strategy: {strategy}")
+        self.upstreams = [Upstream(url.rstrip("/")) for url in urls]
+        self._strategy = strategy
+        self._max_inflight = max_inflight
+        self._eject_after = eject_after_failures
+        self._eject_base = eject_base_seconds
+        self._eject_max = eject_max_seconds
+        self._load_factor = affinity_load_factor
+        self._ring = HashRing([upstream.url for upstream in self.upstreams], virtual_nodes)
+        self._rng = rng or random.Random()
+        self._clock = clock
+        for upstream in self.upstreams:
+            record_upstream_health(upstream.url, True)
+
+    def available(self, upstream: Upstream, now: float) -> bool:
+        if self._max_inflight and upstream.inflight >= self._max_inflight:
+            return False
+        return upstream.healthy and upstream.ejected_until <= now
+
+    def candidates(self, exclude: Collection[Upstream] = ()) -> list[Upstream]:
+        now = self._clock()
+        candidates = [u for u in self.upstreams if u not in exclude and self.available(u, now)]
+        if candidates:
+            return candidates
+        candidates = [u for u in self.upstreams if self.available(u, now)]
+        if candidates:
+            return candidates
+        return [
+            u for u in self.upstreams if not self._max_inflight or u.inflight < self._max_inflight
+        ]
+
+    def pick(self, exclude: Collection[Upstream] = (), affinity: int | None = None) -> Upstream:
+        candidates = self.candidates(exclude)
+        if not candidates:
+            raise NoUpstreamAvailable("all upstreams are at their in-flight limit")
+        if affinity is not None:
+            return self._pick_affine(candidates, affinity)
+        if len(candidates) == 1:
+            return candidates[0]
+        if self._strategy == "p2c":
+            first, second = self._rng.sample(candidates, 2)
+            return first if first.score() <= second.score() else second
+        best = min(upstream.inflight for upstream in candidates)
+        return self._rng.choice([u for u in candidates if u.inflight == best])
+
+    def _pick_affine(self, candidates: list[Upstream], affinity: int) -> Upstream:
+        total = sum(upstream.inflight for upstream in candidates) + 1
+        capacity = math.ceil(total * self._load_factor / len(candidates))
+        home: Upstream | None = None
+        for index in self._ring.walk(affinity):
+            upstream = self.upstreams[index]
+            if home is None:
+                home = upstream
+            if upstream in candidates and upstream.inflight < capacity:
+                record_affinity(home.url, "hit" if upstream is home else "spill")
+                return upstream
+        fallback = min(candidates, key=Upstream.score)
+        record_affinity(home.url if home else fallback.url, "spill")
+        return fallback
+
+    @contextmanager
+    def track(self, upstream: Upstream) -> Iterator[None]:
+        upstream.inflight += 1
+        record_upstream_inflight(upstream.url, upstream.inflight)
+        started = self._clock()
+        try:
+            with track_upstream():
+                yield
+        except BaseException as exc:
+            if is_upstream_failure(exc):
+                self.record_failure(upstream, type(exc).__name__)
+            raise
+        else:
+            self.record_success(upstream, self._clock() - started)
+        finally:
+            upstream.inflight -= 1
+            record_upstream_inflight(upstream.url, upstream.inflight)
+
+    def record_success(self, upstream: Upstream, latency_s: float) -> None:
+        upstream.consecutive_failures = 0
+        upstream.ejections = 0
+        if upstream.ewma_latency:
+            upstream.ewma_latency = 0.8 * upstream.ewma_latency + 0.2 * latency_s
+        else:
+            upstream.ewma_latency = latency_s
+        record_upstream_latency(upstream.url, latency_s)
+
+    def record_failure(self, upstream: Upstream, kind: str) -> None:
+        record_upstream_failure(upstream.url, kind)
+        upstream.consecutive_failures += 1
+        if upstream.consecutive_failures < self._eject_after:
+            return
+        duration = min(self._eject_max, self._eject_base * 2**upstream.ejections)
+        upstream.ejected_until = self._clock() + duration
+        upstream.ejections += 1
+        upstream.consecutive_failures = 0
+        record_upstream_ejection(upstream.url)
+        logger.warning(
+            "upstream_ejected",
+            extra={"extra": {"upstream": upstream.url, "seconds": duration}},
+        )
+
+    async def check_health(self, client: httpx.AsyncClient, timeout: float) -> None:
+        async def probe(upstream: Upstream) -> None:
+            try:
+                response = await client.get(f"{upstream.url}/health", timeout=timeout)
+                healthy = response.status_code == 200
+            except httpx.HTTPError:
+                healthy = False
+            if healthy != upstream.healthy:
+                logger.warning(
+                    "upstream_health_changed",
+                    extra={"extra": {"upstream": upstream.url, "healthy": healthy}},
+                )
+            upstream.healthy = healthy
+            record_upstream_health(upstream.url, healthy)
+
+        await asyncio.gather(*(probe(upstream) for upstream in self.upstreams))
+
+    async def health_loop(
+        self, client: httpx.AsyncClient, interval_seconds: float, timeout: float
+    ) -> None:
+        while True:
+            await self.check_health(client, timeout)
+            await asyncio.sleep(interval_seconds)
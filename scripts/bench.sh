@@ -35,4 +35,5 @@ done
 python -m bench.run_bench \
   --gateway-url "http://${HOST}:${GATEWAY_PORT}" \
   --total-requests "$TOTAL_REQUESTS" \
-  --concurrency "$CONCURRENCY"
+  --concurrency "$CONCURRENCY" \
+  "$@"
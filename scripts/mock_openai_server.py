@@ -1,19 +1,142 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+from collections import deque
 from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
 from typing import Any
 
-from fastapi import FastAPI
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 app = FastAPI(title="Mock OpenAI-Compatible Server")
 
+CONTENT_WORDS = "Mock response: gateway demo path is healthy.".split()
+GENERATIONS = {"started": 0, "completed": 0, "aborted": 0}
 
-def _token_estimate(messages: list[dict[str, Any]], max_tokens: int) -> int:
-    prompt_chars = sum(len(str(message.get("content", ""))) for message in messages)
-    prompt_tokens = max(1, prompt_chars // 4)
-    completion_tokens = max(8, min(max_tokens, 32))
-    return prompt_tokens + completion_tokens
+
+def _env(name: str, default: float) -> float:
+    return float(os.getenv(name, str(default)))
+
+
+@dataclass
+class PerformanceModel:
+    ttft_ms: float = field(default_factory=lambda: _env("MOCK_TTFT_MS", 0))
+    ttft_jitter: float = field(default_factory=lambda: _env("MOCK_TTFT_JITTER", 0))
+    prefill_ms_per_1k_tokens: float = field(
+        default_factory=lambda: _env("MOCK_PREFILL_MS_PER_1K", 0)
+    )
+    token_delay_ms: float = field(default_factory=lambda: _env("MOCK_TOKEN_DELAY_MS", 0))
+    token_jitter: float = field(default_factory=lambda: _env("MOCK_TOKEN_JITTER", 0))
+    min_output_fraction: float = field(
+        default_factory=lambda: _env("MOCK_MIN_OUTPUT_FRACTION", 1.0)
+    )
+    max_batch: int = field(default_factory=lambda: int(_env("MOCK_MAX_BATCH", 0)))
+    batch_slowdown: float = field(default_factory=lambda: _env("MOCK_BATCH_SLOWDOWN", 0))
+    error_rate: float = field(default_factory=lambda: _env("MOCK_ERROR_RATE", 0))
+    error_status: int = field(default_factory=lambda: int(_env("MOCK_ERROR_STATUS", 503)))
+    timeout_rate: float = field(default_factory=lambda: _env("MOCK_TIMEOUT_RATE", 0))
+    timeout_seconds: float = field(default_factory=lambda: _env("MOCK_TIMEOUT_SECONDS", 60))
+    disconnect_rate: float = field(default_factory=lambda: _env("MOCK_DISCONNECT_RATE", 0))
+    seed: int | None = field(
+        default_factory=lambda: int(os.environ["MOCK_SEED"]) if "MOCK_SEED" in os.environ else None
+    )
+
+
+class SimulatedDisconnect(Exception):
+    pass
+
+
+class Engine:
+    def __init__(self, model: PerformanceModel) -> None:
+        self.model = model
+        self.rng = random.Random(model.seed)
+        self.running = 0
+        self.waiting = 0
+        self.prompt_tokens = 0
+        self.generation_tokens = 0
+        self.finished = {"stop": 0, "length": 0, "abort": 0}
+        self.faults = {"error": 0, "timeout": 0, "disconnect": 0}
+        self._waiters: deque[asyncio.Future[None]] = deque()
+
+    async def acquire(self) -> None:
+        if self.model.max_batch <= 0 or self.running < self.model.max_batch:
+            self.running += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        self.waiting += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            else:
+                self._waiters.remove(future)
+            raise
+        finally:
+            self.waiting -= 1
+
+    def release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.running -= 1
+
+    def _jitter(self, sigma: float) -> float:
+        return math.exp(self.rng.gauss(0.0, sigma)) if sigma > 0 else 1.0
+
+    def _batch_factor(self) -> float:
+        return 1.0 + self.model.batch_slowdown * max(0, self.running - 1)
+
+    def ttft_seconds(self, prompt_tokens: int) -> float:
+        prefill = self.model.prefill_ms_per_1k_tokens * prompt_tokens / 1000
+        ttft = self.model.ttft_ms * self._jitter(self.model.ttft_jitter)
+        return (ttft + prefill) * self._batch_factor() / 1000
+
+    def token_seconds(self) -> float:
+        delay = self.model.token_delay_ms * self._jitter(self.model.token_jitter)
+        return delay * self._batch_factor() / 1000
+
+    def output_tokens(self, max_tokens: int) -> int:
+        fraction = self.rng.uniform(min(self.model.min_output_fraction, 1.0), 1.0)
+        return max(1, round(max_tokens * fraction))
+
+    def fault(self) -> str | None:
+        roll = self.rng.random()
+        for kind, rate in (
+            ("error", self.model.error_rate),
+            ("timeout", self.model.timeout_rate),
+            ("disconnect", self.model.disconnect_rate),
+        ):
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+
+ENGINE = Engine(PerformanceModel())
+
+
+def _token_text(index: int) -> str:
+    word = CONTENT_WORDS[index % len(CONTENT_WORDS)]
+    return word if index == 0 else f" {word}"
+
+
+def _prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    return max(1, sum(len(str(message.get("content", ""))) for message in messages) // 4)
+
+
+async def _sleep(seconds: float) -> None:
+    if seconds > 0:
+        await asyncio.sleep(seconds)
 
 
 @app.get("/health")
@@ -21,33 +144,137 @@ def health() -> dict[str, str]:
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics() -> PlainTextResponse:
+    labels = '{model_name="mock-model"}'
+    lines = [
+        "# TYPE vllm:num_requests_running gauge",
+        f"vllm:num_requests_running{labels} {ENGINE.running}",
+        "# TYPE vllm:num_requests_waiting gauge",
+        f"vllm:num_requests_waiting{labels} {ENGINE.waiting}",
+        "# TYPE vllm:prompt_tokens_total counter",
+        f"vllm:prompt_tokens_total{labels} {ENGINE.prompt_tokens}",
+        "# TYPE vllm:generation_tokens_total counter",
+        f"vllm:generation_tokens_total{labels} {ENGINE.generation_tokens}",
+        "# TYPE vllm:request_success_total counter",
+        *(
+            f'vllm:request_success_total{{finished_reason="{reason}",model_name="mock-model"}} '
+            f"{count}"
+            for reason, count in ENGINE.finished.items()
+        ),
+        "# TYPE mock:injected_faults_total counter",
+        *(f'mock:injected_faults_total{{kind="{kind}"}} {n}' for kind, n in ENGINE.faults.items()),
+    ]
+    return PlainTextResponse("\n".join(lines) + "\n")
+
+
+async def _wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def _inject_fault(kind: str | None) -> Response | None:
+    if kind is None or kind == "disconnect":
+        return None
+    ENGINE.faults[kind] += 1
+    if kind == "timeout":
+        await asyncio.sleep(ENGINE.model.timeout_seconds)
+        return JSONResponse({"error": {"message": "simulated timeout"}}, status_code=504)
+    status = ENGINE.model.error_status
+    return JSONResponse({"error": {"message": "simulated upstream error"}}, status_code=status)
+
+
+async def _generate(prompt_tokens: int, completion_tokens: int) -> None:
+    await _sleep(ENGINE.ttft_seconds(prompt_tokens))
+    for _ in range(completion_tokens - 1):
+        await _sleep(ENGINE.token_seconds())
+
+
 @app.post("/v1/chat/completions")
-async def chat_completions(payload: dict[str, Any]) -> Any:
+async def chat_completions(payload: dict[str, Any], request: Request) -> Any:
     model = str(payload.get("model", "mock-model"))
     messages = payload.get("messages")
     if not isinstance(messages, list):
         messages = []
     max_tokens = payload.get("max_tokens")
-    if not isinstance(max_tokens, int):
+    if not isinstance(max_tokens, int) or max_tokens < 1:
         max_tokens = 64
 
-    content = "Mock response: gateway demo path is healthy."
-    prompt_tokens = max(1, sum(len(str(msg.get("content", ""))) for msg in messages) // 4)
+    fault = ENGINE.fault()
+    failure = await _inject_fault(fault)
+    if failure is not None:
+        return failure
+
+    prompt_tokens = _prompt_tokens(messages)
+    completion_tokens = ENGINE.output_tokens(max_tokens)
+    finish_reason = "length" if completion_tokens >= max_tokens else "stop"
 
     if bool(payload.get("stream")):
+        stream_options = payload.get("stream_options")
+        include_usage = isinstance(stream_options, dict) and bool(
+            stream_options.get("include_usage")
+        )
+        cut_after = (
+            ENGINE.rng.randint(1, max(1, completion_tokens - 1)) if fault == "disconnect" else None
+        )
 
         async def event_stream() -> AsyncIterator[bytes]:
-            chunks = [
-                '{"choices":[{"delta":{"content":"Mock response:"}}]}',
-                '{"choices":[{"delta":{"content":" gateway demo path is healthy."}}]}',
-                "[DONE]",
-            ]
-            for chunk in chunks:
-                yield f"data: {chunk}\n\n".encode()
+            GENERATIONS["started"] += 1
+            await ENGINE.acquire()
+            ENGINE.prompt_tokens += prompt_tokens
+            status = "abort"
+            try:
+                await _sleep(ENGINE.ttft_seconds(prompt_tokens))
+                for index in range(completion_tokens):
+                    if index:
+                        await _sleep(ENGINE.token_seconds())
+                    if index == cut_after:
+                        ENGINE.faults["disconnect"] += 1
+                        raise SimulatedDisconnect("simulated mid-stream disconnect")
+                    ENGINE.generation_tokens += 1
+                    delta = {"content": _token_text(index)}
+                    if index == 0:
+                        delta = {"role": "assistant", **delta}
+                    choice = {"index": 0, "delta": delta, "finish_reason": None}
+                    if index == completion_tokens - 1:
+                        choice["finish_reason"] = finish_reason
+                    chunk = {"object": "chat.completion.chunk", "model": model, "choices": [choice]}
+                    yield f"data: {json.dumps(chunk)}\n\n".encode()
+                if include_usage:
+                    usage = {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    }
+                    chunk = {"object": "chat.completion.chunk", "choices": [], "usage": usage}
+                    yield f"data: {json.dumps(chunk)}\n\n".encode()
+                yield b"data: [DONE]\n\n"
+                status = finish_reason
+            finally:
+                ENGINE.release()
+                ENGINE.finished[status] += 1
+                GENERATIONS["aborted" if status == "abort" else "completed"] += 1
 
         return StreamingResponse(event_stream(), media_type="text/event-stream")
 
-    total_tokens = _token_estimate(messages, max_tokens)
+    GENERATIONS["started"] += 1
+    await ENGINE.acquire()
+    ENGINE.prompt_tokens += prompt_tokens
+    try:
+        work = asyncio.ensure_future(_generate(prompt_tokens, completion_tokens))
+        watcher = asyncio.ensure_future(_wait_for_disconnect(request))
+        await asyncio.wait({work, watcher}, return_when=asyncio.FIRST_COMPLETED)
+        watcher.cancel()
+        if not work.done():
+            work.cancel()
+            ENGINE.finished["abort"] += 1
+            GENERATIONS["aborted"] += 1
+            return Response(status_code=499)
+    finally:
+        ENGINE.release()
+    ENGINE.generation_tokens += completion_tokens
+    ENGINE.finished[finish_reason] += 1
+    GENERATIONS["completed"] += 1
     return {
         "id": "chatcmpl-mock-123",
         "object": "chat.completion",
@@ -55,24 +282,47 @@ async def chat_completions(payload: dict[str, Any]) -> Any:
         "choices": [
             {
                 "index": 0,
-                "message": {"role": "assistant", "content": content},
-                "finish_reason": "stop",
+                "message": {
+                    "role": "assistant",
+                    "content": "".join(_token_text(index) for index in range(completion_tokens)),
+                },
+                "finish_reason": finish_reason,
             }
         ],
         "usage": {
             "prompt_tokens": prompt_tokens,
-            "completion_tokens": total_tokens - prompt_tokens,
-            "total_tokens": total_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
         },
     }
 
 
+def _mock_embedding(text: str) -> list[float]:
+    digest = hashlib.sha256(text.encode()).digest()
+    return [round(byte / 255, 4) for byte in digest[:4]]
+
+
 @app.post("/v1/embeddings")
-def embeddings(payload: dict[str, Any]) -> dict[str, Any]:
+async def embeddings(payload: dict[str, Any]) -> Any:
+    failure = await _inject_fault(ENGINE.fault())
+    if failure is not None:
+        return failure
     model = str(payload.get("model", "mock-model"))
+    inputs = payload.get("input", "")
+    texts = [str(item) for item in inputs] if isinstance(inputs, list) else [str(inputs)]
+    prompt_tokens = sum(max(1, len(text) // 4) for text in texts)
+    await ENGINE.acquire()
+    try:
+        await _sleep(ENGINE.ttft_seconds(prompt_tokens))
+    finally:
+        ENGINE.release()
+    ENGINE.prompt_tokens += prompt_tokens
     return {
         "object": "list",
         "model": model,
-        "data": [{"index": 0, "embedding": [0.1, 0.2, 0.3, 0.4]}],
-        "usage": {"prompt_tokens": 4, "total_tokens": 4},
+        "data": [
+            {"object": "embedding", "index": index, "embedding": _mock_embedding(text)}
+            for index, text in enumerate(texts)
+        ],
+        "usage": {"prompt_tokens": prompt_tokens, "total_tokens": prompt_tokens},
     }
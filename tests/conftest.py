@@ -0,0 +1,111 @@
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Iterator
+from typing import Any
+
+import pytest
+
+from gateway.app import main
+from gateway.app.cache import LocalCache, ResponseCache
+from gateway.app.config import settings
+from gateway.app.limits import RateLimiter
+from gateway.app.retry import LatencyTracker, RetryBudget
+from gateway.app.singleflight import RELEASE_SCRIPT
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
+
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis") -> None:
+        self._redis = redis
+        self._ops: list[tuple[str, str]] = []
+
+    def get(self, key: str) -> None:
+        self._ops.append(("get", key))
+
+    def pttl(self, key: str) -> None:
+        self._ops.append(("pttl", key))
+
+    def exists(self, key: str) -> None:
+        self._ops.append(("exists", key))
+
+    async def execute(self) -> list[Any]:
+        store = self._redis.store
+        results: dict[str, Callable[[str], Any]] = {
+            "get": store.get,
+            "pttl": lambda key: 60_000 if key in store else -2,
+            "exists": lambda key: int(key in store),
+        }
+        return [results[op](key) for op, key in self._ops]
+
+
+class FakeRedis:
+    def __init__(self) -> None:
+        self.store: dict[str, Any] = {}
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        return FakePipeline(self)
+
+    async def set(self, key: str, value: Any, nx: bool = False, px: int | None = None) -> bool:
+        if nx and key in self.store:
+            return False
+        self.store[key] = value
+        return True
+
+    async def setex(self, key: str, ttl: int, value: Any) -> None:
+        self.store[key] = value
+
+    def register_script(self, source: str) -> Callable[..., Awaitable[int]]:
+        assert source == RELEASE_SCRIPT
+
+        async def release(keys: list[str], args: list[str]) -> int:
+            if self.store.get(keys[0]) != args[0]:
+                return 0
+            del self.store[keys[0]]
+            return 1
+
+        return release
+
+
+@pytest.fixture
+def fake_redis() -> FakeRedis:
+    return FakeRedis()
+
+
+@pytest.fixture(autouse=True)
+def fresh_gateway_state(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(
+        main,
+        "response_cache",
+        ResponseCache(
+            LocalCache(settings.cache_l1_max_entries, settings.cache_l1_max_bytes),
+            settings.cache_ttl_seconds,
+            settings.cache_stale_seconds,
+        ),
+    )
+    monkeypatch.setattr(
+        main, "rate_limiter", RateLimiter(settings.rate_limit_rps, settings.rate_limit_burst)
+    )
+    monkeypatch.setattr(
+        main,
+        "retry_budget",
+        RetryBudget(
+            settings.retry_budget_ratio,
+            settings.retry_budget_min_per_second,
+            settings.retry_budget_burst,
+        ),
+    )
+    monkeypatch.setattr(
+        main, "hedge_trackers", defaultdict(lambda: LatencyTracker(settings.hedge_percentile))
+    )
+    yield
@@ -0,0 +1,109 @@
+import asyncio
+import random
+
+import httpx
+import pytest
+from conftest import FakeClock
+
+from gateway.app import main
+from gateway.app.admission import AdaptiveLimiter, Overloaded, parse_vllm_queue_depth
+
+
+async def test_release_hands_slot_to_queued_waiter() -> None:
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, queue_size=4)
+    first = await limiter.acquire(timeout=1)
+    waiter = asyncio.create_task(limiter.acquire(timeout=1))
+    await asyncio.sleep(0)
+    assert limiter.queued == 1
+    first.release()
+    second = await waiter
+    assert limiter.inflight == 1 and limiter.queued == 0
+    second.release()
+    assert limiter.inflight == 0
+
+
+async def test_sheds_when_queue_full_deadline_or_timeout(clock: FakeClock) -> None:
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, queue_size=1, clock=clock)
+    warmup = await limiter.acquire(timeout=1)
+    clock.now = 0.01
+    warmup.release()
+
+    slot = await limiter.acquire(timeout=1)
+    queued = asyncio.create_task(limiter.acquire(timeout=0.05))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as full:
+        await limiter.acquire(timeout=1)
+    assert full.value.reason == "queue_full"
+    with pytest.raises(Overloaded) as timed_out:
+        await queued
+    assert timed_out.value.reason == "timeout"
+    assert limiter.queued == 0
+    with pytest.raises(Overloaded) as deadline:
+        await limiter.acquire(timeout=0.001)
+    assert deadline.value.reason == "deadline"
+    slot.release()
+    assert limiter.inflight == 0
+
+
+async def test_limit_adapts_to_latency_and_errors(clock: FakeClock) -> None:
+    limiter = AdaptiveLimiter(
+        initial_limit=4, min_limit=1, max_limit=8, queue_size=4, backoff=0.5, clock=clock
+    )
+    for _ in range(40):
+        slots = [await limiter.acquire(timeout=1) for _ in range(limiter.limit)]
+        clock.now += 0.1
+        for slot in slots:
+            slot.release()
+    assert limiter.limit == 8
+    clock.now += 10
+    slot = await limiter.acquire(timeout=1)
+    slot.release(ok=False)
+    assert limiter.limit == 4
+
+
+async def test_mixed_request_classes_do_not_shrink_the_limit(clock: FakeClock) -> None:
+    rng = random.Random(0)
+    limiter = AdaptiveLimiter(
+        initial_limit=32, min_limit=1, max_limit=64, queue_size=4, clock=clock
+    )
+    for _ in range(300):
+        kinds = ["stream" if rng.random() < 0.7 else "unary" for _ in range(rng.choice([2, 3]))]
+        slots = [(kind, await limiter.acquire(timeout=1, kind=kind)) for kind in kinds]
+        clock.now += 5
+        for kind, slot in slots:
+            if kind == "stream":
+                slot.release(sample=rng.uniform(0.08, 0.12))
+            else:
+                slot.release(sample=rng.uniform(3, 5))
+    assert limiter.limit == 32
+
+
+async def test_wait_estimate_uses_slot_hold_time(clock: FakeClock) -> None:
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, queue_size=4, clock=clock)
+    stream = await limiter.acquire(timeout=1, kind="stream")
+    clock.now = 10.0
+    stream.release(sample=0.1)
+    assert limiter.estimated_wait(1) == pytest.approx(10.0)
+
+
+def test_parse_vllm_queue_depth() -> None:
+    text = (
+        "# HELP vllm:num_requests_waiting Number of requests waiting.\n"
+        'vllm:num_requests_waiting{model_name="m"} 3.0\n'
+        'vllm:num_requests_running{model_name="m"} 7.0\n'
+    )
+    assert parse_vllm_queue_depth(text) == 3.0
+    assert parse_vllm_queue_depth("") is None
+
+
+async def test_chat_returns_503_with_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    limiter = AdaptiveLimiter(initial_limit=1, min_limit=1, max_limit=1, queue_size=0)
+    monkeypatch.setattr(main, "admission", limiter)
+    held = await limiter.acquire(timeout=1)
+    payload = {"messages": [{"role": "user", "content": "overloaded"}]}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        response = await client.post("/chat", json=payload)
+    held.release()
+    assert response.status_code == 503
+    assert int(response.headers["retry-after"]) >= 1
@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any
+
+import httpx
+import orjson
+import pytest
+
+from gateway.app import main
+from gateway.app.batching import EmbedBatcher, apportion_tokens
+
+
+async def test_concurrent_inputs_share_one_upstream_call() -> None:
+    calls: list[list[str]] = []
+
+    async def send(model: str, inputs: list[str]) -> tuple[list[Any], int]:
+        calls.append(inputs)
+        return [[float(len(text))] for text in inputs], 30
+
+    batcher = EmbedBatcher(send, max_batch_size=8, max_wait_seconds=0.01)
+    results = await asyncio.gather(
+        batcher.embed("m", ["a", "bb"]), batcher.embed("m", ["cccccc"]), batcher.embed("m", ["bb"])
+    )
+    assert calls == [["a", "bb", "cccccc"]]
+    assert [vectors for vectors, _ in results] == [[[1.0], [2.0]], [[6.0]], [[2.0]]]
+    assert sum(tokens for _, tokens in results) == 30
+
+
+async def test_full_batches_flush_early_and_errors_reach_every_caller() -> None:
+    calls: list[list[str]] = []
+
+    async def send(model: str, inputs: list[str]) -> tuple[list[Any], int]:
+        calls.append(inputs)
+        if "boom" in inputs:
+            raise httpx.ConnectError("down")
+        return [[0.0]] * len(inputs), 0
+
+    batcher = EmbedBatcher(send, max_batch_size=2, max_wait_seconds=10)
+    await asyncio.wait_for(asyncio.gather(batcher.embed("m", ["a"]), batcher.embed("m", ["b"])), 1)
+    results = await asyncio.gather(
+        batcher.embed("m", ["boom"]), batcher.embed("m", ["c"]), return_exceptions=True
+    )
+    assert calls == [["a", "b"], ["boom", "c"]]
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+
+
+def test_apportion_tokens_sums_to_total() -> None:
+    shares = apportion_tokens(10, [["aaaa"], ["a"], ["aaaaa"]])
+    assert sum(shares) == 10
+    assert shares[2] > shares[1]
+
+
+async def test_embed_only_sends_uncached_inputs(monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: list[list[str]] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        inputs = orjson.loads(request.content)["input"]
+        sent.append(inputs)
+        data = [{"index": i, "embedding": [float(len(text))]} for i, text in enumerate(inputs)]
+        return httpx.Response(200, json={"data": data, "usage": {"prompt_tokens": len(inputs)}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main, "embed_batcher", None)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        first = await client.post("/embed", json={"model": "m", "input": ["x", "yy"]})
+        second = await client.post("/embed", json={"model": "m", "input": ["yy", "zzz", "x"]})
+    assert first.status_code == second.status_code == 200
+    assert sent == [["x", "yy"], ["zzz"]]
+    body = second.json()
+    assert [item["embedding"] for item in body["data"]] == [[2.0], [3.0], [1.0]]
+    assert [item["index"] for item in body["data"]] == [0, 1, 2]
+    assert body["usage"]["prompt_tokens"] == 1
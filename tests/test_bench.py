@@ -0,0 +1,203 @@
+import random
+from pathlib import Path
+from typing import Any
+
+import httpx
+import pytest
+
+from bench.histogram import Histogram
+from bench.history import SCHEMA_VERSION, Thresholds, compare_results, write_result
+from bench.run_bench import (
+    Step,
+    StepStats,
+    arrival_offsets,
+    main,
+    parse_schedule,
+    ramp_schedule,
+    send_request,
+)
+from bench.scenarios import (
+    Distribution,
+    RequestSpec,
+    ScenarioWorkload,
+    builtin_scenarios,
+    load_scenario,
+    parse_scenario,
+)
+
+
+def bench_result(run_id: str, p95: float, rps: float, error_rate: float = 0.0) -> dict[str, Any]:
+    return {
+        "schema": SCHEMA_VERSION,
+        "run_id": run_id,
+        "created_at": float(run_id.rsplit("-", 1)[1]),
+        "config": {"mode": "closed", "concurrency": 4, "steps": [], "stream": False},
+        "git": {"sha": "0123456789abcdef", "dirty": False},
+        "summary": {
+            "requests": 100,
+            "rps": rps,
+            "error_rate": error_rate,
+            "latency_s": {"p50": p95 / 2, "p95": p95, "p99": p95 * 1.5},
+        },
+    }
+
+
+def test_histogram_percentiles_merge_and_round_trip() -> None:
+    values = [i / 1000 for i in range(1, 1001)]
+    first, second = Histogram(), Histogram()
+    for value in values[::2]:
+        first.record(value)
+    for value in values[1::2]:
+        second.record(value)
+    first.merge(second)
+    assert first.count == 1000
+    assert first.percentile(50) == pytest.approx(0.5, rel=0.01)
+    assert first.percentile(99) == pytest.approx(0.99, rel=0.01)
+    assert first.percentile(100) == first.max == 1.0
+    restored = Histogram.from_dict(first.to_dict())
+    assert restored.percentile(95) == first.percentile(95)
+    with pytest.raises(ValueError):
+        first.merge(Histogram(relative_error=0.05))
+
+
+def test_schedules_and_arrivals() -> None:
+    assert parse_schedule("10:2, 20:1") == [Step(10, 2), Step(20, 1)]
+    assert ramp_schedule("10:30:10:5") == [Step(10, 5), Step(20, 5), Step(30, 5)]
+    with pytest.raises(ValueError):
+        parse_schedule("10")
+    constant = list(arrival_offsets([Step(10, 1), Step(20, 1)], "constant", random.Random(0)))
+    assert [index for _, index in constant] == [0] * 10 + [1] * 20
+    assert all(1 <= offset < 2 for offset, index in constant if index == 1)
+    poisson = list(arrival_offsets([Step(1000, 2)], "poisson", random.Random(0)))
+    assert 1800 < len(poisson) < 2200
+    assert poisson == sorted(poisson)
+
+
+async def test_stream_request_measures_ttft_itl_and_tpot() -> None:
+    body = (
+        b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"b"}}]}\n\n'
+        b'data: {"choices":[{"delta":{"content":"c"}}]}\n\n'
+        b'data: {"choices":[],"usage":{"completion_tokens":3,"total_tokens":9}}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    seen: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.content)
+        return httpx.Response(200, content=body)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        payload = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+        result = await send_request(client, "http://gw", RequestSpec("/chat", payload, stream=True))
+    assert b'"stream":true' in seen[0]
+    assert not result.error and result.status == 200
+    assert result.ttft_s is not None and result.ttft_s <= result.latency_s
+    assert len(result.itl_s) == 2
+    assert result.output_tokens == 3 and result.tokens == 9
+    assert result.tpot_s is not None
+    stats = StepStats(0, 0)
+    stats.add(result)
+    assert stats.ttft.count == 1 and stats.itl.count == 2 and stats.tpot.count == 1
+    assert stats.records[0].to_record()["itl_max_s"] == max(result.itl_s)
+
+
+def test_compare_flags_latency_throughput_and_error_regressions() -> None:
+    baseline = bench_result("bench-1", p95=0.200, rps=50)
+    thresholds = Thresholds(max_p95_increase_pct=10, max_rps_decrease_pct=10, max_error_rate=0.01)
+    ok = compare_results(baseline, bench_result("bench-2", p95=0.215, rps=46), thresholds)
+    assert all(check.passed for check in ok)
+    bad = compare_results(
+        baseline, bench_result("bench-3", p95=0.250, rps=40, error_rate=0.05), thresholds
+    )
+    assert [check.passed for check in bad] == [False, False, False]
+
+
+def test_compare_command_exit_codes_and_trend(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    baseline = tmp_path / "baseline.json"
+    for run_id, p95 in (("bench-100", 0.2), ("bench-200", 0.21), ("bench-300", 0.3)):
+        write_result(tmp_path / f"{run_id}.json", bench_result(run_id, p95=p95, rps=50))
+    other_scenario = bench_result("bench-250", p95=0.1, rps=90)
+    other_scenario["config"]["scenario"] = {"name": "burst"}
+    other_mode = bench_result("bench-260", p95=0.1, rps=90)
+    other_mode["config"]["mode"] = "open"
+    for result in (other_scenario, other_mode):
+        write_result(tmp_path / f"{result['run_id']}.json", result)
+    common = ["compare", "--baseline", str(baseline), "--history-dir", str(tmp_path)]
+
+    assert main([*common, "--candidate", str(tmp_path / "bench-100.json")]) == 2
+    assert (
+        main([*common, "--candidate", str(tmp_path / "bench-100.json"), "--update-baseline"]) == 0
+    )
+    assert baseline.exists()
+    assert main([*common, "--candidate", str(tmp_path / "bench-200.json")]) == 0
+    capsys.readouterr()
+    assert main([*common, "--candidate", str(tmp_path / "bench-300.json"), "--trend", "2"]) == 1
+    output = capsys.readouterr().out
+    assert "| p95 latency (s) | 0.2 | 0.3 | +50.0% |" in output
+    assert "Result: REGRESSION" in output
+    assert "bench-200" in output and "| bench-100 |" not in output
+    assert "## Recent runs: scenario none, mode closed" in output
+    assert "bench-250" not in output and "bench-260" not in output
+
+
+def test_scenario_parsing_and_validation() -> None:
+    assert builtin_scenarios() == ["burst", "cold-cache", "hot-cache", "long-context"]
+    for name in builtin_scenarios():
+        assert load_scenario(name).name == name
+    scenario = parse_scenario(
+        {
+            "rps": 5,
+            "duration_s": 2,
+            "mix": {"chat": 3, "embed": 1},
+            "chat": {"prompt_tokens": {"distribution": "uniform", "min": 10, "max": 20}},
+        },
+        "custom",
+    )
+    assert scenario.name == "custom" and scenario.embed_weight == 1
+    assert scenario.prompt_tokens == Distribution(kind="uniform", low=10, high=20)
+    for bad in (
+        {"rate": 5},
+        {"rps": 5, "schedule": "5:1"},
+        {"cache_hit_ratio": 1.5},
+        {"mix": {"chat": 0}},
+        {"chat": {"prompt_tokens": {"distribution": "normal", "mean": 10}}},
+        {"chat": {"output_tokens": {"distribution": "zipf"}}},
+    ):
+        with pytest.raises(ValueError):
+            parse_scenario(bad, "bad")
+
+
+def test_scenario_workload_mix_lengths_and_cache_ratio() -> None:
+    scenario = parse_scenario(
+        {
+            "cache_hit_ratio": 0.75,
+            "hot_set_size": 10,
+            "mix": {"chat": 0.5, "embed": 0.5},
+            "chat": {
+                "stream_ratio": 0.5,
+                "prompt_tokens": {"distribution": "lognormal", "median": 50, "sigma": 1, "max": 80},
+                "output_tokens": 32,
+            },
+            "embed": {"inputs": {"distribution": "uniform", "min": 2, "max": 4}},
+        },
+        "mixed",
+    )
+    workload = ScenarioWorkload(scenario, "m", random.Random(1), "run")
+    specs = [workload.next_request() for _ in range(2000)]
+    repeats = [spec for spec in specs if spec.repeat]
+    fresh = [spec for spec in specs if not spec.repeat]
+    assert 0.72 < len(repeats) / len(specs) < 0.78
+    assert len({str(spec.body) for spec in repeats}) <= 10
+    assert 0.4 < sum(spec.kind == "embed" for spec in fresh) / len(fresh) < 0.6
+    chats = [spec for spec in fresh if spec.path == "/chat"]
+    assert {spec.kind for spec in chats} == {"chat", "chat-stream"}
+    assert all(spec.body["max_tokens"] == 32 for spec in chats)
+    assert all(len(spec.body["messages"][1]["content"]) <= 80 * 4 + 32 for spec in chats)
+    assert all(2 <= len(spec.body["input"]) <= 4 for spec in fresh if spec.kind == "embed")
+    assert len({str(spec.body) for spec in fresh}) == len(fresh)
+    again = ScenarioWorkload(scenario, "m", random.Random(1), "run")
+    assert [again.next_request() for _ in range(2000)] == specs
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from conftest import FakeClock, FakeRedis
+
+from gateway.app.cache import MAGIC, CacheCodec, CacheFormatError, LocalCache, ResponseCache
+
+
+def test_local_cache_evicts_lru_by_entries_and_bytes() -> None:
+    cache = LocalCache(max_entries=2, max_bytes=10)
+    cache.set("a", b"1234", 60)
+    cache.set("b", b"1234", 60)
+    assert cache.get("a") is not None
+    cache.set("c", b"1234", 60)
+    assert cache.get("b") is None
+    cache.set("d", b"12345678", 60)
+    assert len(cache) == 1
+    assert cache.nbytes == 8
+    cache.set("huge", b"x" * 11, 60)
+    assert cache.get("huge") is None
+
+
+def test_local_cache_ttl_and_stale_window(clock: FakeClock) -> None:
+    cache = LocalCache(max_entries=10, max_bytes=100, clock=clock)
+    cache.set("k", b"v", ttl_seconds=5, stale_seconds=5)
+    clock.now = 6
+    entry = cache.get("k")
+    assert entry is not None and not cache.is_fresh(entry)
+    clock.now = 11
+    assert cache.get("k") is None
+    assert len(cache) == 0
+
+
+async def test_stale_hit_serves_value_and_revalidates_once(clock: FakeClock) -> None:
+    cache = ResponseCache(LocalCache(10, 100, clock=clock), ttl_seconds=5, stale_seconds=30)
+    await cache.set("k", b"old")
+    clock.now = 10
+    refreshes = 0
+
+    async def revalidate() -> None:
+        nonlocal refreshes
+        refreshes += 1
+        await asyncio.sleep(0)
+        await cache.set("k", b"new")
+
+    assert await cache.get("k", revalidate) == b"old"
+    assert await cache.get("k", revalidate) == b"old"
+    await asyncio.sleep(0.01)
+    assert refreshes == 1
+    assert await cache.get("k", revalidate) == b"new"
+
+
+def test_codec_roundtrip_and_threshold() -> None:
+    codec = CacheCodec("zlib", min_bytes=64)
+    body = b'{"choices":[{"message":{"content":"' + b"a" * 500 + b'"}}]}'
+    blob = codec.encode(body)
+    assert blob.startswith(MAGIC) and len(blob) < len(body)
+    assert codec.decode(blob) == body
+    small = codec.encode(b"{}")
+    assert small == MAGIC + bytes((1, 0)) + b"{}"
+    assert codec.decode(b'{"legacy": true}') == b'{"legacy": true}'
+    with pytest.raises(CacheFormatError):
+        codec.decode(MAGIC + bytes((1, 9)) + b"x")
+
+
+def test_codec_falls_back_when_library_missing() -> None:
+    codec = CacheCodec("lz4")
+    if codec.compression == "lz4":
+        pytest.skip("lz4 installed")
+    assert codec.decode(codec.encode(b"x" * 2000)) == b"x" * 2000
+
+
+async def test_l2_stores_encoded_bytes_and_promotes(fake_redis: FakeRedis) -> None:
+    writer = ResponseCache(None, 60, 0, redis=fake_redis, codec=CacheCodec("zlib", 16))  # type: ignore[arg-type]
+    body = b'{"usage":{"total_tokens":3},"pad":"' + b"z" * 100 + b'"}'
+    await writer.set("k", body)
+    assert fake_redis.store["k"].startswith(MAGIC)
+
+    reader = ResponseCache(LocalCache(10, 1000), 60, 0, redis=fake_redis)  # type: ignore[arg-type]
+    assert await reader.get("k") == body
+    assert reader.local is not None and len(reader.local) == 1
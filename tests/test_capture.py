@@ -0,0 +1,78 @@
+import json
+from pathlib import Path
+
+import httpx
+import pytest
+
+from bench.replay import load_capture
+from gateway.app import main
+from gateway.app.capture import CapturedRequest, TrafficCapture
+
+CHAT = {"model": "m", "messages": [{"role": "user", "content": "secret prompt"}], "max_tokens": 8}
+
+
+def captured(arrival: float, payload: dict[str, object], path: str = "/chat") -> CapturedRequest:
+    return CapturedRequest(arrival, path, json.dumps(payload).encode(), 200, 0.01, "req")
+
+
+async def test_capture_redacts_and_rotates(tmp_path: Path) -> None:
+    capture = TrafficCapture(tmp_path / "traffic.jsonl", max_bytes=600, backups=2)
+    capture.start()
+    for index in range(8):
+        capture.record(captured(1000.0 + index, CHAT))
+        await capture.close()
+        capture.start()
+    await capture.close()
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert files == ["traffic.jsonl", "traffic.jsonl.1", "traffic.jsonl.2"]
+    entries = [
+        json.loads(line) for name in files for line in (tmp_path / name).read_text().splitlines()
+    ]
+    assert 3 <= len(entries) < 8
+    assert "secret" not in (tmp_path / "traffic.jsonl").read_text()
+    redacted = entries[0]["redacted"]
+    assert redacted["messages"] == [{"role": "user", "chars": len("secret prompt")}]
+    assert redacted["max_tokens"] == 8 and entries[0]["stream"] is False
+
+
+async def test_gateway_captures_requests_and_replay_keeps_timing(
+    monkeypatch: pytest.MonkeyPatch, tmp_path: Path
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/v1/embeddings":
+            return httpx.Response(200, json={"data": [{"index": 0, "embedding": [0.5]}]})
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 3}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    capture = TrafficCapture(tmp_path / "traffic.jsonl", redact=False)
+    monkeypatch.setattr(main, "traffic_capture", capture)
+    capture.start()
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        await client.post("/chat", json=CHAT)
+        await client.post("/embed", json={"input": ["hello"]})
+        await client.get("/health")
+    await capture.close()
+
+    lines = (tmp_path / "traffic.jsonl").read_text().splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert [entry["path"] for entry in entries] == ["/chat", "/embed"]
+    assert entries[0]["payload"] == CHAT and entries[0]["status"] == 200
+
+    redacted = TrafficCapture(tmp_path / "redacted.jsonl")
+    redacted.start()
+    redacted.record(captured(10.0, CHAT))
+    redacted.record(captured(12.0, {**CHAT, "stream": True}))
+    redacted.record(captured(14.0, CHAT))
+    redacted.record(captured(16.0, {"input": ["abc", "defgh"]}, "/embed"))
+    await redacted.close()
+    replay = load_capture([tmp_path / "redacted.jsonl"], speed=2.0)
+    assert [offset for offset, _ in replay] == [0.0, 1.0, 2.0, 3.0]
+    first, stream, repeat, embed = (spec for _, spec in replay)
+    assert len(first.body["messages"][0]["content"]) == len("secret prompt")
+    assert "secret" not in first.body["messages"][0]["content"]
+    assert stream.stream and stream.kind == "chat-stream" and "stream" not in stream.body
+    assert repeat.repeat and repeat.body == first.body and not first.repeat
+    assert embed.path == "/embed" and [len(text) for text in embed.body["input"]] == [3, 5]
@@ -0,0 +1,85 @@
+import asyncio
+import socket
+import threading
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+import httpx
+import pytest
+import uvicorn
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.upstream import UpstreamPool
+from scripts import mock_openai_server as mock
+
+
+@contextmanager
+def serve(app: Any) -> Iterator[str]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not server.started:
+        assert time.monotonic() < deadline, "server did not start"
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+
+
+async def wait_until(predicate: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        await asyncio.sleep(0.02)
+
+
+def aborted(mode: str) -> float:
+    labels = {"path": "/chat", "mode": mode}
+    return REGISTRY.get_sample_value("gateway_aborted_generations_total", labels) or 0.0
+
+
+@pytest.fixture
+def gateway(monkeypatch: pytest.MonkeyPatch) -> Iterator[str]:
+    monkeypatch.setattr(mock, "ENGINE", mock.Engine(mock.PerformanceModel(token_delay_ms=200)))
+    for name in mock.GENERATIONS:
+        monkeypatch.setitem(mock.GENERATIONS, name, 0)
+    monkeypatch.setattr(main.settings, "redis_url", "redis://127.0.0.1:6399/0")
+    monkeypatch.setattr(main, "http_client", None)
+    with serve(mock.app) as upstream_url:
+        monkeypatch.setattr(main, "upstream_pool", UpstreamPool([upstream_url]))
+        with serve(main.app) as gateway_url:
+            yield gateway_url
+
+
+async def test_stream_disconnect_closes_upstream_generation(gateway: str) -> None:
+    before = aborted("stream")
+    payload = {"messages": [{"role": "user", "content": "stream then leave"}], "stream": True}
+    async with httpx.AsyncClient(base_url=gateway) as client:
+        async with client.stream("POST", "/chat", json=payload) as response:
+            assert response.status_code == 200
+            async for _ in response.aiter_bytes():
+                break
+    await wait_until(lambda: mock.GENERATIONS["aborted"] == 1)
+    await wait_until(lambda: aborted("stream") == before + 1)
+    assert mock.GENERATIONS["completed"] == 0
+
+
+async def test_unary_client_timeout_cancels_upstream_request(gateway: str) -> None:
+    before = aborted("unary")
+    payload = {"messages": [{"role": "user", "content": "too slow"}], "max_tokens": 16}
+    async with httpx.AsyncClient(base_url=gateway, timeout=0.5) as client:
+        with pytest.raises(httpx.ReadTimeout):
+            await client.post("/chat", json=payload)
+    await wait_until(lambda: mock.GENERATIONS["aborted"] == 1)
+    await wait_until(lambda: aborted("unary") == before + 1)
+    assert mock.GENERATIONS["completed"] == 0
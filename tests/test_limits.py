@@ -0,0 +1,108 @@
+import os
+import uuid
+from typing import Any
+
+import pytest
+from conftest import FakeClock
+from prometheus_client import REGISTRY
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+from gateway.app.limits import RateLimiter, RedisRateLimiter
+
+
+async def test_burst_then_refill(clock: FakeClock) -> None:
+    limiter = RateLimiter(rate=2.0, burst=3, clock=clock)
+    assert [await limiter.allow("a") for _ in range(4)] == [True, True, True, False]
+    clock.now = 0.5
+    assert await limiter.allow("a")
+    assert not await limiter.allow("a")
+
+
+def test_max_keys_evicts_least_recently_used() -> None:
+    limiter = RateLimiter(rate=1.0, burst=1, max_keys=2)
+    limiter.allow_nowait("a")
+    limiter.allow_nowait("b")
+    limiter.allow_nowait("a")
+    limiter.allow_nowait("c")
+    assert len(limiter) == 2
+    assert not limiter.allow_nowait("a")
+    assert limiter.allow_nowait("b")
+
+
+def test_idle_buckets_are_swept(clock: FakeClock) -> None:
+    limiter = RateLimiter(rate=10.0, burst=10, idle_seconds=5.0, clock=clock)
+    for key in ("a", "b", "c"):
+        limiter.allow_nowait(key)
+    clock.now = 3.0
+    limiter.allow_nowait("c")
+    clock.now = 6.0
+    limiter.allow_nowait("d")
+    assert len(limiter) == 2
+
+
+class StubScript:
+    def __init__(self, results: list[Any]) -> None:
+        self.results = results
+        self.calls: list[tuple[list[str], list[Any]]] = []
+
+    async def __call__(self, keys: list[str], args: list[Any]) -> Any:
+        self.calls.append((keys, args))
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+class StubRedis:
+    def __init__(self, script: StubScript) -> None:
+        self.script = script
+
+    def register_script(self, source: str) -> StubScript:
+        return self.script
+
+
+def fallbacks() -> float:
+    return REGISTRY.get_sample_value("gateway_rate_limit_fallbacks_total") or 0.0
+
+
+async def test_redis_limiter_falls_back_to_local_buckets_on_redis_error() -> None:
+    script = StubScript([1, 0, RedisError("down"), RedisError("down")])
+    fallback = RateLimiter(rate=1.0, burst=1)
+    limiter = RedisRateLimiter(StubRedis(script), rate=2.0, burst=4, fallback=fallback)  # type: ignore[arg-type]
+    before = fallbacks()
+    assert [await limiter.allow("10.0.0.1") for _ in range(4)] == [True, False, True, False]
+    assert fallbacks() == before + 2 and len(fallback) == 1
+    assert script.calls[0] == (["ratelimit:10.0.0.1"], [2.0, 4, 3000])
+
+
+async def test_redis_token_bucket_script() -> None:
+    redis = Redis.from_url(os.environ.get("GATEWAY_TEST_REDIS_URL", "redis://127.0.0.1:6379/0"))
+    try:
+        await redis.ping()
+    except (RedisError, OSError):
+        await redis.aclose()
+        pytest.skip("Redis not reachable")
+    key = f"test-{uuid.uuid4()}"
+    try:
+        limiter = RedisRateLimiter(redis, rate=0.001, burst=3, fallback=RateLimiter(1.0, 1))
+        assert [await limiter.allow(key) for _ in range(4)] == [True, True, True, False]
+        assert await redis.pttl(f"ratelimit:{key}") > 0
+        other = RedisRateLimiter(redis, rate=0.001, burst=3, fallback=RateLimiter(1.0, 1))
+        assert not await other.allow(key)
+    finally:
+        await redis.delete(f"ratelimit:{key}")
+        await redis.aclose()
+
+
+async def test_zero_rate_is_burst_only(clock: FakeClock) -> None:
+    limiter = RateLimiter(rate=0.0, burst=2, clock=clock)
+    clock.now = 1e6
+    assert [limiter.allow_nowait("a") for _ in range(3)] == [True, True, False]
+    clock.now = 2e6
+    assert not limiter.allow_nowait("a") and len(limiter) == 1
+
+    script = StubScript([1])
+    redis_limiter = RedisRateLimiter(StubRedis(script), rate=0.0, burst=2, fallback=limiter)  # type: ignore[arg-type]
+    assert await redis_limiter.allow("b")
+    assert script.calls == [(["ratelimit:b"], [0.0, 2, 86_401_000])]
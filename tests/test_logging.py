@@ -0,0 +1,54 @@
+import json
+import logging
+import queue
+from typing import Any
+
+import pytest
+from prometheus_client import REGISTRY
+
+from gateway.app.logging import BoundedQueueHandler, EventSampler, configure_logging, stop_logging
+
+
+def dropped(reason: str) -> float:
+    value = REGISTRY.get_sample_value("gateway_log_records_dropped_total", {"reason": reason})
+    return value or 0.0
+
+
+def make_record(message: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord("gateway", level, __file__, 1, message, None, None)
+
+
+def test_sampler_drops_sampled_events_but_keeps_warnings() -> None:
+    sampler = EventSampler({"cache_hit": 0.0, "chat_response": 1.0})
+    before = dropped("sampled")
+    assert not sampler.filter(make_record("cache_hit"))
+    assert sampler.filter(make_record("cache_hit", logging.WARNING))
+    assert sampler.filter(make_record("chat_response"))
+    assert sampler.filter(make_record("upstream_error"))
+    assert dropped("sampled") == before + 1
+
+
+def test_full_queue_drops_records_instead_of_blocking() -> None:
+    log_queue: queue.Queue[Any] = queue.Queue(maxsize=1)
+    handler = BoundedQueueHandler(log_queue, "drop")
+    before = dropped("queue_full")
+    handler.handle(make_record("first"))
+    handler.handle(make_record("second"))
+    assert log_queue.qsize() == 1 and log_queue.get_nowait().msg == "first"
+    assert dropped("queue_full") == before + 1
+
+
+def test_records_are_written_by_background_listener(capsys: pytest.CaptureFixture[str]) -> None:
+    configure_logging(queue_size=100, sample_rates={"cache_hit": 0.0})
+    try:
+        logger = logging.getLogger("gateway")
+        logger.info("cache_hit", extra={"request_id": "r1"})
+        logger.info("chat_response %s", "ok", extra={"extra": {"tokens": 3}})
+        logger.error("upstream_error", extra={"request_id": "r2"})
+        stop_logging()
+        lines = [json.loads(line) for line in capsys.readouterr().err.splitlines()]
+    finally:
+        with capsys.disabled():
+            configure_logging()
+    assert [line["message"] for line in lines] == ["chat_response ok", "upstream_error"]
+    assert lines[0]["tokens"] == 3 and lines[1]["request_id"] == "r2"
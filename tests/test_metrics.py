@@ -0,0 +1,111 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.metrics import REQUEST_COUNT, record_tokens
+from gateway.app.safety import SafetyChecker
+
+
+def sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_children_are_bound_ahead_of_time() -> None:
+    prebound = REGISTRY.get_sample_value(
+        "gateway_requests_total", {"path": "/embed", "status": "503"}
+    )
+    assert prebound is not None
+    assert REQUEST_COUNT.get("/chat", "200") is REQUEST_COUNT.get("/chat", "200")
+    labels = {"path": "/chat", "le": "100.0"}
+    before = sample("gateway_tokens_per_second_bucket", labels)
+    record_tokens("/chat", 50, 1.0)
+    record_tokens("/chat", 0, 1.0)
+    assert sample("gateway_tokens_per_second_bucket", labels) == before + 1
+
+
+async def test_stage_histograms_split_request_latency(monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 2}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    stages = ("safety", "cache", "upstream", "overhead")
+    before = {
+        stage: sample("gateway_request_stage_seconds_count", {"path": "/chat", "stage": stage})
+        for stage in stages
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        payload = {"messages": [{"role": "user", "content": "stage timing"}]}
+        assert (await client.post("/chat", json=payload)).status_code == 200
+        assert (await client.post("/chat", json=payload)).status_code == 200
+    after = {
+        stage: sample("gateway_request_stage_seconds_count", {"path": "/chat", "stage": stage})
+        for stage in stages
+    }
+    assert {stage: after[stage] - before[stage] for stage in stages} == {
+        "safety": 2,
+        "cache": 2,
+        "upstream": 1,
+        "overhead": 2,
+    }
+
+
+async def test_error_responses_record_stages(monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500, json={"error": "boom"})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main, "safety_checker", SafetyChecker(4096, ["forbidden"]))
+    monkeypatch.setattr(main.settings, "retry_attempts", 1)
+    monkeypatch.setattr(main.settings, "server_timing_enabled", True)
+    stages = ("safety", "upstream", "overhead")
+    before = {
+        stage: sample("gateway_request_stage_seconds_count", {"path": "/chat", "stage": stage})
+        for stage in stages
+    }
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        blocked = await client.post(
+            "/chat", json={"messages": [{"role": "user", "content": "forbidden"}]}
+        )
+        failed = await client.post(
+            "/chat", json={"messages": [{"role": "user", "content": "stage errors"}]}
+        )
+    after = {
+        stage: sample("gateway_request_stage_seconds_count", {"path": "/chat", "stage": stage})
+        for stage in stages
+    }
+    assert blocked.status_code == 400 and failed.status_code == 502
+    assert "safety;dur=" in blocked.headers["server-timing"]
+    assert {stage: after[stage] - before[stage] for stage in stages} == {
+        "safety": 2,
+        "upstream": 1,
+        "overhead": 2,
+    }
+
+
+def test_multiprocess_mode_aggregates_workers(tmp_path: Path) -> None:
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    worker = (
+        "from gateway.app.metrics import mark_worker_exit, record_admission_state, record_request\n"
+        "record_request('/chat', '200')\n"
+        "record_admission_state(8, 1, 0)\n"
+    )
+    subprocess.run([sys.executable, "-c", worker], env=env, check=True)
+    subprocess.run([sys.executable, "-c", worker + "mark_worker_exit()"], env=env, check=True)
+    render = "from gateway.app.metrics import render_metrics\nprint(render_metrics()[0].decode())"
+    output = subprocess.run(
+        [sys.executable, "-c", render], env=env, check=True, capture_output=True, text=True
+    ).stdout
+    assert 'gateway_requests_total{path="/chat",status="200"} 2.0' in output
+    assert "gateway_admission_limit 8.0" in output
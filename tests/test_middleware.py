@@ -0,0 +1,90 @@
+import asyncio
+from collections.abc import AsyncIterator
+from typing import Any
+
+import httpx
+import pytest
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.config import settings
+from gateway.app.limits import RateLimiter
+from gateway.app.middleware import RequestMiddleware
+
+
+def rejected(status: str) -> float:
+    labels = {"path": "/chat", "status": status}
+    return REGISTRY.get_sample_value("gateway_requests_total", labels) or 0.0
+
+
+async def test_chunked_body_is_limited_while_it_is_read(monkeypatch: pytest.MonkeyPatch) -> None:
+    sent: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 1}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(settings, "request_size_limit_bytes", 64)
+
+    async def chunked() -> AsyncIterator[bytes]:
+        yield b'{"messages": [{"role": "user", "content": "'
+        for _ in range(10):
+            yield b"x" * 16
+        yield b'"}]}'
+
+    before = rejected("413")
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        response = await client.post("/chat", content=chunked(), headers={"x-request-id": "big"})
+        declared = await client.post("/chat", content=b"{}", headers={"content-length": "65"})
+
+    assert response.status_code == 413 and not sent
+    assert response.json() == {"error": "payload_too_large", "request_id": "big"}
+    assert response.headers["x-request-id"] == "big"
+    assert declared.status_code == 413 and rejected("413") == before + 2
+
+
+async def test_streamed_chunks_pass_through_without_buffering(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    release = asyncio.Event()
+
+    async def streaming_app(scope: Any, receive: Any, send: Any) -> None:
+        assert scope["state"]["request_id"] == "stream-1"
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"first", "more_body": True})
+        await release.wait()
+        await send({"type": "http.response.body", "body": b"last"})
+
+    monkeypatch.setattr(settings, "server_timing_enabled", True)
+    middleware = RequestMiddleware(streaming_app, limiter=lambda: RateLimiter(100, 100))
+    messages: list[dict[str, Any]] = []
+    first_chunk = asyncio.Event()
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+        if message.get("body") == b"first":
+            first_chunk.set()
+
+    scope = {
+        "type": "http",
+        "path": "/chat",
+        "headers": [(b"x-request-id", b"stream-1")],
+        "client": ("10.0.0.1", 1234),
+    }
+    call = asyncio.create_task(middleware(scope, receive, send))
+    await asyncio.wait_for(first_chunk.wait(), timeout=1)
+    assert not call.done()
+    release.set()
+    await call
+
+    headers = dict(messages[0]["headers"])
+    assert headers[b"x-request-id"] == b"stream-1"
+    assert b"ratelimit;dur=" in headers[b"server-timing"]
+    assert [message.get("body") for message in messages[1:]] == [b"first", b"last"]
@@ -0,0 +1,88 @@
+import asyncio
+import json
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from scripts import mock_openai_server as mock
+
+
+def engine(monkeypatch: pytest.MonkeyPatch, **options: float) -> mock.Engine:
+    instance = mock.Engine(mock.PerformanceModel(seed=0, **options))  # type: ignore[arg-type]
+    monkeypatch.setattr(mock, "ENGINE", instance)
+    return instance
+
+
+@pytest.fixture
+async def client() -> AsyncIterator[httpx.AsyncClient]:
+    transport = httpx.ASGITransport(app=mock.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://mock") as client:
+        yield client
+
+
+def metric(text: str, name: str) -> float:
+    for line in text.splitlines():
+        if line.startswith(name):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{name} not found")
+
+
+async def test_output_length_follows_max_tokens(
+    monkeypatch: pytest.MonkeyPatch, client: httpx.AsyncClient
+) -> None:
+    engine(monkeypatch)
+    messages = [{"role": "user", "content": "x" * 400}]
+    response = await client.post(
+        "/v1/chat/completions", json={"messages": messages, "max_tokens": 12}
+    )
+    body = response.json()
+    assert body["usage"] == {"prompt_tokens": 100, "completion_tokens": 12, "total_tokens": 112}
+    assert body["choices"][0]["finish_reason"] == "length"
+
+    payload = {
+        "messages": messages,
+        "max_tokens": 5,
+        "stream": True,
+        "stream_options": {"include_usage": True},
+    }
+    response = await client.post("/v1/chat/completions", json=payload)
+    events = [line[6:] for line in response.text.splitlines() if line.startswith("data: ")]
+    assert events[-1] == "[DONE]"
+    chunks = [json.loads(event) for event in events[:-1]]
+    assert sum(1 for chunk in chunks if chunk["choices"]) == 5
+    assert chunks[-1]["usage"]["completion_tokens"] == 5
+
+
+async def test_batch_capacity_queues_requests_and_exposes_vllm_metrics(
+    monkeypatch: pytest.MonkeyPatch, client: httpx.AsyncClient
+) -> None:
+    engine(monkeypatch, max_batch=1, token_delay_ms=20)
+    payload = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 6}
+    requests = [
+        asyncio.ensure_future(client.post("/v1/chat/completions", json=payload)) for _ in range(3)
+    ]
+    await asyncio.sleep(0.05)
+    text = (await client.get("/metrics")).text
+    assert metric(text, "vllm:num_requests_running") == 1
+    assert metric(text, "vllm:num_requests_waiting") == 2
+    assert all(response.status_code == 200 for response in await asyncio.gather(*requests))
+    text = (await client.get("/metrics")).text
+    assert metric(text, "vllm:num_requests_running") == 0
+    assert metric(text, "vllm:generation_tokens_total") == 18
+
+
+async def test_injected_errors_and_mid_stream_disconnects(
+    monkeypatch: pytest.MonkeyPatch, client: httpx.AsyncClient
+) -> None:
+    engine(monkeypatch, error_rate=1.0, error_status=500)
+    payload = {"messages": [{"role": "user", "content": "hi"}], "max_tokens": 8}
+    assert (await client.post("/v1/chat/completions", json=payload)).status_code == 500
+    assert (await client.post("/v1/embeddings", json={"input": "hi"})).status_code == 500
+
+    instance = engine(monkeypatch, disconnect_rate=1.0)
+    with pytest.raises(mock.SimulatedDisconnect):
+        await client.post("/v1/chat/completions", json={**payload, "stream": True})
+    assert instance.faults["disconnect"] == 1
+    assert instance.finished["abort"] == 1
+    assert instance.running == 0
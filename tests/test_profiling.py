@@ -0,0 +1,67 @@
+import threading
+import time
+
+import httpx
+import pytest
+
+from gateway.app import main
+from gateway.app.config import settings
+from gateway.app.profiling import render_collapsed, sample_stacks
+
+
+def spin_until(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampler_collapses_stacks_per_thread() -> None:
+    stop = threading.Event()
+    worker = threading.Thread(target=spin_until, args=(stop,), name="spinner")
+    worker.start()
+    try:
+        stacks = sample_stacks(0.1, 0.005)
+    finally:
+        stop.set()
+        worker.join()
+    spinner = [stack for stack in stacks if stack.startswith("spinner;")]
+    assert spinner and all(stack.endswith(f"{__name__}:spin_until") for stack in spinner)
+    lines = render_collapsed(stacks).splitlines()
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+async def test_server_timing_header_and_admin_profile(monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        time.sleep(0.01)
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 2}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    transport = httpx.ASGITransport(app=main.app)
+    payload = {"messages": [{"role": "user", "content": "server timing"}]}
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        plain = await client.post("/chat", json=payload)
+        timed = await client.post("/chat", json=payload, headers={"x-server-timing": "1"})
+        assert "server-timing" not in plain.headers
+        entries = dict(entry.split(";dur=") for entry in timed.headers["server-timing"].split(", "))
+        assert list(entries) == ["ratelimit", "parse", "safety", "cache", "overhead", "total"]
+        assert float(entries["total"]) >= float(entries["cache"])
+
+        uncached = {"messages": [{"role": "user", "content": "server timing upstream"}]}
+        monkeypatch.setattr(settings, "server_timing_enabled", True)
+        timed = await client.post("/chat", json=uncached)
+        upstream = timed.headers["server-timing"].split(", ")[4]
+        assert upstream.startswith("upstream;dur=") and float(upstream.split("=")[1]) >= 10
+
+        assert (await client.post("/admin/profile")).status_code == 404
+        monkeypatch.setattr(settings, "admin_token", "secret")
+        denied = await client.post("/admin/profile", headers={"authorization": "Bearer nope"})
+        assert denied.status_code == 401
+        profile = await client.post(
+            "/admin/profile",
+            params={"seconds": 0.1},
+            headers={"authorization": "Bearer secret"},
+        )
+    assert profile.status_code == 200
+    assert profile.headers["content-disposition"].endswith('.collapsed"')
+    assert "MainThread;" in profile.text
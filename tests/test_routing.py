@@ -0,0 +1,36 @@
+from gateway.app.routing import HashRing, prefix_hash, stable_hash
+from gateway.app.upstream import UpstreamPool
+
+SYSTEM = {"role": "system", "content": "You are a helpful assistant. " * 20}
+
+
+def test_prefix_hash_uses_system_prompt_and_leading_chars() -> None:
+    first = [SYSTEM, {"role": "user", "content": "Summarize this report please"}]
+    second = [SYSTEM, {"role": "user", "content": "Summarize this memo instead"}]
+    other = [{"role": "system", "content": "Other"}, first[1]]
+    assert prefix_hash(first, 10) == prefix_hash(second, 10)
+    assert prefix_hash(first, 40) != prefix_hash(second, 40)
+    assert prefix_hash(first, 10) != prefix_hash(other, 10)
+    assert prefix_hash("not a list", 10) is None
+
+
+def test_ring_only_remaps_keys_of_removed_node() -> None:
+    nodes = ["http://a", "http://b", "http://c", "http://d"]
+    full = HashRing(nodes)
+    reduced = HashRing(nodes[:3])
+    keys = [stable_hash(str(i).encode()) for i in range(500)]
+    moved = [key for key in keys if next(full.walk(key)) != next(reduced.walk(key))]
+    assert all(next(full.walk(key)) == 3 for key in moved)
+    assert sorted(full.walk(keys[0])) == [0, 1, 2, 3]
+
+
+def test_affinity_sticks_until_replica_is_overloaded() -> None:
+    pool = UpstreamPool(["http://a", "http://b", "http://c"])
+    key = prefix_hash([SYSTEM], 64)
+    assert key is not None
+    home = pool.pick(affinity=key)
+    assert all(pool.pick(affinity=key) is home for _ in range(5))
+    home.inflight = 10
+    assert pool.pick(affinity=key) is not home
+    home.inflight = 0
+    assert pool.pick(exclude=[home], affinity=key) is not home
@@ -1,4 +1,7 @@
-from gateway.app.safety import SafetyChecker
+import pytest
+
+from gateway.app import safety
+from gateway.app.safety import SafetyChecker, trie_pattern
 
 
 def test_denylist_blocks() -> None:
@@ -15,3 +18,53 @@ def test_max_tokens_capped() -> None:
     result = checker.check(payload)
     assert result.allowed
     assert result.adjusted_max_tokens == 64
+
+
+def test_denylist_scans_content_parts_and_prefers_shortest_term() -> None:
+    checker = SafetyChecker(max_tokens_cap=128, denylist_words=["exploit", "exploitation", "Hack"])
+    parts = [{"type": "text", "text": "first part"}, {"type": "text", "text": "HACKING tips"}]
+    assert not checker.check({"messages": [{"role": "user", "content": parts}]}).allowed
+    clean = {"messages": [{"role": "user", "content": [{"type": "image_url", "image_url": "x"}]}]}
+    assert checker.check(clean).allowed
+    assert not checker.check({"messages": [{"content": "exploitation"}]}).allowed
+
+
+def test_denylist_word_boundary_and_casefold_modes() -> None:
+    checker = SafetyChecker(128, ["hack", "straße"], word_boundary=True, casefold=True)
+    assert checker.check({"messages": [{"content": "a shack by the sea"}]}).allowed
+    assert not checker.check({"messages": [{"content": "how to hack, quickly"}]}).allowed
+    assert not checker.check({"messages": [{"content": "STRASSE"}]}).allowed
+    messages = [{"content": "ha"}, {"content": "ck"}]
+    assert checker.check({"messages": messages}).allowed
+
+
+def test_large_denylists_compile_to_one_trie_pattern(monkeypatch: pytest.MonkeyPatch) -> None:
+    assert trie_pattern(["hack", "hacker", "help"], shortest_match=True) == "h(?:ack|elp)"
+    assert trie_pattern([], shortest_match=True) is None
+    monkeypatch.setattr(safety, "SCAN_MAX_TERMS", 1)
+    checker = SafetyChecker(128, [f"term{i}x" for i in range(300)] + ["a.b"])
+    assert not checker.check({"messages": [{"content": "see TERM299X"}]}).allowed
+    assert not checker.check({"messages": [{"content": "a.b"}]}).allowed
+    assert checker.check({"messages": [{"content": "term300x or axb"}]}).allowed
+
+
+@pytest.mark.parametrize("word_boundary", [False, True])
+def test_automaton_matches_the_trie_regex(word_boundary: bool) -> None:
+    pytest.importorskip("ahocorasick")
+    words = [f"term{i}x" for i in range(300)] + ["hack", "a.b", "straße"]
+    automaton = SafetyChecker(128, words, word_boundary=word_boundary, casefold=True)
+    regex = SafetyChecker(128, words, word_boundary, casefold=True, use_automaton=False)
+    assert (automaton.backend, regex.backend) == ("automaton", "regex")
+    texts = ["a shack", "hack_it", "(hack)", "TERM299X!", "term300x", "axb a.b", "STRASSE", "ha"]
+    for text in texts:
+        payload: dict[str, object] = {"messages": [{"content": text}]}
+        assert automaton.check(payload).allowed == regex.check(payload).allowed, text
+
+
+def test_large_denylists_fall_back_to_regex_without_automaton(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.setattr(safety, "_load_automaton_module", lambda: None)
+    checker = SafetyChecker(128, [f"term{i}x" for i in range(300)])
+    assert checker.backend == "regex"
+    assert not checker.check({"messages": [{"content": "term7x"}]}).allowed
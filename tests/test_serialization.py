@@ -0,0 +1,59 @@
+import json
+import logging
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+
+from gateway.app import main
+from gateway.app.config import settings
+from gateway.app.logging import JsonFormatter
+
+
+async def test_bodies_are_parsed_with_size_limit_and_forwarded_as_json(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    sent: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        sent.append(request)
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 2}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(settings, "request_size_limit_bytes", 1024)
+
+    async def chunked(size: int) -> AsyncIterator[bytes]:
+        yield b'{"messages": [{"role": "user", "content": "'
+        yield b"x" * size
+        yield b'"}]}'
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        ok = await client.post("/chat", content=chunked(100))
+        too_large = await client.post("/chat", content=chunked(2000))
+        invalid = await client.post("/chat", content=b"{not json")
+        not_object = await client.post("/embed", content=b"[1, 2]")
+        missing = await client.get("/missing")
+
+    assert ok.status_code == 200 and len(sent) == 1
+    assert sent[0].headers["content-type"] == "application/json"
+    assert json.loads(sent[0].content)["messages"][0]["content"] == "x" * 100
+    assert too_large.status_code == 413 and too_large.json() == {
+        "error": "payload_too_large",
+        "request_id": too_large.headers["x-request-id"],
+    }
+    assert invalid.status_code == 400 and not_object.status_code == 400
+    assert missing.status_code == 404 and missing.json() == {"detail": "Not Found"}
+
+
+def test_log_formatter_keeps_unicode_and_stringifies_unknown_values() -> None:
+    record = logging.LogRecord("gateway", logging.INFO, __file__, 1, "café", None, None)
+    record.request_id = "r1"
+    record.extra = {"path": object.__name__, "error": ValueError("bad")}
+    line = JsonFormatter().format(record)
+    assert "café" in line
+    payload = json.loads(line)
+    assert payload["message"] == "café" and payload["request_id"] == "r1"
+    assert payload["error"] == "bad" and payload["path"] == "object"
@@ -0,0 +1,156 @@
+import asyncio
+
+import httpx
+import pytest
+from conftest import FakeRedis
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.cache import ResponseCache
+from gateway.app.singleflight import RedisFlightLock, SingleFlight
+
+
+async def test_concurrent_callers_share_one_call() -> None:
+    flights: SingleFlight[int] = SingleFlight()
+    calls = 0
+
+    async def work() -> int:
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return 42
+
+    results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+    assert calls == 1
+    assert [value for value, _ in results] == [42] * 5
+    assert sum(shared for _, shared in results) == 4
+    assert len(flights) == 0
+
+
+async def test_cancelled_waiter_does_not_cancel_others() -> None:
+    flights: SingleFlight[str] = SingleFlight()
+    release = asyncio.Event()
+
+    async def work() -> str:
+        await release.wait()
+        return "done"
+
+    first = asyncio.create_task(flights.do("k", work))
+    second = asyncio.create_task(flights.do("k", work))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == ("done", True)
+    with pytest.raises(asyncio.CancelledError):
+        await first
+
+
+async def test_last_waiter_cancels_call() -> None:
+    flights: SingleFlight[None] = SingleFlight()
+    cancelled = asyncio.Event()
+
+    async def work() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    task = asyncio.create_task(flights.do("k", work))
+    await asyncio.sleep(0)
+    task.cancel()
+    await asyncio.wait_for(cancelled.wait(), 1)
+    assert len(flights) == 0
+
+
+async def test_chat_coalesces_identical_requests(monkeypatch: pytest.MonkeyPatch) -> None:
+    upstream_calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal upstream_calls
+        upstream_calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 3}})
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    payload = {"messages": [{"role": "user", "content": "same"}]}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        responses = await asyncio.gather(*(client.post("/chat", json=payload) for _ in range(4)))
+    assert [response.status_code for response in responses] == [200] * 4
+    assert upstream_calls == 1
+
+
+def flight_lock(redis: FakeRedis, ttl_seconds: float = 0.05) -> RedisFlightLock:
+    return RedisFlightLock(redis, ttl_seconds, 0.005)  # type: ignore[arg-type]
+
+
+async def test_redis_lock_release_needs_the_owner_token(fake_redis: FakeRedis) -> None:
+    redis = fake_redis
+    lock = flight_lock(redis)
+    token = await lock.acquire("k")
+    assert token is not None and await lock.acquire("k") is None
+    await lock.release("k", "someone-else")
+    assert redis.store["lock:k"] == token
+    await lock.release("k", token)
+    assert "lock:k" not in redis.store and await lock.acquire("k") is not None
+
+
+async def test_redis_lock_wait_sees_result_or_times_out(fake_redis: FakeRedis) -> None:
+    redis = fake_redis
+    lock = flight_lock(redis)
+    redis.store["lock:k"] = "other"
+
+    async def finish() -> None:
+        await asyncio.sleep(0.01)
+        redis.store["k"] = "body"
+        del redis.store["lock:k"]
+
+    assert (await asyncio.gather(lock.wait("k"), finish()))[0] is True
+    redis.store["lock:stuck"] = "other"
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    assert await lock.wait("stuck") is False
+    assert loop.time() - started >= 0.04
+
+
+def redis_coalesced() -> float:
+    labels = {"path": "/chat", "scope": "redis"}
+    return REGISTRY.get_sample_value("gateway_singleflight_coalesced_total", labels) or 0.0
+
+
+async def test_generate_chat_uses_the_cross_replica_lock(
+    monkeypatch: pytest.MonkeyPatch, fake_redis: FakeRedis
+) -> None:
+    upstream_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal upstream_calls
+        upstream_calls += 1
+        return httpx.Response(200, json={"choices": [], "usage": {"total_tokens": 3}})
+
+    redis = fake_redis
+    monkeypatch.setattr(main, "flight_lock", flight_lock(redis))
+    monkeypatch.setattr(main, "response_cache", ResponseCache(None, 60, 0, redis=redis))  # type: ignore[arg-type]
+    other_replica = ResponseCache(None, 60, 0, redis=redis)  # type: ignore[arg-type]
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    body, tokens = await main.generate_chat({}, "acquired", "r1", 1)
+    assert tokens == 3 and upstream_calls == 1 and "lock:acquired" not in redis.store
+    assert await other_replica.get("acquired") == body
+
+    redis.store["lock:shared"] = "other"
+    await other_replica.set("shared", b"cached")
+    before = redis_coalesced()
+    assert await main.generate_chat({}, "shared", "r2", 1) == (b"cached", 0)
+    assert upstream_calls == 1 and redis_coalesced() == before + 1
+
+    redis.store["lock:stuck"] = "other"
+    body, tokens = await main.generate_chat({}, "stuck", "r3", 1)
+    assert tokens == 3 and upstream_calls == 2
+    assert redis.store["lock:stuck"] == "other"
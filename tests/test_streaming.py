@@ -0,0 +1,135 @@
+import asyncio
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from conftest import FakeClock
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.admission import AdaptiveLimiter
+from gateway.app.streaming import StreamMonitor, StreamRecorder, replay_sse, split_sse_events
+
+SSE_BODY = (
+    b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n'
+    b'data: {"choices":[{"delta":{"content":" there"}}]}\n\n'
+    b"data: [DONE]\n\n"
+)
+
+
+def test_recorder_requires_done_and_respects_size() -> None:
+    recorder = StreamRecorder(max_bytes=1000)
+    recorder.feed(SSE_BODY[:40])
+    assert not recorder.complete
+    recorder.feed(SSE_BODY[40:])
+    assert recorder.complete
+    assert recorder.getvalue() == SSE_BODY
+
+    small = StreamRecorder(max_bytes=10)
+    small.feed(SSE_BODY)
+    assert small.overflowed and not small.complete
+
+
+async def test_replay_rechunks_events() -> None:
+    assert len(split_sse_events(SSE_BODY)) == 3
+    chunks = [chunk async for chunk in replay_sse(SSE_BODY, 2, 0)]
+    assert len(chunks) == 2
+    assert b"".join(chunks) == SSE_BODY
+    assert [chunk async for chunk in replay_sse(SSE_BODY, 0, 0)] == [SSE_BODY]
+
+
+async def test_completed_stream_is_replayed_from_cache(monkeypatch: pytest.MonkeyPatch) -> None:
+    upstream_calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal upstream_calls
+        upstream_calls += 1
+        return httpx.Response(200, content=SSE_BODY)
+
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    payload = {"messages": [{"role": "user", "content": "stream me"}], "stream": True}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        first = await client.post("/chat", json=payload)
+        second = await client.post("/chat", json=payload)
+    assert first.content == SSE_BODY
+    assert second.content == SSE_BODY
+    assert second.headers["content-type"].startswith("text/event-stream")
+    assert upstream_calls == 1
+
+
+def test_monitor_times_tokens_across_split_chunks(clock: FakeClock) -> None:
+    monitor = StreamMonitor(clock)
+    clock.now = 0.5
+    monitor.feed(SSE_BODY[:30])
+    assert monitor.ttft is None
+    monitor.feed(SSE_BODY[30:50])
+    assert monitor.ttft == 0.5
+    clock.now = 0.6
+    monitor.feed(SSE_BODY[50:])
+    assert monitor.done and monitor.completion_tokens == 2
+    assert monitor.inter_token == pytest.approx([0.1])
+    monitor.feed(b'data: {"choices":[],"usage":{"completion_tokens":7}}\n\n')
+    assert monitor.completion_tokens == 7
+
+
+class BrokenStream(httpx.AsyncByteStream):
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield SSE_BODY[:50]
+        raise httpx.ReadError("upstream reset")
+
+
+async def test_mid_stream_failure_is_recorded_as_502(monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, stream=BrokenStream())
+
+    monkeypatch.setattr(main.settings, "retry_attempts", 1)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+
+    def failures() -> float:
+        value = REGISTRY.get_sample_value(
+            "gateway_requests_total", {"path": "/chat", "status": "502"}
+        )
+        return value or 0.0
+
+    before = failures()
+    payload = {"messages": [{"role": "user", "content": "break me"}], "stream": True}
+    transport = httpx.ASGITransport(app=main.app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+        response = await client.post("/chat", json=payload)
+    assert response.content == SSE_BODY[:50]
+    assert failures() == before + 1
+
+
+async def test_admission_queue_wait_is_not_counted_as_stream_latency(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=SSE_BODY)
+
+    limiter = AdaptiveLimiter(initial_limit=2, min_limit=1, max_limit=2, queue_size=4)
+    monkeypatch.setattr(main, "admission", limiter)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main.settings, "cache_streams", False)
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://gw") as client:
+
+        async def stream(index: int) -> httpx.Response:
+            payload = {"messages": [{"role": "user", "content": f"s{index}"}], "stream": True}
+            return await client.post("/chat", json=payload)
+
+        for index in range(5):
+            assert (await stream(index)).status_code == 200
+        held = [await limiter.acquire(timeout=1) for _ in range(2)]
+        queued = asyncio.create_task(stream(99))
+        await asyncio.sleep(0.2)
+        for slot in held:
+            slot.discard()
+        assert (await queued).status_code == 200
+    assert limiter.limit == 2
@@ -0,0 +1,246 @@
+import asyncio
+import importlib.util
+import logging
+import random
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from conftest import FakeClock
+from prometheus_client import REGISTRY
+
+from gateway.app import main
+from gateway.app.config import Settings
+from gateway.app.metrics import UPSTREAM_INFLIGHT, UPSTREAM_POOL_MAX
+from gateway.app.retry import LatencyTracker, RetryBudget
+from gateway.app.upstream import NoUpstreamAvailable, UpstreamPool, build_upstream_client
+
+
+async def test_build_client_falls_back_without_h2(
+    monkeypatch: pytest.MonkeyPatch, caplog: pytest.LogCaptureFixture
+) -> None:
+    find_spec = importlib.util.find_spec
+    monkeypatch.setattr(
+        importlib.util, "find_spec", lambda name, *args: None if name == "h2" else find_spec(name)
+    )
+    with caplog.at_level(logging.WARNING, logger="gateway.upstream"):
+        client = build_upstream_client(Settings(upstream_http2=True, upstream_max_connections=7))
+    try:
+        pool = client._transport._pool  # type: ignore[attr-defined]
+        assert pool._http1 and not pool._http2
+        assert [record.msg for record in caplog.records] == ["upstream_http2_unavailable"]
+        assert client.timeout.connect == 5.0
+        assert client.timeout.pool == 5.0
+        assert UPSTREAM_POOL_MAX._value.get() == 7
+    finally:
+        await client.aclose()
+
+
+async def test_fetch_reuses_shared_client(monkeypatch: pytest.MonkeyPatch) -> None:
+    seen: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.url.path)
+        return httpx.Response(200, json={"ok": True})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "http_client", client)
+    for _ in range(3):
+        response = await main.fetch_with_retry("POST", "/v1/x", {})
+        assert response.json() == {"ok": True}
+    assert main.get_http_client() is client
+    assert seen == ["/v1/x"] * 3
+    assert UPSTREAM_INFLIGHT._value.get() == 0
+    await client.aclose()
+
+
+def test_least_outstanding_prefers_idle_upstream() -> None:
+    pool = UpstreamPool(["http://a", "http://b", "http://c"])
+    busy_a, busy_b = pool.upstreams[0], pool.upstreams[1]
+    busy_a.inflight, busy_b.inflight = 3, 1
+    assert pool.pick().url == "http://c"
+    assert pool.pick(exclude=[pool.upstreams[2]]).url == "http://b"
+
+
+def test_p2c_picks_less_loaded_of_two() -> None:
+    pool = UpstreamPool(["http://a", "http://b"], strategy="p2c", rng=random.Random(1))
+    pool.upstreams[0].inflight = 5
+    assert all(pool.pick().url == "http://b" for _ in range(10))
+
+
+def test_consecutive_failures_eject_then_restore(clock: FakeClock) -> None:
+    pool = UpstreamPool(
+        ["http://a", "http://b"], eject_after_failures=2, eject_base_seconds=10, clock=clock
+    )
+    bad = pool.upstreams[0]
+    for _ in range(2):
+        pool.record_failure(bad, "ConnectError")
+    assert [pool.pick().url for _ in range(5)] == ["http://b"] * 5
+    clock.now = 11
+    assert bad in pool.candidates()
+
+
+def test_panic_routing_when_every_upstream_is_ejected() -> None:
+    pool = UpstreamPool(["http://a"], eject_after_failures=1)
+    pool.record_failure(pool.upstreams[0], "ConnectError")
+    assert pool.pick().url == "http://a"
+    limited = UpstreamPool(["http://a"], max_inflight=1)
+    limited.upstreams[0].inflight = 1
+    with pytest.raises(NoUpstreamAvailable):
+        limited.pick()
+
+
+async def test_health_check_marks_unhealthy_upstream() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200 if request.url.host == "a" else 503)
+
+    pool = UpstreamPool(["http://a", "http://b"])
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        await pool.check_health(client, timeout=1)
+    assert [u.healthy for u in pool.upstreams] == [True, False]
+
+
+async def test_fetch_retries_on_another_upstream(monkeypatch: pytest.MonkeyPatch) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(500 if request.url.host == "a" else 200, json={})
+
+    pool = UpstreamPool(["http://a", "http://b"])
+    pool.upstreams[1].inflight = 1
+    monkeypatch.setattr(main, "upstream_pool", pool)
+    monkeypatch.setattr(main.settings, "retry_min_seconds", 0)
+    monkeypatch.setattr(main.settings, "retry_max_seconds", 0)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    response = await main.fetch_with_retry("POST", "/v1/chat/completions", {})
+    assert response.request.url.host == "b"
+    assert pool.upstreams[0].consecutive_failures == 1
+
+
+def hedges(outcome: str) -> float:
+    labels = {"path": "/v1/chat/completions", "outcome": outcome}
+    return REGISTRY.get_sample_value("gateway_upstream_hedges_total", labels) or 0.0
+
+
+def test_retry_budget_refills_from_requests_and_time(clock: FakeClock) -> None:
+    budget = RetryBudget(ratio=0.5, min_per_second=0.1, burst=2, clock=clock)
+    assert budget.withdraw() and budget.withdraw() and not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+    clock.now = 10
+    assert budget.tokens == 1 and budget.withdraw() and not budget.withdraw()
+
+
+async def test_fetch_retries_only_retryable_statuses_within_budget(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    statuses = {"a": 400, "b": 503}
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.host)
+        return httpx.Response(statuses[request.url.host], json={})
+
+    monkeypatch.setattr(main.settings, "retry_min_seconds", 0)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    monkeypatch.setattr(main, "upstream_pool", UpstreamPool(["http://a"]))
+    with pytest.raises(httpx.HTTPStatusError):
+        await main.fetch_with_retry("POST", "/v1/chat/completions", {})
+    assert calls == ["a"]
+
+    calls.clear()
+    monkeypatch.setattr(main, "upstream_pool", UpstreamPool(["http://b"]))
+    monkeypatch.setattr(main, "retry_budget", RetryBudget(0.0, 0.0, burst=1))
+    with pytest.raises(httpx.HTTPStatusError):
+        await main.fetch_with_retry("POST", "/v1/chat/completions", {})
+    assert calls == ["b", "b"]
+
+
+async def test_slow_primary_is_hedged_and_cancelled(monkeypatch: pytest.MonkeyPatch) -> None:
+    cancelled: list[str] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "a":
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append("a")
+                raise
+        return httpx.Response(200, json={"host": request.url.host})
+
+    pool = UpstreamPool(["http://a", "http://b"])
+    pool.upstreams[1].inflight = 1
+    tracker = LatencyTracker(95, min_samples=1)
+    tracker.observe(0.001)
+    monkeypatch.setattr(main, "upstream_pool", pool)
+    monkeypatch.setattr(main.settings, "hedge_enabled", True)
+    monkeypatch.setattr(main.settings, "hedge_min_delay_ms", 20)
+    monkeypatch.setitem(main.hedge_trackers, "/v1/chat/completions", tracker)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    before = hedges("sent"), hedges("won")
+    response = await asyncio.wait_for(
+        main.fetch_with_retry("POST", "/v1/chat/completions", {}), timeout=1
+    )
+    await asyncio.sleep(0)
+    assert response.json() == {"host": "b"}
+    assert (hedges("sent"), hedges("won")) == (before[0] + 1, before[1] + 1)
+    assert cancelled == ["a"] and pool.upstreams[0].inflight == 0
+
+
+async def test_hedge_without_free_upstream_keeps_the_primary(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"host": request.url.host})
+
+    tracker = LatencyTracker(95, min_samples=1)
+    tracker.observe(0.001)
+    budget = RetryBudget(0.0, 0.0, burst=5)
+    monkeypatch.setattr(main, "upstream_pool", UpstreamPool(["http://a"], max_inflight=1))
+    monkeypatch.setattr(main, "retry_budget", budget)
+    monkeypatch.setattr(main.settings, "hedge_enabled", True)
+    monkeypatch.setattr(main.settings, "hedge_min_delay_ms", 10)
+    monkeypatch.setitem(main.hedge_trackers, "/v1/chat/completions", tracker)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    before = hedges("no_upstream")
+    response = await main.fetch_with_retry("POST", "/v1/chat/completions", {})
+    assert response.json() == {"host": "a"}
+    assert hedges("no_upstream") == before + 1 and budget.tokens == 5
+
+
+class ResetAfterFirstChunk(httpx.AsyncByteStream):
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        yield b"data: one\n\n"
+        raise httpx.ReadError("upstream reset")
+
+
+async def test_stream_retries_before_first_chunk_but_never_replays(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    responses = [
+        httpx.Response(503),
+        httpx.Response(200, stream=ResetAfterFirstChunk()),
+        httpx.Response(200, content=b"data: two\n\n"),
+    ]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return responses.pop(0)
+
+    monkeypatch.setattr(main.settings, "retry_min_seconds", 0)
+    monkeypatch.setattr(
+        main, "http_client", httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    )
+    chunks: list[bytes] = []
+    with pytest.raises(httpx.ReadError):
+        async for chunk in main.stream_with_retry("/v1/chat/completions", {}):
+            chunks.append(chunk)
+    assert chunks == [b"data: one\n\n"] and len(responses) == 1